@@ -0,0 +1,52 @@
+# script to compare DB.query_df against the COPY fast path (DB.copy_df) on a synthetic 1M-row table
+
+import time
+
+from mimiciii_db import DB
+from mimiciii_db.config import db_url
+
+N_ROWS = 1_000_000
+TABLE = "public.bench_copy_1m"
+REPEATS = 3
+
+db = DB.from_url(db_url())
+
+# shaped like the cohort tables: ids, a timestamp, a few text columns and 0/1 flags
+db.execute(f"DROP TABLE IF EXISTS {TABLE}")
+db.execute(f"""
+CREATE UNLOGGED TABLE {TABLE} AS
+SELECT g AS hadm_id,
+       g % 46520 AS subject_id,
+       TIMESTAMP '2100-01-01' + g * INTERVAL '1 minute' AS admittime,
+       (ARRAY['ELECTIVE', 'EMERGENCY', 'URGENT'])[g % 3 + 1] AS admission_type,
+       CASE WHEN g % 2 = 0 THEN 'M' ELSE 'F' END AS gender,
+       (g % 90)::numeric(10, 2) AS age,
+       (g % 2) AS congestive_heart_failure,
+       (g % 3 = 0)::int AS hypertension,
+       (g % 5 = 0)::int AS renal_failure
+FROM generate_series(1, {N_ROWS}) AS g
+""")
+
+
+def best_of(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        df = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), df
+
+
+sql = f"SELECT * FROM {TABLE}"
+t_regular, df_regular = best_of(lambda: db.query_df(sql))
+t_copy, df_copy = best_of(lambda: db.copy_df(sql))
+
+assert len(df_regular) == len(df_copy) == N_ROWS
+
+print(f"rows:                {N_ROWS:,}")
+print(f"query_df (regular):  {t_regular:.2f}s")
+print(f"copy_df (COPY):      {t_copy:.2f}s")
+print(f"speedup:             {t_regular / t_copy:.1f}x")
+
+db.execute(f"DROP TABLE IF EXISTS {TABLE}")
+db.dispose()
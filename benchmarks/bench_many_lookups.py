@@ -0,0 +1,40 @@
+# script to compare fetching a few thousand admissions by hadm_id: one query per key, one literal IN list, and query_df_many (array-bound chunks)
+
+import time
+
+from mimiciii_db import DB
+from mimiciii_db.config import db_url
+
+KEYS = 5_000
+SQL = "SELECT * FROM mimiciii.admissions"
+
+db = DB.from_url(db_url(), metrics_capacity=None)
+
+all_ids = db.query_df("SELECT hadm_id FROM mimiciii.admissions")["hadm_id"].tolist()
+ids = [int(all_ids[i * len(all_ids) // KEYS]) for i in range(KEYS)]
+db.query_df("SELECT 1")  # warm up the pool
+
+
+def per_key():
+    return [db.query_df(f"{SQL} WHERE hadm_id = :id", {"id": i}) for i in ids]
+
+
+def in_list():
+    return db.query_df(f"{SQL} WHERE hadm_id IN ({', '.join(map(str, ids))})")
+
+
+def many():
+    return db.query_df_many(SQL, "hadm_id", ids)
+
+
+print(f"{KEYS:,} hadm_id lookups on {SQL!r}")
+for label, fn in [
+    ("one query per key", per_key),
+    ("literal IN list", in_list),
+    ("query_df_many", many),
+]:
+    start = time.perf_counter()
+    fn()
+    print(f"  {label:<18} {time.perf_counter() - start:8.3f} s")
+
+db.dispose()
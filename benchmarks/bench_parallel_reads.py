@@ -0,0 +1,43 @@
+# script to compare DB.query_df against key-range partitioned reads (DB.query_df_parallel) on the illness-score views
+
+import os
+import time
+
+from mimiciii_db import DB
+from mimiciii_db.config import db_url
+
+VIEWS = ("mimiciii.sofa", "mimiciii.oasis", "mimiciii.sapsii")
+PARTITION_KEY = "icustay_id"
+PARTITIONS = (2, 4, 8)
+REPEATS = 3
+
+db = DB.from_url(db_url(), pool_size=max(PARTITIONS))
+print(f"client cores: {os.cpu_count()}")
+
+
+def best_of(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        df = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), df
+
+
+for view in VIEWS:
+    sql = f"SELECT * FROM {view}"
+    t_serial, df_serial = best_of(lambda sql=sql: db.query_df(sql, use_cache=False))
+    print(f"\n{view} ({len(df_serial):,} rows)")
+    print(f"  query_df:                {t_serial:.2f}s")
+    for n in PARTITIONS:
+        for copy in (False, True):
+            t_par, df_par = best_of(
+                lambda sql=sql, n=n, copy=copy: db.query_df_parallel(
+                    sql, PARTITION_KEY, n, copy=copy
+                )
+            )
+            assert len(df_par) == len(df_serial)
+            label = f"parallel x{n}{' (COPY)' if copy else ''}:"
+            print(f"  {label:<25}{t_par:.2f}s  speedup {t_serial / t_par:.1f}x")
+
+db.dispose()
@@ -0,0 +1,56 @@
+# script to compare per-call latency of registered point lookups with and without server-side prepared statements
+
+import time
+
+from mimiciii_db import DB
+from mimiciii_db.config import db_url
+
+CALLS = 2_000
+
+db = DB.from_url(db_url(), metrics_capacity=None)
+
+LOOKUPS = {
+    "patient": (
+        """
+        SELECT p.subject_id, p.gender, p.dob, p.dod, p.expire_flag
+        FROM mimiciii.patients p
+        WHERE p.subject_id = :key
+        """,
+        "SELECT subject_id FROM mimiciii.patients",
+    ),
+    "admission": (
+        """
+        SELECT a.hadm_id, a.admittime, a.dischtime, a.admission_type, p.gender
+        FROM mimiciii.admissions a
+        JOIN mimiciii.patients p ON p.subject_id = a.subject_id
+        WHERE a.hadm_id = :key
+        """,
+        "SELECT hadm_id FROM mimiciii.admissions",
+    ),
+}
+
+for name, (sql, keys_sql) in LOOKUPS.items():
+    # the same query registered twice: once re-planned per call, once prepared per connection
+    db.register(name)(lambda key, sql=sql: (sql, {"key": key}))
+    db.register(f"{name}_prepared", prepare=True)(
+        lambda key, sql=sql: (sql, {"key": key})
+    )
+
+    keys = db.query_df(keys_sql)[keys_sql.split()[1]].tolist()
+    keys = [int(keys[i % len(keys)]) for i in range(CALLS)]
+
+    timings = {}
+    for variant in (name, f"{name}_prepared"):
+        db.run(variant, key=keys[0])  # warm up the pool (and prepare)
+        start = time.perf_counter()
+        for key in keys:
+            db.run(variant, key=key)
+        timings[variant] = (time.perf_counter() - start) / CALLS * 1e6
+
+    plain, prep = timings[name], timings[f"{name}_prepared"]
+    print(f"{name} lookup, {CALLS:,} calls")
+    print(f"  run (re-planned):  {plain:8.0f} us/call")
+    print(f"  run (prepared):    {prep:8.0f} us/call")
+    print(f"  speedup:           {plain / prep:8.2f}x")
+
+db.dispose()
@@ -0,0 +1,70 @@
+# script to compare the illness-score materialized-view builds, and short lookups, under the default session settings and the session profiles
+# (needs the first-day views of illness_score_queries/01-10 to exist already)
+
+import ast
+import time
+from pathlib import Path
+
+from mimiciii_db import DB
+from mimiciii_db.config import db_url
+from mimiciii_db.session import SESSION_PROFILES
+
+SCRIPTS = (
+    Path(__file__).resolve().parents[1]
+    / "src/mimiciii_db/queries/illness_score_queries"
+)
+BUILDS = ("11_sofa.py", "12_oasis.py", "13_sapsii.py")
+BUILD_PROFILES = (None, "bulk_build")
+LOOKUP_PROFILES = (None, "lookup")
+LOOKUPS = 500
+REPEATS = 3
+
+db = DB.from_url(db_url(), metrics_capacity=None, single_flight=False)
+
+
+def build_sql(script):
+    """The `query = f\"\"\"...\"\"\"` text of an illness-score script, without running the script."""
+    for node in ast.parse(script.read_text()).body:
+        if (
+            isinstance(node, ast.Assign)
+            and getattr(node.targets[0], "id", None) == "query"
+        ):
+            value = node.value
+            if isinstance(value, ast.JoinedStr):  # an f-string without placeholders
+                return "".join(part.value for part in value.values)
+            return value.value
+    raise ValueError(f"no query in {script}")
+
+
+def best_of(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+for name in BUILDS:
+    sql = build_sql(SCRIPTS / name)
+    print(f"\n{name}")
+    for profile in BUILD_PROFILES:
+        seconds = best_of(
+            lambda sql=sql, profile=profile: db.execute(sql, session=profile)
+        )
+        settings = SESSION_PROFILES.get(profile, "server defaults")
+        print(f"  {profile or 'default':<12} {seconds:8.2f} s   {settings}")
+
+ids = db.query_df("SELECT icustay_id FROM mimiciii.icustays LIMIT :n", {"n": LOOKUPS})[
+    "icustay_id"
+]
+lookup = "SELECT * FROM mimiciii.sofa WHERE icustay_id = :id"
+print(f"\n{LOOKUPS} single-stay lookups on mimiciii.sofa")
+for profile in LOOKUP_PROFILES:
+    seconds = best_of(
+        lambda profile=profile: [
+            db.query_df(lookup, {"id": int(i)}, use_cache=False, session=profile)
+            for i in ids
+        ]
+    )
+    print(f"  {profile or 'default':<12} {seconds * 1000 / LOOKUPS:8.2f} ms per lookup")
@@ -0,0 +1,41 @@
+# script to report DataFrame memory before/after the compact dtype policy on the cohort tables
+
+import pandas as pd
+
+from mimiciii_db import DB
+from mimiciii_db.config import db_url
+from mimiciii_db.dtypes import memory_report
+
+TABLES = [
+    "mimiciii.filtered_patients",
+    "mimiciii.elixhauser_quan",
+    "mimiciii.filtered_patients_with_morbidity_counts",
+    "mimiciii.filtered_patients_agegrouped_with_morbidities",
+]
+
+db = DB.from_url(db_url())
+
+pd.set_option("display.width", 160)
+summary = []
+for table in TABLES:
+    sql = f"SELECT * FROM {table}"
+    before = db.query_df(sql)
+    after = db.query_df(sql, dtypes="compact")
+    report = memory_report(before, after)
+    print(f"\n=== {table} ({len(before):,} rows) ===")
+    print(report.to_string(float_format=lambda x: f"{x:,.1f}"))
+    total = report.loc["TOTAL"]
+    summary.append(
+        {
+            "table": table,
+            "rows": len(before),
+            "MiB_before": total["bytes_before"] / 2**20,
+            "MiB_after": total["bytes_after"] / 2**20,
+            "ratio": total["ratio"],
+        }
+    )
+
+print("\n=== summary ===")
+print(pd.DataFrame(summary).to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
+
+db.dispose()
@@ -8,6 +8,8 @@ load_dotenv(find_dotenv())
 DATABASE_URL = os.getenv("DATABASE_URL")
 ADMISSION_COMORBIDITY_TABLE = os.getenv("ADMISSION_COMORBIDITY_TABLE")
 TARGET_PATIENT = os.getenv("TARGET_PATIENT")
+# Optional: directory for the persistent query result cache (unset disables it)
+QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR")
 
 # Validate required environment variables
 missing_vars = []
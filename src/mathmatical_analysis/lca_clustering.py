@@ -7,7 +7,7 @@ from pandas.core.frame import DataFrame
 from mathmatical_analysis.config import *
 from mimiciii_db import DB
 
-DB_CONN = DB.from_url(DATABASE_URL)
+DB_CONN = DB.from_url(DATABASE_URL, cache_dir=QUERY_CACHE_DIR)
 
 
 def get_detailComorbidityData_PerPatient():
@@ -16,13 +16,17 @@ def get_detailComorbidityData_PerPatient():
     Returns:
         pandas.DataFrame: DataFrame with detail comorbidity data per patient.
     """
-    admission_comorbidity_details = DB_CONN.query_df(
-        f"SELECT * FROM {ADMISSION_COMORBIDITY_TABLE}"
+    # both fetches run at once
+    comorbidity, targets = DB_CONN.prefetch(
+        [
+            f"SELECT * FROM {ADMISSION_COMORBIDITY_TABLE}",
+            f"SELECT * FROM {TARGET_PATIENT}",
+        ]
     )
-    target_patients = DB_CONN.query_df(f"SELECT * FROM {TARGET_PATIENT}")
+    target_patients = targets.result()
 
     return target_patients[["hadm_id", "age", "admission_type"]].merge(
-        admission_comorbidity_details, on="hadm_id", how="left"
+        comorbidity.result(), on="hadm_id", how="left"
     )
 
 
@@ -129,6 +133,7 @@ def lca_analysis():
 def relabel_subgroups(
     ori_subgroup_path: pd.DataFrame,
     new_subgroup_path: str = "data/lca_all_subgroups_relabeled.csv",
+    dest_table: str = None,
 ):
     """
     Relabel subgroups based on the main paper subgroup status
@@ -143,40 +148,35 @@ def relabel_subgroups(
     Args:
         ori_subgroup_path: Path to the original subgroup assignments.
         new_subgroup_path: Path to the new subgroup assignments.
+        dest_table: Optional table (e.g. "mimiciii.lca_all_subgroups_relabeled") to also
+            load the relabeled assignments into, indexed on hadm_id, so they can be
+            joined server-side.
 
     Returns:
         None
     """
     ori_6k_df = ori_subgroup_path.copy()[["hadm_id", "subgroup_K6"]]
-    morbidity_counts_df = DB_CONN.query_df(
-        f"SELECT * FROM {ADMISSION_COMORBIDITY_TABLE}"
-    )
-
-    ori_6k_df = ori_6k_df.merge(morbidity_counts_df, on="hadm_id", how="left")
-
-    ori_6k_df["group1_cond"] = ori_6k_df["chronic_pulmonary"] == 1
-    ori_6k_df["group3_cond"] = (ori_6k_df["alcohol_abuse"] == 1) & (
-        ori_6k_df["liver_disease"] == 1
-    )
-    ori_6k_df["group4_cond"] = ori_6k_df["renal_failure"] == 1
-    ori_6k_df["group4_5_cond"] = (
-        (ori_6k_df["diabetes_uncomplicated"] == 1)
-        | (ori_6k_df["diabetes_complicated"] == 1)
-    ) & (ori_6k_df["hypertension"] == 1)
-    ori_6k_df["group6_cond"] = ori_6k_df["cardiac_arrhythmias"] == 1
-
-    group_stats = (
-        ori_6k_df.groupby("subgroup_K6")
-        .agg(
-            {
-                "group1_cond": "mean",
-                "group3_cond": "mean",
-                "group4_cond": "mean",
-                "group4_5_cond": "mean",
-                "group6_cond": "mean",
-            }
-        )
-        .reset_index()
+    # share of each subgroup meeting each condition, computed server-side
+    group_stats = DB_CONN.join_local(
+        ori_6k_df,
+        f"""
+        SELECT
+            l."subgroup_K6",
+            avg((CASE WHEN c.chronic_pulmonary = 1 THEN 1 ELSE 0 END)::float8)
+                AS group1_cond,
+            avg((CASE WHEN c.alcohol_abuse = 1 AND c.liver_disease = 1
+                 THEN 1 ELSE 0 END)::float8) AS group3_cond,
+            avg((CASE WHEN c.renal_failure = 1 THEN 1 ELSE 0 END)::float8)
+                AS group4_cond,
+            avg((CASE WHEN (c.diabetes_uncomplicated = 1 OR c.diabetes_complicated = 1)
+                      AND c.hypertension = 1 THEN 1 ELSE 0 END)::float8) AS group4_5_cond,
+            avg((CASE WHEN c.cardiac_arrhythmias = 1 THEN 1 ELSE 0 END)::float8)
+                AS group6_cond
+        FROM local_df l
+        LEFT JOIN {ADMISSION_COMORBIDITY_TABLE} c USING (hadm_id)
+        GROUP BY l."subgroup_K6"
+        ORDER BY l."subgroup_K6"
+        """,
     )
 
     mapping = dict()
@@ -214,6 +214,9 @@ def relabel_subgroups(
 
     output.to_csv(new_subgroup_path, index=False)
 
+    if dest_table:
+        DB_CONN.bulk_load(output, dest_table, mode="replace", indexes=["hadm_id"])
+
 
 if __name__ == "__main__":
 
@@ -1,19 +1,23 @@
-from typing import Callable, Dict
+from typing import Any
 
+from .async_db import AsyncDB
+from .catalog import CATALOG
 from .db import DB
+from .dtypes import DtypePolicy
 
-_registry: Dict[str, Callable] = {}
+# the package-wide query catalog every DB falls back to
+_registry = CATALOG
 
 
-def registry(name: str):
-    """Decorator to register a query globally in the package registry."""
+def registry(name: str, **meta: Any):
+    """
+    Decorator to register a query globally, in the catalog every DB reads.
 
-    def _decorator(fn: Callable):
-        _registry[name] = fn
-        return fn
+    `meta` takes the same metadata as `DB.register` (`relations`,
+    `expected_rows`, `cache`, `fetch`, `dtypes`).
+    """
+    return CATALOG.register(name, **meta)
 
-    return _decorator
 
-
-# user can only import DB and registry
-__all__ = ["DB", "registry"]
+# user can only import DB, AsyncDB, DtypePolicy and registry
+__all__ = ["DB", "AsyncDB", "DtypePolicy", "registry"]
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Union
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from .catalog import CATALOG, QueryCatalog, QueryFn
+from .db import DB, QuerySpec
+from .dtypes import DtypePolicy, resolve_policy
+from .session import Session, apply_session, resolve_session
+from .sqlutil import build_select
+
+
+@dataclass
+class AsyncDB:
+    """
+    asyncio counterpart of `DB`, built on SQLAlchemy's async engine with psycopg 3.
+
+    Independent fetches issued through `gather` (or `asyncio.gather`) run on
+    separate pooled connections at the same time, so total wall time is close
+    to that of the slowest query. On Windows psycopg's async mode needs a
+    selector event loop (`asyncio.WindowsSelectorEventLoopPolicy`).
+    """
+
+    engine: AsyncEngine
+    _registry: QueryCatalog
+
+    # --- Factory constructors ---
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_pre_ping: bool = True,
+        registry: Optional[QueryCatalog] = None,
+        **kwargs: Any,
+    ) -> AsyncDB:
+        """Create an AsyncDB from a database URL (any postgresql:// driver is switched to psycopg async)."""
+        eng = create_async_engine(
+            make_url(url).set(drivername="postgresql+psycopg"),
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=pool_pre_ping,
+            connect_args={"options": "-csearch_path=mimiciii,public"},
+            **kwargs,
+        )
+        if registry is None:
+            registry = QueryCatalog(parent=CATALOG)
+        return cls(engine=eng, _registry=registry)
+
+    @classmethod
+    def from_db(cls, db: DB, **kwargs: Any) -> AsyncDB:
+        """Create an AsyncDB on the same database as `db`, sharing its query catalog."""
+        url = db.engine.url.render_as_string(hide_password=False)
+        return cls.from_url(url, registry=db._registry, **kwargs)
+
+    # --- Core data operations ---
+    async def query_df(
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]] = None,
+        dtypes: Union[DtypePolicy, str, None] = None,
+        session: Session = None,
+    ) -> pd.DataFrame:
+        """
+        Execute a parameterized SELECT query and return the result as a DataFrame.
+
+        Args:
+            sql (str): The SQL query string. Use named parameters (e.g. :param_name) for safe substitution.
+            params (dict, optional): A dictionary of parameter names and values to bind to the query.
+            dtypes (DtypePolicy or "compact", optional): Downcast the result (see `DB.query_df`).
+            session (str or dict, optional): Session profile for this call's transaction.
+
+        Returns:
+            pd.DataFrame: The query results as a DataFrame, typed exactly as `DB.query_df` would.
+
+        Example:
+            df = await adb.query_df("SELECT * FROM admissions WHERE hadm_id = :id", {"id": 100001})
+        """
+        policy = resolve_policy(dtypes)
+        settings = resolve_session(session)
+
+        def _read(sync_conn) -> pd.DataFrame:
+            apply_session(sync_conn, settings)
+            df = pd.read_sql_query(text(sql), sync_conn, params=params or {})
+            return policy.apply(df) if policy is not None else df
+
+        try:
+            async with self.engine.begin() as conn:
+                return await conn.run_sync(_read)
+        except (SQLAlchemyError, OperationalError) as e:
+            raise RuntimeError(f"Database query failed: {e}") from e
+
+    async def table_df(
+        self,
+        table: str,
+        limit: Optional[int] = 100,
+        schema: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Mapping[str, Any]] = None,
+        order_by: Union[str, Sequence[str], None] = None,
+    ) -> pd.DataFrame:
+        """Read (part of) a table, projecting and filtering on the server (see `DB.table_df`)."""
+        quote = self.engine.dialect.identifier_preparer.quote
+        ident = ".".join(quote(part) for part in table.split("."))
+        if schema:
+            ident = f"{quote(schema)}.{ident}"
+        sql, params = build_select(quote, ident, columns, where, order_by, limit)
+        return await self.query_df(sql, params)
+
+    # --- Named query registry ---
+    def register(self, name: str):
+        """Decorator to register a query function."""
+
+        def _decorator(fn: QueryFn) -> QueryFn:
+            self._registry[name] = fn
+            return fn
+
+        return _decorator
+
+    async def run(
+        self,
+        name: str,
+        dtypes: Union[DtypePolicy, str, None] = None,
+        session: Session = None,
+        **kwargs: Any,
+    ) -> pd.DataFrame:
+        """
+        Execute a cataloged query by name.
+
+        The entry's dtype policy and session profile apply unless overridden by
+        `dtypes` / `session`. Its fetch mode and cache policy do not: AsyncDB has
+        no result cache and always fetches through a regular cursor.
+        Other keyword arguments go to the query function.
+        """
+        if name not in self._registry:
+            raise KeyError(f"Query '{name}' not found.")
+        entry = self._registry[name]
+        sql, params = entry(**kwargs)
+        result = await self.query_df(
+            sql,
+            params,
+            entry.dtypes if dtypes is None else dtypes,
+            entry.session if session is None else session,
+        )
+        entry.observed_rows = len(result)
+        return result
+
+    async def gather(self, queries: Mapping[str, QuerySpec]) -> Dict[str, pd.DataFrame]:
+        """
+        Run several independent queries concurrently.
+
+        Args:
+            queries (dict): Result name -> SQL string or (SQL, params) tuple.
+
+        Returns:
+            dict: Result name -> DataFrame, in the order the queries were given.
+
+        Example:
+            frames = await adb.gather({
+                "cohort": "SELECT * FROM mimiciii.filtered_patients",
+                "elix": "SELECT * FROM mimiciii.elixhauser_quan",
+                "sofa": ("SELECT * FROM mimiciii.sofa WHERE sofa >= :min", {"min": 2}),
+            })
+        """
+        names = list(queries)
+        coros = []
+        for name in names:
+            spec = queries[name]
+            sql, params = (spec, None) if isinstance(spec, str) else spec
+            coros.append(self.query_df(sql, params))
+        results = await asyncio.gather(*coros)
+        return dict(zip(names, results))
+
+    # --- Resource cleanup ---
+    async def dispose(self) -> None:
+        """Close all connection pools."""
+        await self.engine.dispose()
@@ -0,0 +1,377 @@
+"""COPY-based bulk transfer helpers used by :class:`mimiciii_db.DB`.
+
+`COPY (query) TO STDOUT` lets Postgres serialize a whole result set in one
+stream, which we then parse in bulk (pandas or pyarrow CSV readers) instead of
+building one Python object per cell. `COPY ... FROM STDIN` is the mirror image
+for writing DataFrames back.
+"""
+
+from __future__ import annotations
+
+import io
+import tempfile
+from pathlib import Path
+from typing import IO, Any, Mapping, Optional, Sequence, Union
+
+import pandas as pd
+from sqlalchemy import bindparam, literal, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.types import UserDefinedType
+
+# Marker used for NULL in the CSV stream so that empty strings survive the round trip.
+NULL_MARKER = r"\N"
+
+# A dialect with a non-"format" paramstyle, so rendered literals keep single "%" signs.
+_LITERAL_DIALECT = postgresql.dialect(paramstyle="named")
+
+# Result containers DB can return: numpy-backed pandas (the default), pandas
+# with Arrow-backed dtypes, a bare pyarrow.Table, or a polars.DataFrame.
+RETURN_TYPES = ("pandas", "pandas_arrow", "arrow", "polars")
+
+try:
+    import pyarrow  # noqa: F401
+
+    _CSV_ENGINE = "pyarrow"
+except ImportError:
+    _CSV_ENGINE = "c"
+
+# Postgres type OIDs -> pandas dtypes used when parsing the CSV stream.
+_OID_DTYPES = {
+    16: "boolean",  # bool
+    20: "Int64",  # int8
+    21: "Int16",  # int2
+    23: "Int32",  # int4
+    26: "Int64",  # oid
+    700: "float32",  # float4
+    701: "float64",  # float8
+    1700: "float64",  # numeric
+    18: "object",  # char
+    25: "object",  # text
+    1042: "object",  # bpchar
+    1043: "object",  # varchar
+}
+_OID_DATES = {
+    1082,  # date
+    1114,  # timestamp
+    1184,  # timestamptz
+}
+
+
+class _ArrayLiteral(UserDefinedType):
+    """Renders a list/tuple parameter as `ARRAY[...]` (an empty one as `'{}'`, typed by context)."""
+
+    cache_ok = True
+
+    def literal_processor(self, dialect: Any) -> Any:
+        def process(value: Sequence[Any]) -> str:
+            if not len(value):
+                return "'{}'"
+            items = (
+                str(
+                    literal(v).compile(
+                        dialect=dialect, compile_kwargs={"literal_binds": True}
+                    )
+                )
+                for v in value
+            )
+            return f"ARRAY[{', '.join(items)}]"
+
+        return process
+
+
+def render_sql(sql: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """Inline bound parameters as SQL literals (COPY cannot take bind parameters)."""
+    stmt = text(sql)
+    if params:
+        stmt = stmt.bindparams(
+            *(
+                (
+                    bindparam(k, v, type_=_ArrayLiteral())
+                    if isinstance(v, (list, tuple))
+                    else bindparam(k, v)
+                )
+                for k, v in params.items()
+            )
+        )
+    return str(
+        stmt.compile(dialect=_LITERAL_DIALECT, compile_kwargs={"literal_binds": True})
+    )
+
+
+def result_columns(conn: Connection, sql: str) -> list[tuple[str, int]]:
+    """Return (name, type OID) for every column the query would produce, without running it."""
+    cur = conn.connection.driver_connection.cursor()
+    try:
+        cur.execute(f"SELECT * FROM ({sql}) AS _q LIMIT 0")
+        return [(col[0], col[1]) for col in cur.description]
+    finally:
+        cur.close()
+
+
+def copy_to_file(conn: Connection, sql: str, f: IO[bytes]) -> None:
+    """Run `COPY (sql) TO STDOUT` as CSV with a header row, writing the stream to `f`."""
+    stmt = (
+        f"COPY ({sql}) TO STDOUT "
+        f"WITH (FORMAT csv, HEADER true, NULL '{NULL_MARKER}')"
+    )
+    cur = conn.connection.driver_connection.cursor()
+    try:
+        if hasattr(cur, "copy"):  # psycopg 3
+            with cur.copy(stmt) as copy:
+                for block in copy:
+                    f.write(block)
+        else:  # psycopg2
+            cur.copy_expert(stmt, f)
+    finally:
+        cur.close()
+
+
+def copy_to_buffer(conn: Connection, sql: str) -> io.BytesIO:
+    """Run `COPY (sql) TO STDOUT` as CSV with a header row and collect the stream."""
+    buf = io.BytesIO()
+    copy_to_file(conn, sql, buf)
+    buf.seek(0)
+    return buf
+
+
+def read_copy_csv(buf: io.BytesIO, columns: list[tuple[str, int]]) -> pd.DataFrame:
+    """Parse a COPY CSV stream into a typed DataFrame using the column type OIDs."""
+    if _CSV_ENGINE == "pyarrow":
+        # pandas' pyarrow engine ignores `na_values` for string columns (NULL text
+        # would come back as "\N"), so parse with pyarrow.csv and convert
+        df = read_copy_arrow(buf, columns).to_pandas(
+            types_mapper=_nullable_dtype,
+            date_as_object=False,
+            coerce_temporal_nanoseconds=True,
+        )
+        if len(columns) == len(df.columns):
+            df.columns = [name for name, _ in columns]
+        return df
+    dtypes = {name: _OID_DTYPES[oid] for name, oid in columns if oid in _OID_DTYPES}
+    dates = [name for name, oid in columns if oid in _OID_DATES]
+    # The C parser is slow at filling nullable extension dtypes, so it parses
+    # those columns natively and casts afterwards.
+    deferred = {k: v for k, v in dtypes.items() if v[0].isupper() or v == "boolean"}
+    dtypes = {k: v for k, v in dtypes.items() if k not in deferred}
+    df = pd.read_csv(
+        buf,
+        engine="c",
+        dtype=dtypes,
+        parse_dates=dates,
+        date_format="ISO8601",
+        na_values=[NULL_MARKER],
+        keep_default_na=False,
+        true_values=["t"],
+        false_values=["f"],
+    )
+    if deferred:
+        df = df.astype(deferred)
+    if len(columns) == len(df.columns):
+        # read_csv de-duplicates repeated names ("a", "a.1"); keep what Postgres returned
+        df.columns = [name for name, _ in columns]
+    return df
+
+
+def _nullable_dtype(arrow_type: Any) -> Any:
+    """pandas dtype for an Arrow type, matching `_OID_DTYPES` (None: pyarrow's default)."""
+    import pyarrow as pa
+
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    if pa.types.is_integer(arrow_type):
+        return pd.api.types.pandas_dtype(f"Int{arrow_type.bit_width}")
+    return None
+
+
+def _arrow_convert_options(columns: list[tuple[str, int]]) -> Any:
+    """pyarrow CSV options typing the columns of a COPY stream by their type OIDs."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    arrow_types = {
+        16: pa.bool_(),
+        20: pa.int64(),
+        21: pa.int16(),
+        23: pa.int32(),
+        26: pa.int64(),
+        700: pa.float32(),
+        701: pa.float64(),
+        1700: pa.float64(),
+        18: pa.string(),
+        25: pa.string(),
+        1042: pa.string(),
+        1043: pa.string(),
+        1082: pa.date32(),
+        1114: pa.timestamp("us"),
+        1184: pa.timestamp("us", tz="UTC"),
+    }
+    return pa_csv.ConvertOptions(
+        column_types={
+            name: arrow_types[oid] for name, oid in columns if oid in arrow_types
+        },
+        null_values=[NULL_MARKER],
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+        true_values=["t"],
+        false_values=["f"],
+    )
+
+
+def read_copy_arrow(buf: io.BytesIO, columns: list[tuple[str, int]]) -> Any:
+    """Parse a COPY CSV stream straight into a columnar `pyarrow.Table`."""
+    import pyarrow.csv as pa_csv
+
+    return pa_csv.read_csv(buf, convert_options=_arrow_convert_options(columns))
+
+
+def from_arrow(table: Any, return_type: str) -> Any:
+    """Hand an Arrow table to the requested container without copying the buffers."""
+    if return_type == "arrow":
+        return table
+    if return_type == "polars":
+        import polars as pl
+
+        return pl.from_arrow(table)
+    if return_type == "pandas_arrow":
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    raise ValueError(
+        f"Unknown return_type '{return_type}'; expected one of {RETURN_TYPES}"
+    )
+
+
+def concat_results(frames: Sequence[Any]) -> Any:
+    """Concatenate Arrow tables or polars DataFrames of the same shape."""
+    if type(frames[0]).__module__.startswith("polars"):
+        import polars as pl
+
+        return pl.concat(frames)
+    import pyarrow as pa
+
+    return pa.concat_tables(frames)
+
+
+def copy_query_df(
+    conn: Connection,
+    sql: str,
+    params: Optional[Mapping[str, Any]] = None,
+    return_type: str = "pandas",
+) -> Any:
+    """Fetch a SELECT query through COPY and return it in the requested container."""
+    if return_type not in RETURN_TYPES:
+        raise ValueError(
+            f"Unknown return_type '{return_type}'; expected one of {RETURN_TYPES}"
+        )
+    rendered = render_sql(sql, params).strip().rstrip(";")
+    columns = result_columns(conn, rendered)
+    buf = copy_to_buffer(conn, rendered)
+    if return_type == "pandas":
+        return read_copy_csv(buf, columns)
+    return from_arrow(read_copy_arrow(buf, columns), return_type)
+
+
+def copy_to_parquet(
+    conn: Connection,
+    sql: str,
+    params: Optional[Mapping[str, Any]],
+    path: Union[str, Path],
+    compression: str = "zstd",
+) -> int:
+    """
+    Write a SELECT query to a Parquet file through COPY and return the row count.
+
+    The CSV stream is spooled to a temporary file next to `path` and then
+    converted one record batch at a time, so the result is never held in memory.
+    """
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    rendered = render_sql(sql, params).strip().rstrip(";")
+    columns = result_columns(conn, rendered)
+    rows = 0
+    with tempfile.TemporaryFile(dir=Path(path).parent) as spool:
+        copy_to_file(conn, rendered, spool)
+        spool.seek(0)
+        reader = pa_csv.open_csv(spool, convert_options=_arrow_convert_options(columns))
+        with pq.ParquetWriter(path, reader.schema, compression=compression) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
+
+
+def quote_table(conn: Connection, table: str) -> str:
+    """Quote a possibly schema-qualified table name ("schema.table")."""
+    preparer = conn.dialect.identifier_preparer
+    return ".".join(preparer.quote(part) for part in table.split("."))
+
+
+def pg_type(dtype: Any) -> str:
+    """Map a pandas dtype to the Postgres column type used by `create_table_sql`."""
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(dtype):
+        return {1: "smallint", 2: "smallint", 4: "integer"}.get(
+            pd.api.types.pandas_dtype(dtype).itemsize, "bigint"
+        )
+    if pd.api.types.is_float_dtype(dtype):
+        return (
+            "real"
+            if pd.api.types.pandas_dtype(dtype).itemsize == 4
+            else "double precision"
+        )
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return "timestamptz"
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return "timestamp"
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return "interval"
+    return "text"
+
+
+def create_table_sql(
+    conn: Connection, df: pd.DataFrame, table: str, temporary: bool = False
+) -> str:
+    """Build a CREATE TABLE statement whose columns match the DataFrame dtypes."""
+    preparer = conn.dialect.identifier_preparer
+    cols = ", ".join(
+        f"{preparer.quote(str(name))} {pg_type(dtype)}"
+        for name, dtype in df.dtypes.items()
+    )
+    kind = "TEMPORARY TABLE" if temporary else "TABLE"
+    return f"CREATE {kind} {quote_table(conn, table)} ({cols})"
+
+
+def copy_from_frame(conn: Connection, df: pd.DataFrame, table: str) -> int:
+    """Stream a DataFrame into an existing table with `COPY ... FROM STDIN` and return the row count."""
+    preparer = conn.dialect.identifier_preparer
+    cols = ", ".join(preparer.quote(str(name)) for name in df.columns)
+    stmt = (
+        f"COPY {quote_table(conn, table)} ({cols}) FROM STDIN "
+        f"WITH (FORMAT csv, NULL '{NULL_MARKER}')"
+    )
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep=NULL_MARKER)
+    buf.seek(0)
+    cur = conn.connection.driver_connection.cursor()
+    try:
+        if hasattr(cur, "copy"):  # psycopg 3
+            with cur.copy(stmt) as copy:
+                while data := buf.read(1 << 20):
+                    copy.write(data)
+        else:  # psycopg2
+            cur.copy_expert(stmt, buf)
+    finally:
+        cur.close()
+    return len(df)
+
+
+def create_indexes(
+    conn: Connection, table: str, indexes: Sequence[Union[str, Sequence[str]]]
+) -> None:
+    """Create one index per entry; an entry is a column name or a tuple of column names."""
+    preparer = conn.dialect.identifier_preparer
+    for index in indexes:
+        columns = [index] if isinstance(index, str) else list(index)
+        cols = ", ".join(preparer.quote(str(c)) for c in columns)
+        conn.exec_driver_sql(f"CREATE INDEX ON {quote_table(conn, table)} ({cols})")
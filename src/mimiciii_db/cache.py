@@ -0,0 +1,180 @@
+"""Persistent on-disk cache of query results stored as compressed Parquet.
+
+Entries are keyed by the normalized SQL, its parameters, the fetch variant
+(result container / COPY) and a version stamp of every relation the query
+reads, so a cached result is only reused while the underlying tables /
+materialized views are unchanged. Each entry is one file named `<key>-<created>.parquet`; the file
+mtime doubles as the last-access time for LRU eviction, so several processes
+can share a cache directory without a separate index.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Optional
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from . import bulk
+from .sqlutil import normalize_sql
+
+# Resolves the named relations (following views down to the tables they read)
+# and reports values that change whenever their contents may have changed:
+# relfilenode moves on REFRESH MATERIALIZED VIEW / TRUNCATE / rewrites, and the
+# cumulative tuple counters move on any committed DML.
+_VERSION_SQL = """
+WITH RECURSIVE rels(oid) AS (
+    SELECT c.oid
+    FROM unnest(CAST(:names AS text[])) AS n(name)
+    JOIN pg_class c ON c.oid = to_regclass(n.name)
+  UNION
+    SELECT d.refobjid
+    FROM rels
+    JOIN pg_class v ON v.oid = rels.oid AND v.relkind = 'v'
+    JOIN pg_rewrite r ON r.ev_class = v.oid
+    JOIN pg_depend d ON d.objid = r.oid
+     AND d.classid = 'pg_rewrite'::regclass
+     AND d.refclassid = 'pg_class'::regclass
+     AND d.refobjid <> v.oid
+)
+SELECT c.oid::regclass::text AS relation,
+       c.relkind::text AS relkind,
+       c.relfilenode::bigint AS relfilenode,
+       COALESCE(s.n_tup_ins, 0) AS n_tup_ins,
+       COALESCE(s.n_tup_upd, 0) AS n_tup_upd,
+       COALESCE(s.n_tup_del, 0) AS n_tup_del
+FROM rels
+JOIN pg_class c ON c.oid = rels.oid
+LEFT JOIN pg_stat_all_tables s ON s.relid = c.oid
+ORDER BY 1
+"""
+
+
+def relation_versions(conn: Connection, relations: Iterable[str]) -> list[list[Any]]:
+    """Version stamp (one row per resolved relation) for the given relation names."""
+    names = sorted(relations)
+    if not names:
+        return []
+    rows = conn.execute(text(_VERSION_SQL), {"names": names})
+    return [list(row) for row in rows]
+
+
+class ParquetCache:
+    """
+    Size-bounded LRU + TTL cache of query results on local disk.
+
+    Args:
+        directory (str): Where cache files live (created if missing).
+        max_bytes (int): Total size budget; least recently used entries are evicted beyond it.
+        ttl (float, optional): Seconds after which an entry is stale regardless of version.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 2 * 1024**3,
+        ttl: Optional[float] = 24 * 3600,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        sql: str,
+        params: Optional[Mapping[str, Any]],
+        version: Any,
+        variant: str = "",
+    ) -> str:
+        """Hash of the normalized SQL, parameters, fetch variant and version stamp."""
+        payload = json.dumps(
+            [normalize_sql(sql), dict(params or {}), variant, version],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entries(self) -> list[Path]:
+        return list(self.directory.glob("*.parquet"))
+
+    def _is_expired(self, path: Path, now: float) -> bool:
+        if self.ttl is None:
+            return False
+        created = float(path.stem.rsplit("-", 1)[1])
+        return now - created > self.ttl
+
+    def get(self, key: str, return_type: str = "pandas") -> Any:
+        """Return the cached result for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        for path in self.directory.glob(f"{key}-*.parquet"):
+            if self._is_expired(path, now):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                import pyarrow.parquet as pq
+
+                table = pq.read_table(path)
+                os.utime(path, (now, now))
+            except (OSError, ValueError):
+                # Evicted by another process mid-read, or a torn file: treat as a miss.
+                continue
+            if return_type == "pandas":
+                return table.to_pandas()
+            return bulk.from_arrow(table, return_type)
+        return None
+
+    def put(self, key: str, result: Any) -> None:
+        """Store a result (pandas, pyarrow or polars) and evict to stay within budget."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if isinstance(result, pd.DataFrame):
+            table = pa.Table.from_pandas(result, preserve_index=False)
+        elif isinstance(result, pa.Table):
+            table = result
+        else:  # polars.DataFrame
+            table = result.to_arrow()
+        path = self.directory / f"{key}-{time.time():.3f}.parquet"
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under `max_bytes`."""
+        now = time.time()
+        with self._lock:
+            entries = []
+            for path in self._entries():
+                try:
+                    if self._is_expired(path, now):
+                        path.unlink(missing_ok=True)
+                        continue
+                    st = path.stat()
+                except (OSError, ValueError, IndexError):
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+
+    def size_bytes(self) -> int:
+        """Current total size of the cache directory's entries."""
+        return sum(p.stat().st_size for p in self._entries() if p.exists())
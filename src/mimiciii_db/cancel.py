@@ -0,0 +1,102 @@
+"""Statement timeouts and cooperative cancellation of in-flight queries.
+
+A `CancelHandle` passed to a `DB` call learns the server process (backend
+pid) the call is running on; `cancel()` then issues `pg_cancel_backend` for
+it from another pooled connection. The cancelled call fails with
+"canceling statement due to user request", its transaction is rolled back,
+and the connection goes back to the pool clean. The handle only ever
+targets a backend while a call holds it, so a late `cancel()` cannot hit
+another caller's query.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Mapping, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from .session import apply_session
+
+
+def backend_pid(conn: Connection) -> int:
+    """Server process id of the connection, read from the driver (no round trip)."""
+    raw = conn.connection.driver_connection
+    if hasattr(raw, "get_backend_pid"):  # psycopg2
+        return raw.get_backend_pid()
+    return raw.info.backend_pid  # psycopg 3
+
+
+def set_statement_timeout(conn: Connection, timeout: Optional[float]) -> None:
+    """Limit every statement of the current transaction to `timeout` seconds (`SET LOCAL`)."""
+    if timeout is None:
+        return
+    if timeout <= 0:
+        raise ValueError("timeout must be a positive number of seconds")
+    ms = max(1, round(timeout * 1000))
+    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {ms}")
+
+
+class CancelHandle:
+    """
+    Cancels the query a `DB` call is running, from any thread.
+
+    Example:
+        handle = CancelHandle()
+        threading.Timer(60, handle.cancel).start()
+        df = db.query_df("SELECT * FROM chartevents", cancel=handle)
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._target: Optional[tuple[Engine, int]] = None
+        self.cancelled = False
+
+    @contextmanager
+    def attach(self, conn: Connection) -> Iterator[None]:
+        """Make `conn` the cancellation target while the block runs."""
+        with self._lock:
+            self._target = (conn.engine, backend_pid(conn))
+        try:
+            yield
+        finally:
+            # waits for an in-progress cancel() so it cannot outlive our hold on the backend
+            with self._lock:
+                self._target = None
+
+    def cancel(self) -> bool:
+        """
+        Cancel the query currently running under this handle.
+
+        Returns:
+            bool: True if a running query was signalled, False if none was in flight.
+        """
+        with self._lock:
+            if self._target is None:
+                return False
+            engine, pid = self._target
+            with engine.connect() as conn:
+                sent = conn.execute(
+                    text("SELECT pg_cancel_backend(:pid)"), {"pid": pid}
+                ).scalar()
+            self.cancelled = self.cancelled or bool(sent)
+            return bool(sent)
+
+
+@contextmanager
+def statement_guard(
+    conn: Connection,
+    timeout: Optional[float],
+    cancel: Optional[CancelHandle],
+    settings: Optional[Mapping[str, str]] = None,
+) -> Iterator[None]:
+    """Apply per-call session settings, timeout and cancel handle to `conn` (inside its transaction)."""
+    apply_session(conn, settings)
+    set_statement_timeout(conn, timeout)
+    if cancel is None:
+        yield
+        return
+    with cancel.attach(conn):
+        yield
@@ -0,0 +1,202 @@
+"""One catalog of named queries, fed by `mimiciii_db.registry` and `DB.register`.
+
+Each entry wraps a query function (returning `(sql, params)`) together
+with what `DB.run` needs to choose how to execute it: the relations it
+reads, its parameters, the expected result size, a cache policy and a
+preferred fetch mode. A `DB`'s catalog falls back to the package-wide
+`CATALOG`, so queries registered with the `registry` decorator run on
+every `DB`.
+"""
+
+from __future__ import annotations
+
+import inspect
+from collections.abc import MutableMapping
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Union
+
+import pandas as pd
+
+from .dtypes import DtypePolicy, resolve_policy
+from .session import Session, resolve_session
+
+QueryFn = Callable[..., tuple[str, Mapping[str, Any]]]
+
+# "auto" is a regular fetch: COPY and "stream" type some columns differently
+# (nullable Int32/boolean, float64 for numeric), so they are only used when asked for
+FETCH_MODES = ("auto", "regular", "copy", "stream", "prepared")
+# "all": memo and persistent cache, "memo": in-process memo only, "none": always fetch
+CACHE_POLICIES = ("auto", "all", "memo", "none")
+
+# Results below this many rows skip the persistent cache (its version check
+# costs about as much as refetching them).
+SMALL_ROWS = 1_000
+
+
+@dataclass
+class CatalogEntry:
+    """
+    A named query and its execution metadata.
+
+    Args:
+        name (str): Name the query is run by.
+        fn (callable): Returns `(sql, params)` for the given keyword arguments.
+        relations (frozenset of str): Relations the query reads; when empty they
+            are parsed from the SQL. Used to invalidate memoized results.
+        params (tuple of str): Parameter names, taken from `fn`'s signature.
+        expected_rows (int, optional): Expected result size; falls back to the
+            size of the last result.
+        cache (str): One of `CACHE_POLICIES`.
+        fetch (str): One of `FETCH_MODES`.
+        dtypes (DtypePolicy, optional): Default compact dtype policy.
+        session (str or dict, optional): Session profile to run with (see
+            `mimiciii_db.session.SESSION_PROFILES`).
+        description (str): First line of `fn`'s docstring.
+    """
+
+    name: str
+    fn: QueryFn
+    relations: frozenset[str] = frozenset()
+    params: tuple[str, ...] = ()
+    expected_rows: Optional[int] = None
+    cache: str = "auto"
+    fetch: str = "auto"
+    dtypes: Optional[DtypePolicy] = None
+    session: Session = None
+    description: str = ""
+    observed_rows: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.fetch not in FETCH_MODES:
+            raise ValueError(
+                f"Unknown fetch mode '{self.fetch}'; expected one of {FETCH_MODES}"
+            )
+        if self.cache not in CACHE_POLICIES:
+            raise ValueError(
+                f"Unknown cache policy '{self.cache}'; expected one of {CACHE_POLICIES}"
+            )
+        resolve_session(self.session)  # fail at registration on unknown profiles
+
+    def __call__(self, **kwargs: Any) -> tuple[str, Mapping[str, Any]]:
+        return self.fn(**kwargs)
+
+    @property
+    def size_hint(self) -> Optional[int]:
+        return (
+            self.expected_rows if self.expected_rows is not None else self.observed_rows
+        )
+
+    def plan(self) -> tuple[str, str]:
+        """The (fetch mode, cache policy) `DB.run` uses, with "auto" resolved."""
+        rows = self.size_hint
+        fetch = "regular" if self.fetch == "auto" else self.fetch
+        cache = self.cache
+        if cache == "auto":
+            cache = "memo" if rows is not None and rows < SMALL_ROWS else "all"
+        return fetch, cache
+
+
+def make_entry(
+    name: str,
+    fn: QueryFn,
+    relations: Optional[Iterable[str]] = None,
+    expected_rows: Optional[int] = None,
+    cache: str = "auto",
+    fetch: str = "auto",
+    dtypes: Union[DtypePolicy, str, None] = None,
+    session: Session = None,
+) -> CatalogEntry:
+    """Build an entry, reading the parameters and description off `fn`."""
+    try:
+        params = tuple(inspect.signature(fn).parameters)
+    except (TypeError, ValueError):  # builtins and some callables have no signature
+        params = ()
+    doc = inspect.getdoc(fn) or ""
+    return CatalogEntry(
+        name=name,
+        fn=fn,
+        relations=frozenset(relations or ()),
+        params=params,
+        expected_rows=expected_rows,
+        cache=cache,
+        fetch=fetch,
+        dtypes=resolve_policy(dtypes),
+        session=session,
+        description=doc.splitlines()[0] if doc else "",
+    )
+
+
+class QueryCatalog(MutableMapping):
+    """
+    Name -> `CatalogEntry` mapping that falls back to a parent catalog.
+
+    Assigning a bare query function (`catalog[name] = fn`) registers it with
+    default metadata, so code written against the old name -> function dicts
+    keeps working; entries are also callable like the functions they wrap.
+    """
+
+    def __init__(self, parent: Optional[QueryCatalog] = None):
+        self.parent = parent
+        self._entries: dict[str, CatalogEntry] = {}
+
+    def __getitem__(self, name: str) -> CatalogEntry:
+        if name in self._entries:
+            return self._entries[name]
+        if self.parent is not None:
+            return self.parent[name]
+        raise KeyError(name)
+
+    def __setitem__(self, name: str, value: Union[CatalogEntry, QueryFn]) -> None:
+        if not isinstance(value, CatalogEntry):
+            value = make_entry(name, value)
+        self._entries[name] = value
+
+    def __delitem__(self, name: str) -> None:
+        del self._entries[name]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._entries
+        if self.parent is not None:
+            yield from (n for n in self.parent if n not in self._entries)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def register(self, name: str, **meta: Any) -> Callable[[QueryFn], QueryFn]:
+        """Decorator adding a query function; `meta` are `make_entry` keyword arguments."""
+
+        def _decorator(fn: QueryFn) -> QueryFn:
+            self[name] = make_entry(name, fn, **meta)
+            return fn
+
+        return _decorator
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per query, with its metadata and the plan `DB.run` would use."""
+        rows = []
+        for name in self:
+            entry = self[name]
+            fetch, cache = entry.plan()
+            rows.append(
+                {
+                    "name": name,
+                    "params": ", ".join(entry.params),
+                    "relations": ", ".join(sorted(entry.relations)),
+                    "expected_rows": entry.expected_rows,
+                    "observed_rows": entry.observed_rows,
+                    "fetch": fetch,
+                    "cache": cache,
+                    "session": (
+                        entry.session
+                        if isinstance(entry.session, str)
+                        else ("custom" if entry.session else None)
+                    ),
+                    "scope": "local" if name in self._entries else "global",
+                    "description": entry.description,
+                }
+            )
+        return pd.DataFrame(rows)
+
+
+# package-wide catalog behind `mimiciii_db.registry`
+CATALOG = QueryCatalog()
@@ -1,20 +1,106 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Callable, Dict, Mapping, Optional
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Union
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
-from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.exc import DBAPIError, OperationalError, SQLAlchemyError
 
-QueryFn = Callable[..., tuple[str, Mapping[str, Any]]]
+from . import bulk, duck, export, parallel, prepared
+from .cache import ParquetCache, relation_versions
+from .cancel import CancelHandle, statement_guard
+from .catalog import CATALOG, QueryCatalog
+from .dtypes import DtypePolicy, concat_compact, resolve_policy
+from .explain import QueryProfile, parse_explain
+from .memo import QueryMemo
+from .metrics import QueryMetrics, mark_first_row, observe, paused
+from .pool import AdaptivePoolSizing, MonitoredQueuePool, monitor_pool, pool_stats
+from .routing import ReplicaRouter
+from .session import Session, apply_session, reset_session, resolve_session
+from .singleflight import SingleFlight
+from .sqlutil import (
+    build_select,
+    iter_statements,
+    referenced_relations,
+    split_statements,
+)
+
+# pd.DataFrame, pyarrow.Table or polars.DataFrame depending on `return_type`
+Frame = Any
+
+# A query for `DB.prefetch` / `AsyncDB.gather`: bare SQL, or (SQL, params)
+QuerySpec = Union[str, tuple[str, Optional[Mapping[str, Any]]]]
+
+# background fetches `DB.prefetch` runs at once (each holds a pooled connection)
+PREFETCH_WORKERS = 4
+_PREFETCH_LOCK = threading.Lock()
+
+# a possibly schema-qualified relation name, as opposed to a SQL statement
+_TABLE_NAME_RE = re.compile(r'^\s*[\w"]+(\.[\w"]+)?\s*$')
+
+
+def _distinct_keys(values: Iterable[Any]) -> list[Any]:
+    """Non-null `values` in first-seen order without duplicates, as Python scalars.
+
+    Going through a Series would turn integer keys into floats as soon as one
+    is missing, and a float array no longer matches an integer key's index.
+    """
+    keys = (v.item() if isinstance(v, np.generic) else v for v in values)
+    return list(dict.fromkeys(v for v in keys if not pd.isna(v)))
+
+
+def _read_checkpoint(path: str) -> Optional[dict[str, Any]]:
+    """State of a `run_sql_file` checkpoint, or None when there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_checkpoint(path: str, fp: str, completed: int, sha256: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(
+            {"file": os.path.abspath(fp), "completed": completed, "sha256": sha256}, f
+        )
+    os.replace(tmp, path)
 
 
 @dataclass
 class DB:
     engine: Engine
-    _registry: Dict[str, QueryFn]
+    _registry: QueryCatalog
+    cache: Optional[ParquetCache] = None
+    memo: Optional[QueryMemo] = None
+    metrics: Optional[QueryMetrics] = None
+    router: Optional[ReplicaRouter] = None
+    flights: Optional[SingleFlight] = None
+    _prefetcher: Optional[ThreadPoolExecutor] = field(
+        default=None, repr=False, compare=False
+    )
+    # per-thread engine that `_reader` is pinned to (see `_reading_from`)
+    _pinned: threading.local = field(
+        default_factory=threading.local, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        if not isinstance(self._registry, QueryCatalog):
+            # a plain name -> function dict; queries registered globally stay visible
+            catalog = QueryCatalog(parent=CATALOG)
+            catalog.update(self._registry)
+            self._registry = catalog
 
     # --- Factory constructor ---
     @classmethod
@@ -24,33 +110,153 @@ class DB:
         pool_size: int = 5,
         max_overflow: int = 10,
         pool_pre_ping: bool = True,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = 2 * 1024**3,
+        cache_ttl: Optional[float] = 24 * 3600,
+        memo_max_bytes: Optional[int] = None,
+        metrics_capacity: Optional[int] = 10_000,
+        pool_budget: Union[int, AdaptivePoolSizing, None] = None,
+        replica_urls: Optional[Sequence[str]] = None,
+        read_policy: str = "round_robin",
+        read_your_writes: float = 0.0,
+        single_flight: bool = True,
+        **kwargs: Any,
+    ) -> DB:
+        """
+        Create a DB object from a database URL.
+
+        Passing `cache_dir` turns on the persistent Parquet result cache for
+        `query_df` (bounded to `cache_max_bytes`, entries expire after `cache_ttl`
+        seconds, and are invalidated when a referenced relation changes).
+        Passing `memo_max_bytes` turns on the in-process result memo (see `memo_stats`).
+        The last `metrics_capacity` calls are instrumented (see `query_stats`);
+        pass None to turn instrumentation off.
+        Passing `pool_budget` (the most server connections this process may hold,
+        or an `AdaptivePoolSizing`) lets the pool grow its overflow while callers
+        wait for connections and shrink it again when idle (see `pool_stats`).
+        Passing `replica_urls` routes reads (`query_df`, `copy_df`, `iter_df`, ...)
+        to those read replicas, picked "round_robin" or "least_busy" per
+        `read_policy`, while writes stay on `url`; for `read_your_writes`
+        seconds after a write, reads go to the primary too.
+        Concurrent identical reads share one execution unless `single_flight`
+        is False (see `flight_stats`).
+        """
+        kwargs.setdefault("poolclass", MonitoredQueuePool)
+        if isinstance(pool_budget, int):
+            pool_budget = AdaptivePoolSizing(budget=pool_budget)
+        metrics = QueryMetrics(metrics_capacity) if metrics_capacity else None
+
+        def _engine(engine_url: str) -> Engine:
+            eng = create_engine(
+                engine_url,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_pre_ping=pool_pre_ping,
+                future=True,
+                connect_args={"options": "-csearch_path=mimiciii,public"},
+                **kwargs,
+            )
+            monitor_pool(eng, pool_budget)
+            if metrics is not None:
+                QueryMetrics.attach(eng)
+            return eng
+
+        eng = _engine(url)
+        router = None
+        if replica_urls:
+            router = ReplicaRouter(
+                eng, [_engine(u) for u in replica_urls], read_policy, read_your_writes
+            )
+        cache = None
+        if cache_dir:
+            cache = ParquetCache(cache_dir, cache_max_bytes, cache_ttl)
+        memo = QueryMemo(memo_max_bytes) if memo_max_bytes else None
+        return cls(
+            engine=eng,
+            _registry=QueryCatalog(parent=CATALOG),
+            cache=cache,
+            memo=memo,
+            metrics=metrics,
+            router=router,
+            flights=SingleFlight() if single_flight else None,
+        )
+
+    @classmethod
+    def from_parquet_dir(
+        cls,
+        path: str,
+        schema: str = "mimiciii",
+        threads: Optional[int] = None,
+        memory_limit: Optional[str] = None,
+        metrics_capacity: Optional[int] = 10_000,
         **kwargs: Any,
     ) -> DB:
-        """Create a DB object from a database URL."""
-        eng = create_engine(
-            url,
-            pool_size=pool_size,
-            max_overflow=max_overflow,
-            pool_pre_ping=pool_pre_ping,
-            future=True,
-            connect_args={"options": "-csearch_path=mimiciii,public"},
-            **kwargs,
+        """
+        Create a DB object on an embedded DuckDB over a directory of Parquet exports.
+
+        Each `<name>.parquet` file (or directory of Parquet files) in `path` is
+        exposed as the view `<schema>.<name>`, with `schema` first on the search
+        path, so `query_df`, `table_df`, `iter_df` and registered queries run
+        the same SQL as against Postgres, locally and column-at-a-time.
+        Postgres-only features (COPY, prepared statements, timeouts, profiling,
+        bulk loads, parallel reads, the result cache) are not available.
+
+        Example:
+            db = DB.from_parquet_dir("exports/mimiciii")
+            db.query_df("SELECT count(*) FROM elixhauser_quan")
+        """
+        eng = duck.parquet_engine(path, schema, threads, memory_limit, **kwargs)
+        metrics = QueryMetrics(metrics_capacity) if metrics_capacity else None
+        if metrics is not None:
+            QueryMetrics.attach(eng)
+        return cls(
+            engine=eng,
+            _registry=QueryCatalog(parent=CATALOG),
+            metrics=metrics,
+            flights=SingleFlight(),
         )
-        return cls(engine=eng, _registry={})
 
     # --- Core data operations ---
     def query_df(
-        self, sql: str, params: Optional[Mapping[str, Any]] = None
-    ) -> pd.DataFrame:
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]] = None,
+        copy: bool = False,
+        return_type: str = "pandas",
+        use_cache: bool = True,
+        dtypes: Union[DtypePolicy, str, None] = None,
+        prepare: bool = False,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelHandle] = None,
+        session: Session = None,
+    ) -> Frame:
         """
         Execute a parameterized SELECT query and return the result as a DataFrame.
 
         Args:
             sql (str): The SQL query string. Use named parameters (e.g. :param_name) for safe substitution.
             params (dict, optional): A dictionary of parameter names and values to bind to the query.
+            copy (bool): Fetch through `COPY ... TO STDOUT` instead of row-by-row (see `copy_df`).
+            return_type (str): "pandas" (default), "pandas_arrow" (Arrow-backed dtypes),
+                "arrow" (pyarrow.Table) or "polars". Anything but "pandas" is built from
+                columnar Arrow buffers through the COPY path.
+            use_cache (bool): Consult the in-process memo and persistent result cache
+                when they are configured.
+            dtypes (DtypePolicy or "compact", optional): Compact dtype policy applied chunk
+                by chunk during the fetch (0/1 flags -> int8/boolean, low-cardinality text
+                -> category, ids -> int32). Only for pandas results.
+            prepare (bool): Run as a server-side prepared statement, prepared once per
+                pooled connection, so repeated calls skip parsing and planning.
+            timeout (float, optional): Seconds the statement may run before the server
+                cancels it (`SET LOCAL statement_timeout`, so only this call is affected).
+            cancel (CancelHandle, optional): Handle through which another thread can
+                cancel the running statement.
+            session (str or dict, optional): Session profile ("bulk_build", "analytics",
+                "lookup", see `session.SESSION_PROFILES`) or settings to apply with
+                `SET LOCAL` for this call only.
 
         Returns:
-            pd.DataFrame: The query results as a DataFrame.
+            pd.DataFrame: The query results as a DataFrame (or the container named by `return_type`).
 
         Example:
             db.query_df(
@@ -58,72 +264,1117 @@ class DB:
                 {"since": "2024-01-01", "country": "US"}
             )
         """
+        policy = resolve_policy(dtypes)
+        if policy is not None and return_type != "pandas":
+            raise ValueError("dtypes policies only apply to return_type='pandas'")
+        with self._track(sql):
+            result = self._cached_query(
+                sql,
+                params,
+                copy,
+                return_type,
+                use_cache,
+                policy,
+                prepare,
+                timeout,
+                cancel,
+                session=resolve_session(session),
+            )
+            observe(result)
+        return result
+
+    def query_df_many(
+        self,
+        sql: str,
+        key: str = "hadm_id",
+        values: Iterable[Any] = (),
+        params: Optional[Mapping[str, Any]] = None,
+        chunk_size: int = 10_000,
+        **kwargs: Any,
+    ) -> Frame:
+        """
+        Look up many key values at once, binding each chunk of keys as one Postgres array.
+
+        Unless the SQL binds `:keys` itself (e.g. `JOIN unnest(CAST(:keys AS int[]))
+        AS k(hadm_id) USING (hadm_id)`), it is wrapped as
+        `SELECT * FROM (sql) AS _q WHERE key = ANY(:keys)`, which the planner pushes
+        down to an index on the key. Keys are de-duplicated and NULLs dropped; every
+        chunk of `chunk_size` keys costs one round trip.
+
+        Args:
+            sql (str): A SELECT whose output includes `key` (or that binds `:keys`).
+            key (str): Column the values are matched against.
+            values (array-like): The keys to look up (list, set, Series, ndarray, ...).
+            params (dict, optional): Other bind parameters of the query.
+            chunk_size (int): Most keys bound per round trip.
+            **kwargs: Passed on to `query_df` (`copy`, `return_type`, `dtypes`, ...).
+
+        Returns:
+            pd.DataFrame: The rows of all chunks (or the container named by `return_type`).
+
+        Example:
+            subgroups = pd.read_csv("lca_all_subgroups_relabeled.csv")
+            db.query_df_many("SELECT * FROM mimiciii.elixhauser_quan", "hadm_id", subgroups["hadm_id"])
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be a positive integer")
+        keys = _distinct_keys(values)
+        if "keys" not in prepared.to_positional(sql)[1]:
+            qkey = self.engine.dialect.identifier_preparer.quote(key)
+            sql = f"SELECT * FROM ({sql.strip().rstrip(';')}) AS _q WHERE {qkey} = ANY(:keys)"
+        chunks = [keys[i : i + chunk_size] for i in range(0, len(keys), chunk_size)]
+        with self._track(sql):
+            frames = [
+                self.query_df(sql, {**dict(params or {}), "keys": chunk}, **kwargs)
+                for chunk in chunks or [[]]
+            ]
+        if isinstance(frames[0], pd.DataFrame):
+            return concat_compact(frames)
+        return frames[0] if len(frames) == 1 else bulk.concat_results(frames)
+
+    def join_local(
+        self,
+        df: pd.DataFrame,
+        sql_or_table: str,
+        on: Union[str, Sequence[str]] = "hadm_id",
+        how: str = "inner",
+        columns: Optional[Sequence[str]] = None,
+        params: Optional[Mapping[str, Any]] = None,
+        name: str = "local_df",
+        copy: bool = False,
+        return_type: str = "pandas",
+        dtypes: Union[DtypePolicy, str, None] = None,
+    ) -> Frame:
+        """
+        Join a local DataFrame against the database server-side and fetch only the result.
+
+        The frame is copied (`COPY FROM STDIN`) into a temporary table `name`,
+        indexed on `on` and analyzed, and the query runs against it in the same
+        transaction, which is rolled back afterwards, so the temporary table never
+        outlives the call. Given a table or view name, the frame is joined to it
+        `USING (on)`. Given SQL, the SQL runs as written and refers to the frame
+        as `name`, so filters and aggregations also happen server-side.
+
+        Args:
+            df (pd.DataFrame): Local rows, e.g. a few columns of `hadm_id`s and labels.
+            sql_or_table (str): Table/view name ("mimiciii.morbidity_counts") or a SELECT.
+            on (str or list of str): Join column(s), also the temporary table's index.
+            how (str): "inner" or "left" (table form only).
+            columns (list of str, optional): Columns of the table to return next to the
+                frame's own (table form only; default all).
+            params (dict, optional): Bind parameters of the SQL.
+            name (str): Name of the temporary table.
+            copy (bool): Fetch the result through COPY (see `copy_df`).
+            return_type (str): "pandas", "pandas_arrow", "arrow" or "polars" (see `query_df`).
+            dtypes (DtypePolicy or "compact", optional): Compact dtype policy for the result.
+
+        Returns:
+            pd.DataFrame: The joined (or aggregated) rows (or the container named by `return_type`).
+
+        Example:
+            subgroups = pd.read_csv("data/lca_all_subgroups_relabeled.csv")
+            db.join_local(subgroups, "mimiciii.morbidity_counts", columns=["morbidity_count"])
+            db.join_local(subgroups, '''
+                SELECT l."subgroup_K6", avg(m.morbidity_count) AS mean_count
+                FROM local_df l JOIN mimiciii.morbidity_counts m USING (hadm_id)
+                GROUP BY 1
+            ''')
+        """
+        if how not in ("inner", "left"):
+            raise ValueError(f"Unknown join '{how}'; expected 'inner' or 'left'")
+        policy = resolve_policy(dtypes)
+        if policy is not None and return_type != "pandas":
+            raise ValueError("dtypes policies only apply to return_type='pandas'")
+        keys = [on] if isinstance(on, str) else list(on)
+        quote = self.engine.dialect.identifier_preparer.quote
+        sql = sql_or_table
+        if _TABLE_NAME_RE.match(sql_or_table):
+            right = ".".join(quote(part) for part in sql_or_table.strip().split("."))
+            picked = "*"
+            if columns is not None:
+                extra = [f"r.{quote(c)}" for c in columns if c not in keys]
+                picked = ", ".join(["l.*", *extra])
+            join = "JOIN" if how == "inner" else "LEFT JOIN"
+            sql = (
+                f"SELECT {picked} FROM {quote(name)} AS l {join} {right} AS r "
+                f"USING ({', '.join(quote(k) for k in keys)})"
+            )
+        try:
+            with self._track(sql), self.engine.connect() as conn:
+                trans = conn.begin()
+                try:
+                    conn.exec_driver_sql(
+                        bulk.create_table_sql(conn, df, name, temporary=True)
+                    )
+                    bulk.copy_from_frame(conn, df, name)
+                    bulk.create_indexes(conn, name, [tuple(keys)])
+                    conn.exec_driver_sql(f"ANALYZE {quote(name)}")
+                    if copy or return_type != "pandas":
+                        result = bulk.copy_query_df(conn, sql, params, return_type)
+                    else:
+                        result = pd.read_sql_query(text(sql), conn, params=params or {})
+                finally:
+                    trans.rollback()  # drops the temporary table
+                observe(result)
+        except (SQLAlchemyError, self.engine.dialect.dbapi.Error) as e:
+            raise RuntimeError(f"Database query failed: {e}")
+        return policy.apply(result) if policy is not None else result
+
+    def prefetch(
+        self,
+        queries: Union[Sequence[QuerySpec], Mapping[str, QuerySpec]],
+        **kwargs: Any,
+    ) -> Union[list[Future], dict[str, Future]]:
+        """
+        Start fetching queries on a background thread pool and return their futures.
+
+        Call this as early as possible with the inputs a script will need, do the
+        CPU work that does not depend on them, and call `.result()` where each is
+        needed; the fetches overlap that work and each other. Each runs as
+        `query_df` (or `run`, for a catalog name) with `kwargs`, so the memo,
+        result cache and single-flight apply: a `query_df` of the same query
+        issued while its prefetch is in flight waits for it instead of refetching.
+        At most `PREFETCH_WORKERS` fetches run at a time, each on its own pooled
+        connection.
+
+        Args:
+            queries (list or dict): SQL strings, catalog query names or (SQL or name,
+                params) tuples; a dict maps result names to them.
+            **kwargs: Passed to every `query_df`/`run` call (`copy`, `return_type`, `dtypes`, ...).
+
+        Returns:
+            list or dict: A `concurrent.futures.Future` per query, in the shape of
+            `queries`. `.result()` returns the frame or raises the query's error.
+
+        Example:
+            pending = db.prefetch({
+                "morbidity": "SELECT * FROM mimiciii.morbidity_counts",
+                "elix": "SELECT * FROM mimiciii.elixhauser_quan",
+            })
+            subgroups = pd.read_csv("data/lca_all_subgroups.csv")  # overlaps the fetches
+            morbidity = pending["morbidity"].result()
+        """
+        with _PREFETCH_LOCK:
+            if self._prefetcher is None:
+                self._prefetcher = ThreadPoolExecutor(
+                    PREFETCH_WORKERS, thread_name_prefix="mimiciii-prefetch"
+                )
+
+        def submit(spec: QuerySpec) -> Future:
+            query, params = (spec, None) if isinstance(spec, str) else spec
+            if query in self._registry:
+                return self._prefetcher.submit(
+                    self.run, query, **kwargs, **(params or {})
+                )
+            return self._prefetcher.submit(self.query_df, query, params, **kwargs)
+
+        if isinstance(queries, Mapping):
+            return {name: submit(spec) for name, spec in queries.items()}
+        return [submit(spec) for spec in queries]
+
+    def _cached_query(
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]],
+        copy: bool,
+        return_type: str,
+        use_cache: bool,
+        policy: Optional[DtypePolicy],
+        prepare: bool = False,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelHandle] = None,
+        relations: Optional[Iterable[str]] = None,
+        persist: bool = True,
+        session: Optional[Mapping[str, str]] = None,
+    ) -> Frame:
+        """
+        Serve a query from the memo / result cache, fetching and storing it on a miss.
+
+        Concurrent identical calls (same normalized SQL, parameters and options)
+        share one execution (see `flight_stats`), except calls with a cancel handle.
+        `relations` overrides the relations parsed from the SQL; `persist=False`
+        skips the persistent cache and only uses the memo. Results read from a
+        replica are returned but not stored, since the version stamp is the primary's.
+        """
+        args = (sql, params, copy, return_type, use_cache, policy, prepare, timeout)
+        if self.flights is None or cancel is not None:
+            return self._serve(*args, cancel, relations, persist, session)
+        variant = repr(args[2:] + (persist, session))
+        return self.flights.do(
+            QueryMemo.key(sql, params, variant),
+            lambda: self._serve(*args, None, relations, persist, session),
+        )
+
+    def _serve(
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]],
+        copy: bool,
+        return_type: str,
+        use_cache: bool,
+        policy: Optional[DtypePolicy],
+        prepare: bool,
+        timeout: Optional[float],
+        cancel: Optional[CancelHandle],
+        relations: Optional[Iterable[str]],
+        persist: bool,
+        session: Optional[Mapping[str, str]],
+    ) -> Frame:
+        cache = self.cache if persist else None
+        if not use_cache or (cache is None and self.memo is None):
+            return self._fetch(
+                sql,
+                params,
+                copy,
+                return_type,
+                policy,
+                prepare,
+                timeout,
+                cancel,
+                session,
+            )
+        variant = f"{return_type}/{'copy' if copy else 'regular'}/{policy!r}"
+        if self.memo is not None:
+            memo_key = self.memo.key(sql, params, variant)
+            result = self.memo.get(memo_key)
+            if result is not None:
+                return result
+        relations = set(relations) if relations else referenced_relations(sql)
+        try:
+            with self.engine.connect() as conn:
+                version = relation_versions(conn, relations)
+        except (SQLAlchemyError, OperationalError) as e:
+            raise RuntimeError(f"Database query failed: {e}")
+        result = None
+        if cache is not None:
+            key = cache.key(sql, params, version, variant)
+            result = cache.get(key, return_type)
+        if result is None:
+            reader = self._reader()
+            with self._reading_from(reader):
+                result = self._fetch(
+                    sql,
+                    params,
+                    copy,
+                    return_type,
+                    policy,
+                    prepare,
+                    timeout,
+                    cancel,
+                    session,
+                )
+            if reader is not self.engine:
+                # the version stamp is the primary's (replicas keep no write
+                # counters), and a lagging replica may have served older rows
+                return result
+            if cache is not None:
+                try:
+                    cache.put(key, result)
+                except (OSError, ValueError, TypeError) as e:
+                    # Not every frame is Parquet-serializable (e.g. mixed-type object columns)
+                    warnings.warn(f"Skipped caching query result: {e}", RuntimeWarning)
+        if self.memo is not None:
+            # also remember the base tables behind any views, so writes to them invalidate
+            self.memo.put(memo_key, result, relations | {row[0] for row in version})
+        return result
+
+    def flight_stats(self) -> Dict[str, int]:
+        """
+        Single-flight counters: `executions` run, calls `coalesced` onto another
+        call's execution (executions saved), failed `errors` and calls `in_flight`.
+        """
+        if self.flights is None:
+            return {}
+        return self.flights.stats()
+
+    def memo_stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction/invalidation counters of the in-process result memo."""
+        if self.memo is None:
+            return {}
+        return self.memo.stats()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Connection pool occupancy and telemetry.
+
+        Returns size, checked_out, idle, overflow and max_overflow; checkout
+        counts, timeouts and wait times (mean/p50/p95/max in ms plus a
+        `wait_histogram`); connects and their mean cost; pre-ping count, total
+        and mean cost and failures; and, with adaptive sizing, the budget and
+        how often the pool grew or shrank. With read replicas, their pools are
+        listed under "replicas".
+        """
+        stats = pool_stats(self.engine)
+        if self.router is not None:
+            stats["replicas"] = [pool_stats(eng) for eng in self.router.replicas]
+        return stats
+
+    def query_stats(self) -> pd.DataFrame:
+        """
+        Per-query timing summary of the recent calls, slowest total time first.
+
+        One row per SQL fingerprint (and registered name) with call and error
+        counts, p50/p95/p99 wall time, time to first row, mean pool wait, rows
+        and bytes returned. The raw records are exported with
+        `db.metrics.to_jsonl(path)` and `db.metrics.to_prometheus()`.
+        """
+        if self.metrics is None:
+            raise RuntimeError("Query metrics are disabled (metrics_capacity=None)")
+        return self.metrics.summary()
+
+    def profile(
+        self,
+        query: str,
+        params: Optional[Mapping[str, Any]] = None,
+        analyze: bool = True,
+        **kwargs: Any,
+    ) -> QueryProfile:
+        """
+        Profile a statement with `EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS)`.
+
+        Everything runs in a transaction that is rolled back, so profiling a
+        `CREATE MATERIALIZED VIEW ... AS` or DML changes nothing. For a script,
+        the last statement is explained and the ones before it (e.g. the
+        `DROP MATERIALIZED VIEW IF EXISTS`) run first as setup.
+
+        Args:
+            query (str): SQL text, or the name of a registered query.
+            params (dict, optional): Bind parameters for SQL text.
+            analyze (bool): Execute the statement for actual times, rows and
+                buffers; False only plans it (costs and estimates).
+            **kwargs: Arguments for the registered query function.
+
+        Returns:
+            QueryProfile: The plan tree; `str(profile)` is a text report of the
+            top nodes by self time and I/O plus findings (seq scans on big tables,
+            misestimated rows, sorts/hashes spilled to disk), `profile.to_frame()`
+            has one row per node.
+
+        Example:
+            print(db.profile(open("sapsii.sql").read()))
+            db.profile("cohort").top(5, by="shared_read")
+        """
+        if query in self._registry:
+            query, params = self._registry[query](**kwargs)
+        *setup, stmt = split_statements(query)
+        options = "FORMAT JSON, ANALYZE, BUFFERS" if analyze else "FORMAT JSON"
+        try:
+            with self._track(stmt), self.engine.connect() as conn:
+                trans = conn.begin()
+                try:
+                    for prior in setup:
+                        conn.execute(text(prior), params or {})
+                    raw = conn.execute(
+                        text(f"EXPLAIN ({options}) {stmt}"), params or {}
+                    ).scalar()
+                finally:
+                    trans.rollback()
+        except (SQLAlchemyError, OperationalError) as e:
+            raise RuntimeError(f"Database query failed: {e}")
+        return parse_explain(raw, stmt)
+
+    def _track(self, sql: str, name: Optional[str] = None):
+        """Instrument one call when metrics are enabled."""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.track(sql, name)
+
+    def _reader(self) -> Engine:
+        """Engine the next read should run on (a replica when routing is configured)."""
+        pinned = getattr(self._pinned, "engine", None)
+        if pinned is not None:
+            return pinned
+        return self.router.reader() if self.router is not None else self.engine
+
+    @contextmanager
+    def _reading_from(self, engine: Engine) -> Iterator[None]:
+        """Pin this thread's reads to `engine`, so the caller knows where they ran."""
+        previous = getattr(self._pinned, "engine", None)
+        self._pinned.engine = engine
+        try:
+            yield
+        finally:
+            self._pinned.engine = previous
+
+    def _invalidate(self, sql: str) -> None:
+        """Drop memoized results that read any relation the given SQL writes to."""
+        self._invalidate_relations(referenced_relations(sql))
+
+    def _invalidate_relations(self, relations: set[str]) -> None:
+        if self.memo is not None:
+            self.memo.invalidate(relations)
+        if self.router is not None:
+            self.router.wrote()
+
+    def _fetch(
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]],
+        copy: bool,
+        return_type: str,
+        policy: Optional[DtypePolicy] = None,
+        prepare: bool = False,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelHandle] = None,
+        session: Optional[Mapping[str, str]] = None,
+    ) -> Frame:
+        """Run the query against the database, bypassing any cache."""
+        if self.engine.dialect.name == "duckdb":
+            if timeout is not None or cancel is not None or session:
+                raise ValueError(
+                    "timeout, cancel and session need a PostgreSQL backend"
+                )
+            try:
+                with self.engine.connect() as conn:
+                    result = duck.query_native(conn, sql, params, return_type)
+            except (SQLAlchemyError, self.engine.dialect.dbapi.Error) as e:
+                raise RuntimeError(f"Database query failed: {e}")
+            return policy.apply(result) if policy is not None else result
+        if copy or return_type != "pandas":
+            result = self.copy_df(
+                sql,
+                params,
+                return_type=return_type,
+                timeout=timeout,
+                cancel=cancel,
+                session=session,
+            )
+            return policy.apply(result) if policy is not None else result
+        if prepare:
+            result = self._fetch_prepared(sql, params, timeout, cancel, session)
+            return policy.apply(result) if policy is not None else result
+        if policy is not None:
+            chunks = self.iter_df(
+                sql,
+                params,
+                dtypes=policy,
+                timeout=timeout,
+                cancel=cancel,
+                session=session,
+            )
+            return concat_compact(list(chunks))
         try:
-            with self.engine.begin() as conn:
+            with (
+                self._reader().begin() as conn,
+                statement_guard(conn, timeout, cancel, session),
+            ):
                 return pd.read_sql_query(text(sql), conn, params=params or {})
         except (SQLAlchemyError, OperationalError) as e:
             raise RuntimeError(f"Database query failed: {e}")
 
+    def _fetch_prepared(
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]],
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelHandle] = None,
+        session: Optional[Mapping[str, str]] = None,
+    ) -> pd.DataFrame:
+        """Fetch through a prepared statement, re-preparing once if the server lost it."""
+        try:
+            for attempt in range(2):
+                with (
+                    self._reader().begin() as conn,
+                    statement_guard(conn, timeout, cancel, session),
+                ):
+                    try:
+                        return prepared.execute_prepared(conn, sql, params)
+                    except DBAPIError as e:
+                        code = getattr(e.orig, "sqlstate", None) or getattr(
+                            e.orig, "pgcode", None
+                        )
+                        if attempt or code != prepared.INVALID_STATEMENT_NAME:
+                            raise
+                        prepared.forget(conn)
+        except (SQLAlchemyError, OperationalError) as e:
+            raise RuntimeError(f"Database query failed: {e}")
+
+    def copy_df(
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]] = None,
+        return_type: str = "pandas",
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelHandle] = None,
+        session: Session = None,
+    ) -> Frame:
+        """
+        Fetch a SELECT query in bulk through `COPY (query) TO STDOUT`.
+
+        The result is streamed as CSV and parsed in one pass into typed columns
+        (nullable integers, floats, booleans, datetimes), which avoids building a
+        Python object per cell. Parameters are rendered as SQL literals because
+        COPY does not accept bind parameters.
+
+        Args:
+            sql (str): A single SELECT statement. Use named parameters (e.g. :param_name).
+            params (dict, optional): A dictionary of parameter names and values to inline.
+            return_type (str): "pandas", "pandas_arrow", "arrow" or "polars" (see `query_df`).
+            timeout (float, optional): Statement timeout in seconds (see `query_df`).
+            cancel (CancelHandle, optional): Handle to cancel the running COPY with.
+            session (str or dict, optional): Session profile or settings (see `query_df`).
+
+        Returns:
+            pd.DataFrame: The query results as a DataFrame (or the container named by `return_type`).
+
+        Example:
+            db.copy_df("SELECT * FROM mimiciii.elixhauser_quan")
+        """
+        try:
+            with (
+                self._track(sql),
+                self._reader().begin() as conn,
+                statement_guard(conn, timeout, cancel, resolve_session(session)),
+            ):
+                result = bulk.copy_query_df(conn, sql, params, return_type)
+                mark_first_row()  # COPY hands over the whole result at once
+                observe(result)
+                return result
+        except (SQLAlchemyError, self.engine.dialect.dbapi.Error) as e:
+            raise RuntimeError(f"Database query failed: {e}")
+
+    def query_df_parallel(
+        self,
+        sql: str,
+        partition_key: str = "hadm_id",
+        partitions: int = 4,
+        params: Optional[Mapping[str, Any]] = None,
+        bounds: str = "auto",
+        copy: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Fetch a large SELECT as key-range slices read concurrently on separate connections.
+
+        A coordinator transaction exports its snapshot and every worker adopts it
+        (`SET TRANSACTION SNAPSHOT`), so the slices add up to one consistent
+        result. The slice boundaries come from the planner histogram in
+        `pg_stats` when the query reads a single analyzed relation, otherwise
+        from min/max of the key. Row order across slices is not preserved.
+
+        Args:
+            sql (str): A single SELECT statement whose output includes `partition_key`.
+            partition_key (str): Numeric output column to split the result on.
+            partitions (int): Number of slices, i.e. concurrent connections.
+            params (dict, optional): A dictionary of parameter names and values to bind to the query.
+            bounds (str): "auto", "histogram" or "minmax".
+            copy (bool): Fetch each slice through COPY (see `copy_df`); its parser
+                releases the GIL, so slices are also decoded in parallel.
+
+        Returns:
+            pd.DataFrame: The query results as a DataFrame.
+
+        Example:
+            db.query_df_parallel("SELECT * FROM mimiciii.sofa", partition_key="icustay_id", partitions=4)
+        """
+        if partitions < 1:
+            raise ValueError("partitions must be at least 1")
+        try:
+            with self._track(sql):
+                result = parallel.parallel_query_df(
+                    self._reader(), sql, partition_key, partitions, params, bounds, copy
+                )
+                observe(result)
+                return result
+        except (SQLAlchemyError, self.engine.dialect.dbapi.Error) as e:
+            raise RuntimeError(f"Database query failed: {e}")
+
+    def iter_df(
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]] = None,
+        chunksize: int = 50_000,
+        dtypes: Union[DtypePolicy, str, None] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelHandle] = None,
+        session: Session = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Stream a parameterized SELECT query as DataFrames of at most `chunksize` rows.
+
+        Rows are pulled through a server-side (named) cursor, so only one chunk is
+        held in memory at a time no matter how large the full result is.
+
+        Args:
+            sql (str): The SQL query string. Use named parameters (e.g. :param_name) for safe substitution.
+            params (dict, optional): A dictionary of parameter names and values to bind to the query.
+            chunksize (int): Maximum number of rows per yielded DataFrame.
+            dtypes (DtypePolicy or "compact", optional): Compact dtype policy applied to
+                every chunk; columns are classified once, on the first chunk.
+            timeout (float, optional): Statement timeout in seconds, applied to the
+                query and to every fetch from its cursor.
+            cancel (CancelHandle, optional): Handle to cancel the stream with.
+            session (str or dict, optional): Session profile or settings (see `query_df`).
+
+        Yields:
+            pd.DataFrame: Consecutive slices of the query result. An empty result
+            yields a single empty DataFrame carrying the column names.
+
+        Example:
+            for chunk in db.iter_df("SELECT * FROM chartevents WHERE itemid = :item", {"item": 211}):
+                process(chunk)
+        """
+        if chunksize <= 0:
+            raise ValueError("chunksize must be a positive integer")
+        policy = resolve_policy(dtypes)
+        settings = resolve_session(session)
+        plan = None
+        try:
+            with (
+                self._track(sql),
+                self._reader().connect() as conn,
+                statement_guard(conn, timeout, cancel, settings),
+            ):
+                result = conn.execution_options(
+                    stream_results=True, yield_per=chunksize
+                ).execute(text(sql), params or {})
+                columns = list(result.keys())
+                empty = True
+                for rows in result.partitions(chunksize):
+                    chunk = pd.DataFrame.from_records(
+                        rows, columns=columns, coerce_float=True
+                    )
+                    if policy is not None:
+                        plan = policy.plan(chunk) if plan is None else plan
+                        chunk = policy.apply(chunk, plan)
+                    if empty:
+                        mark_first_row()
+                        empty = False
+                    observe(chunk, accumulate=True)
+                    with (
+                        paused()
+                    ):  # the consumer's own queries are not part of this call
+                        yield chunk
+                if empty:
+                    yield pd.DataFrame(columns=columns)
+        except (SQLAlchemyError, OperationalError) as e:
+            raise RuntimeError(f"Database query failed: {e}")
+
+    stream = iter_df
+
     # --- Convenience methods ---
     def table_df(
-        self, table: str, limit: Optional[int] = 100, schema: Optional[str] = None
-    ) -> pd.DataFrame:
-        """Quickly preview a table."""
-        ident = f'"{schema}".{table}' if schema else table
-        sql = f"SELECT * FROM {ident}" + (f" LIMIT {int(limit)}" if limit else "")
-        return self.query_df(sql)
+        self,
+        table: str,
+        limit: Optional[int] = 100,
+        schema: Optional[str] = None,
+        return_type: str = "pandas",
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Mapping[str, Any]] = None,
+        order_by: Union[str, Sequence[str], None] = None,
+    ) -> Frame:
+        """
+        Read (part of) a table, projecting and filtering on the server.
 
-    # --- Named query registry ---
-    def register(self, name: str):
-        """Decorator to register a query function."""
+        Args:
+            table (str): Table or view name, optionally schema-qualified.
+            limit (int, optional): Maximum rows to return; None for all rows.
+            schema (str, optional): Schema of `table`.
+            return_type (str): Result container (see `query_df`).
+            columns (list, optional): Columns to select instead of `*`.
+            where (dict, optional): Column -> filter. A scalar means equality, None means
+                IS NULL, a list means membership (`= ANY(...)`), and an (operator, value)
+                tuple such as (">=", 65), ("ilike", "%sepsis%") or ("between", (lo, hi))
+                applies that operator. Values are always bound parameters.
+            order_by (str or list, optional): Sort columns; prefix with "-" for descending.
 
-        def _decorator(fn: QueryFn) -> QueryFn:
-            self._registry[name] = fn
-            return fn
+        Example:
+            db.table_df(
+                "filtered_patients_with_morbidity_counts", schema="mimiciii",
+                columns=["hadm_id", "age", "morbidity_count"],
+                where={"admission_type": ["EMERGENCY", "URGENT"], "age": (">=", 65)},
+                order_by="-morbidity_count", limit=None,
+            )
+        """
+        quote = self.engine.dialect.identifier_preparer.quote
+        ident = ".".join(quote(part) for part in table.split("."))
+        if schema:
+            ident = f"{quote(schema)}.{ident}"
+        sql, params = build_select(quote, ident, columns, where, order_by, limit)
+        return self.query_df(sql, params, return_type=return_type)
+
+    # --- Named query catalog ---
+    @property
+    def catalog(self) -> QueryCatalog:
+        """
+        The named queries this DB can run: its own plus those registered with
+        `mimiciii_db.registry`. `db.catalog.to_frame()` lists them with their
+        metadata and the execution plan `run` picks.
+        """
+        return self._registry
+
+    def register(
+        self,
+        name: str,
+        dtypes: Union[DtypePolicy, str, None] = None,
+        prepare: bool = False,
+        relations: Optional[Iterable[str]] = None,
+        expected_rows: Optional[int] = None,
+        cache: str = "auto",
+        fetch: str = "auto",
+        session: Session = None,
+    ):
+        """
+        Decorator to register a query function in this DB's catalog.
 
-        return _decorator
+        Args:
+            name (str): Name to `run` the query by.
+            dtypes (DtypePolicy or "compact", optional): Default dtype policy.
+            prepare (bool): Shorthand for `fetch="prepared"`; worth it for small
+                queries called many times with different parameters, such as
+                per-patient lookups (see `query_df(prepare=True)`).
+            relations (list of str, optional): Relations the query reads, when the
+                SQL alone does not tell (e.g. it calls functions over tables);
+                writes to them invalidate memoized results.
+            expected_rows (int, optional): Expected result size; steers the "auto"
+                cache policy. Without it the last result size is used.
+            cache (str): "auto", "all" (memo and persistent cache), "memo" or "none".
+            fetch (str): "auto" (same as "regular"), "regular", "copy", "stream"
+                (server-side cursor, bypasses the caches) or "prepared". "copy" is
+                faster for large results but returns nullable Int32/boolean and
+                float64-for-numeric columns (see `copy_df`).
+            session (str or dict, optional): Session profile to run the query with.
+        """
+        return self._registry.register(
+            name,
+            relations=relations,
+            expected_rows=expected_rows,
+            cache=cache,
+            fetch="prepared" if prepare else fetch,
+            dtypes=dtypes,
+            session=session,
+        )
 
-    def run(self, name: str, **kwargs: Any) -> pd.DataFrame:
-        """Execute a pre-registered query by name."""
+    def run(
+        self,
+        name: str,
+        return_type: str = "pandas",
+        dtypes: Union[DtypePolicy, str, None] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelHandle] = None,
+        session: Session = None,
+        **kwargs: Any,
+    ) -> Frame:
+        """
+        Execute a cataloged query by name (`dtypes` overrides the registered policy).
+
+        The fetch mode and cache policy come from the query's catalog entry; with
+        "auto", results under `catalog.SMALL_ROWS` rows (declared or seen on the
+        previous run) are only memoized, not written to the persistent cache. `timeout`, `cancel` and `session` (default: the entry's
+        profile) behave as in `query_df`; other keyword arguments go to the query
+        function.
+        """
         if name not in self._registry:
             raise KeyError(f"Query '{name}' not found.")
-        sql, params = self._registry[name](**kwargs)
-        return self.query_df(sql, params)
+        entry = self._registry[name]
+        sql, params = entry(**kwargs)
+        fetch, cache = entry.plan()
+        if dtypes is None and return_type == "pandas":
+            dtypes = entry.dtypes
+        policy = resolve_policy(dtypes)
+        if policy is not None and return_type != "pandas":
+            raise ValueError("dtypes policies only apply to return_type='pandas'")
+        settings = resolve_session(entry.session if session is None else session)
+        with self._track(sql, name):
+            if fetch == "stream" and return_type == "pandas":
+                chunks = self.iter_df(
+                    sql,
+                    params,
+                    dtypes=policy,
+                    timeout=timeout,
+                    cancel=cancel,
+                    session=settings,
+                )
+                result = concat_compact(list(chunks))
+            else:
+                result = self._cached_query(
+                    sql,
+                    params,
+                    fetch == "copy",
+                    return_type,
+                    cache != "none",
+                    policy,
+                    fetch == "prepared",
+                    timeout,
+                    cancel,
+                    relations=entry.relations,
+                    persist=cache == "all",
+                    session=settings,
+                )
+            observe(result)
+        entry.observed_rows = len(result)
+        return result
 
     # --- Resource cleanup ---
     def dispose(self) -> None:
-        """Close all connection pools."""
+        """Cancel pending prefetches and close all connection pools."""
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown(wait=True, cancel_futures=True)
+            self._prefetcher = None
         self.engine.dispose()
+        if self.router is not None:
+            for eng in self.router.replicas:
+                eng.dispose()
 
-    def run_sql_file(self, fp: str) -> None:
+    def run_sql_file(
+        self,
+        fp: str,
+        resume: bool = False,
+        single_transaction: bool = False,
+        checkpoint: Optional[str] = None,
+        verbose: bool = False,
+        session: Session = None,
+    ) -> pd.DataFrame:
         """
-        Execute a .sql file as if running '\i file.sql' in psql.
+        Execute a .sql file statement by statement, as psql's `\\i file.sql` does.
+
+        The file is read and split as it runs (see `sqlutil.iter_statements`), so
+        `;` inside quotes, comments and dollar-quoted function bodies is handled.
+        By default every statement commits on its own and, after each one, a
+        checkpoint (`<fp>.checkpoint`) records how far the script got; when a
+        statement fails, fix the cause and call again with `resume=True` to pick
+        up after the last statement that succeeded. The checkpoint is removed once
+        the whole file has run.
 
         Args:
             fp (str): Path to the SQL file.
-        """
-        try:
-            with open(fp, "r") as f:
-                sql_text = f.read()
-                
-            with self.engine.begin() as conn:
-                # Execute entire SQL script in one go (Postgres supports multi-statements)
-                conn.exec_driver_sql(sql_text)
+            resume (bool): Skip the statements a previous run completed. The skipped
+                statements must be unchanged since the checkpoint was written.
+            single_transaction (bool): Run every (remaining) statement in one
+                transaction, so a failure anywhere leaves the database untouched.
+            checkpoint (str, optional): Checkpoint file to use instead of `<fp>.checkpoint`.
+            verbose (bool): Print each statement's timing as it completes.
+            session (str or dict, optional): Session profile or settings for the whole
+                script (see `query_df`); `SET LOCAL` in the single transaction,
+                otherwise set for the connection and reset when the script ends.
 
-            print(f"Executed SQL file successfully: {fp}")
+        Returns:
+            pd.DataFrame: One row per statement: its number, starting line, status
+            ("ok" or "skipped"), seconds, rows affected (None for DDL) and first line.
 
+        Example:
+            db.run_sql_file("concepts_postgres/comorbidity/elixhauser_quan.sql")
+            # after a failure at statement 12, fix it and continue from there
+            db.run_sql_file("concepts_postgres/comorbidity/elixhauser_quan.sql", resume=True)
+        """
+        checkpoint = checkpoint or f"{fp}.checkpoint"
+        settings = resolve_session(session)
+        state = _read_checkpoint(checkpoint) if resume else None
+        if state and state.get("file") != os.path.abspath(fp):
+            raise RuntimeError(
+                f"checkpoint '{checkpoint}' was written for '{state.get('file')}', "
+                f"not '{fp}'; run without resume"
+            )
+        skip = state["completed"] if state else 0
+        digest = hashlib.sha256()  # of the statements run so far, to detect edits
+        report = []
+        written: set[str] = set()  # relations to invalidate once committed
+        begun = time.perf_counter()
+        try:
+            script = open(fp, "r")
         except FileNotFoundError:
             raise RuntimeError(f"SQL file not found: {fp}")
-        except Exception as e:
-            raise RuntimeError(f"Error executing SQL file '{fp}': {e}")
-        
+        try:
+            with script, self.engine.connect() as conn:
+                if not single_transaction:
+                    conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                trans = conn.begin()
+                apply_session(conn, settings, local=single_transaction)
+                try:
+                    for n, (line, stmt) in enumerate(iter_statements(script), 1):
+                        digest.update(stmt.encode() + b"\0")
+                        summary = stmt.lstrip().splitlines()[0][:80]
+                        if n <= skip:
+                            if n == skip and digest.hexdigest() != state["sha256"]:
+                                raise RuntimeError(
+                                    f"Error executing SQL file '{fp}': "
+                                    f"the first {skip} statements changed since the "
+                                    f"checkpoint was written; run without resume"
+                                )
+                            report.append((n, line, "skipped", 0.0, None, summary))
+                            continue
+                        started = time.perf_counter()
+                        try:
+                            with self._track(stmt):
+                                result = conn.exec_driver_sql(stmt)
+                                affected = result.rowcount
+                                result.close()
+                        except (SQLAlchemyError, OperationalError) as e:
+                            raise RuntimeError(
+                                f"Error executing SQL file '{fp}': "
+                                f"statement {n} (line {line}) failed: {e}"
+                            ) from e
+                        seconds = time.perf_counter() - started
+                        rows = (
+                            affected if affected is not None and affected >= 0 else None
+                        )
+                        report.append((n, line, "ok", seconds, rows, summary))
+                        if verbose:
+                            print(
+                                f"[{n}] line {line}: {seconds:.2f}s, {rows} rows  {summary}"
+                            )
+                        if single_transaction:
+                            written |= referenced_relations(stmt)
+                        else:
+                            self._invalidate(stmt)
+                            _write_checkpoint(checkpoint, fp, n, digest.hexdigest())
+                    if len(report) < skip:
+                        raise RuntimeError(
+                            f"Error executing SQL file '{fp}': "
+                            f"the file has {len(report)} statements but the checkpoint "
+                            f"recorded {skip}; run without resume"
+                        )
+                finally:
+                    # settings made for the connection must not outlive the script
+                    if not single_transaction:
+                        reset_session(conn, settings)
+                trans.commit()
+        except (SQLAlchemyError, OperationalError, OSError) as e:
+            # connecting, committing or reading the file (statement errors are wrapped above)
+            raise RuntimeError(f"Error executing SQL file '{fp}': {e}") from e
+        if single_transaction:
+            self._invalidate_relations(written)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        ran = sum(1 for r in report if r[2] == "ok")
+        print(
+            f"Executed SQL file successfully: {fp} "
+            f"({ran} statements in {time.perf_counter() - begun:.1f}s)"
+        )
+        return pd.DataFrame(
+            report,
+            columns=["statement", "line", "status", "seconds", "rows", "sql"],
+        )
+
     from sqlalchemy import text
 
-    def execute(self, sql: str, params: Optional[Mapping[str, Any]] = None) -> None:
-        """Execute a non-SELECT SQL statement (DDL/DML) and commit."""
+    def execute(
+        self,
+        sql: str,
+        params: Optional[Mapping[str, Any]] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelHandle] = None,
+        session: Session = None,
+    ) -> None:
+        """
+        Execute a non-SELECT SQL statement (DDL/DML) and commit.
+
+        A statement stopped by `timeout` (seconds) or through `cancel` is rolled back.
+        `session` applies a session profile to the transaction, e.g. "bulk_build"
+        for materialized-view builds (see `query_df`).
+        """
         try:
-            with self.engine.begin() as conn:
+            with (
+                self._track(sql),
+                self.engine.begin() as conn,
+                statement_guard(conn, timeout, cancel, resolve_session(session)),
+            ):
                 conn.execute(text(sql), params or {})
         except (SQLAlchemyError, OperationalError) as e:
             raise RuntimeError(f"Database execute failed: {e}")
+        self._invalidate(sql)
+
+    def bulk_load(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        mode: str = "create",
+        indexes: Optional[Sequence[Union[str, Sequence[str]]]] = None,
+    ) -> int:
+        """
+        Write a DataFrame to a table through `COPY ... FROM STDIN`.
+
+        Column types are derived from the DataFrame dtypes; the DataFrame index is
+        not written (call `reset_index()` first to keep it). Everything runs in a
+        single transaction, so a failed load leaves the table untouched.
+
+        Args:
+            df (pd.DataFrame): The rows to load.
+            table (str): Target table, optionally schema-qualified ("mimiciii.lca_subgroups").
+            mode (str): "create" (table must not exist), "append" (table must exist)
+                or "replace" (drop and recreate).
+            indexes (list, optional): Columns to index after loading; each entry is a
+                column name or a tuple of column names for a composite index.
+
+        Returns:
+            int: Number of rows loaded.
+
+        Example:
+            db.bulk_load(subgroups_df, "mimiciii.lca_all_subgroups_relabeled",
+                         mode="replace", indexes=["hadm_id"])
+        """
+        if mode not in ("create", "append", "replace"):
+            raise ValueError(
+                f"Unknown mode '{mode}'; expected 'create', 'append' or 'replace'"
+            )
+        try:
+            with self._track(f"COPY {table} FROM STDIN"), self.engine.begin() as conn:
+                observe(df)
+                if mode == "replace":
+                    conn.exec_driver_sql(
+                        f"DROP TABLE IF EXISTS {bulk.quote_table(conn, table)}"
+                    )
+                if mode in ("create", "replace"):
+                    conn.exec_driver_sql(bulk.create_table_sql(conn, df, table))
+                n_rows = bulk.copy_from_frame(conn, df, table)
+                if indexes:
+                    bulk.create_indexes(conn, table, indexes)
+                conn.exec_driver_sql(f"ANALYZE {bulk.quote_table(conn, table)}")
+            if self.memo is not None:
+                self.memo.invalidate([table])
+            if self.router is not None:
+                self.router.wrote()
+            return n_rows
+        except (SQLAlchemyError, self.engine.dialect.dbapi.Error) as e:
+            raise RuntimeError(f"Database bulk load failed: {e}")
 
+    def export_parquet(
+        self,
+        directory: str,
+        relations: Optional[Sequence[str]] = None,
+        schema: str = "mimiciii",
+        workers: int = 4,
+        rows_per_file: int = 5_000_000,
+        incremental: bool = True,
+        **kwargs: Any,
+    ) -> pd.DataFrame:
+        """
+        Export tables and derived views to zstd-compressed Parquet for `from_parquet_dir`.
+
+        All relations are read from one snapshot through parallel COPY streams.
+        Large relations are split into key-range partition files. `manifest.json`
+        records row counts, SHA-256 checksums and the version stamp of every
+        relation, and with `incremental=True` relations whose stamp is unchanged
+        are skipped.
+
+        Args:
+            directory (str): Export directory (created if missing).
+            relations (list of str, optional): Relation names in `schema`; defaults to
+                the base tables and derived views in `export.DEFAULT_RELATIONS`.
+            schema (str): Schema the relations live in.
+            workers (int): Concurrent COPY streams.
+            rows_per_file (int): Relations estimated larger than this are partitioned.
+            incremental (bool): Only re-export relations whose version changed.
+            **kwargs: `partition_key` (default "subject_id") and `compression`
+                (default "zstd").
+
+        Returns:
+            pd.DataFrame: One row per relation with status ("exported", "unchanged",
+            "missing"), rows, files and bytes.
+
+        Example:
+            db.export_parquet("exports/mimiciii")
+            offline = DB.from_parquet_dir("exports/mimiciii")
+        """
+        try:
+            return export.export_parquet(
+                self.engine,
+                directory,
+                relations,
+                schema,
+                workers,
+                rows_per_file,
+                incremental=incremental,
+                **kwargs,
+            )
+        except (SQLAlchemyError, self.engine.dialect.dbapi.Error) as e:
+            raise RuntimeError(f"Parquet export failed: {e}")
@@ -0,0 +1,175 @@
+"""Compact dtype policies applied while a result is being fetched.
+
+The cohort tables are dominated by 0/1 Elixhauser flags (int64, or float64
+once a LEFT JOIN introduces NULLs), low-cardinality text such as `gender`,
+`admission_type` and `age_bin` (Python objects), and integer ids (int64).
+A `DtypePolicy` maps those to `int8`/`boolean`, `category` and `int32`.
+`DB.query_df` applies it chunk by chunk as rows arrive, so the wide
+intermediate frame never exists in full.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+_INT8_MIN, _INT8_MAX = -(2**7), 2**7 - 1
+_INT32_MIN, _INT32_MAX = -(2**31), 2**31 - 1
+
+
+def _fits(values: pd.Series, lo: int, hi: int) -> bool:
+    """Whether non-null `values` are whole numbers within [lo, hi], i.e. cast without wrapping."""
+    if len(values) == 0:
+        return True
+    if pd.api.types.is_bool_dtype(values):
+        return True
+    if pd.api.types.is_float_dtype(values) and not bool((values % 1 == 0).all()):
+        return False
+    return lo <= values.min() and values.max() <= hi
+
+
+@dataclass(frozen=True)
+class DtypePolicy:
+    """
+    Which columns to compact, and into what.
+
+    Leaving `flags`, `categories` or `ids` as None lets the policy detect them
+    from the first chunk of the result:
+
+    - flags: numeric/bool columns whose non-null values are all 0 or 1
+    - categories: text columns with at most `max_categories` distinct values
+    - ids: integer columns named `id` / `*_id` whose values fit in int32
+
+    Pass an explicit (possibly empty) tuple to pin or disable a rule.
+
+    Args:
+        flags (tuple, optional): Columns holding 0/1 flags.
+        categories (tuple, optional): Columns to store as `category`.
+        ids (tuple, optional): Integer id columns to store as `int32`.
+        flag_dtype (str): "int8" or "boolean". Columns with NULLs use the nullable
+            variant ("Int8"); a "boolean" flag holding other values falls back to "Int8".
+        max_categories (int): Cardinality cap for auto-detected categories.
+    """
+
+    flags: Optional[tuple[str, ...]] = None
+    categories: Optional[tuple[str, ...]] = None
+    ids: Optional[tuple[str, ...]] = None
+    flag_dtype: str = "int8"
+    max_categories: int = 64
+
+    def plan(self, df: pd.DataFrame) -> dict[str, str]:
+        """Resolve the policy against a sample chunk: column -> target kind."""
+        plan: dict[str, str] = {}
+        for col in df.columns:
+            s = df[col]
+            if self._is_flag(col, s):
+                plan[col] = "flag"
+            elif self._is_category(col, s):
+                plan[col] = "category"
+            elif self._is_id(col, s):
+                plan[col] = "id"
+        return plan
+
+    def _is_flag(self, col: str, s: pd.Series) -> bool:
+        if self.flags is not None:
+            return col in self.flags
+        if not (pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s)):
+            return False
+        values = s.dropna()
+        return len(values) > 0 and bool(values.isin([0, 1]).all())
+
+    def _is_category(self, col: str, s: pd.Series) -> bool:
+        if self.categories is not None:
+            return col in self.categories
+        if not (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)):
+            return False
+        values = s.dropna()
+        if len(values) == 0 or not values.map(type).eq(str).all():
+            return False
+        return values.nunique() <= min(self.max_categories, max(1, len(values) // 2))
+
+    def _is_id(self, col: str, s: pd.Series) -> bool:
+        if self.ids is not None:
+            return col in self.ids
+        name = str(col).lower()
+        return (name == "id" or name.endswith("_id")) and (
+            pd.api.types.is_integer_dtype(s)
+            or (pd.api.types.is_float_dtype(s) and bool((s.dropna() % 1 == 0).all()))
+        )
+
+    def apply(
+        self, df: pd.DataFrame, plan: Optional[dict[str, str]] = None
+    ) -> pd.DataFrame:
+        """Cast one chunk according to `plan` (resolved from `df` itself when omitted)."""
+        plan = self.plan(df) if plan is None else plan
+        casts = {}
+        for col, kind in plan.items():
+            if col not in df.columns:
+                continue
+            s = df[col]
+            has_na = bool(s.isna().any())
+            if kind == "flag":
+                values = s.dropna()
+                target = self.flag_dtype
+                if target == "boolean" and not bool(values.isin([0, 1]).all()):
+                    target = "Int8"
+                # the plan comes from the first chunk; later chunks may not fit int8
+                if target != "boolean" and not _fits(values, _INT8_MIN, _INT8_MAX):
+                    continue
+                casts[col] = "Int8" if target == "int8" and has_na else target
+            elif kind == "category":
+                casts[col] = "category"
+            elif kind == "id":
+                if not _fits(s.dropna(), _INT32_MIN, _INT32_MAX):
+                    continue
+                casts[col] = "Int32" if has_na else "int32"
+        return df.astype(casts) if casts else df
+
+
+def resolve_policy(
+    dtypes: Union[DtypePolicy, str, None],
+) -> Optional[DtypePolicy]:
+    """Accept a DtypePolicy, "compact" (the auto-detecting default policy) or None."""
+    if dtypes is None or isinstance(dtypes, DtypePolicy):
+        return dtypes
+    if dtypes == "compact":
+        return DtypePolicy()
+    raise ValueError(
+        f"Unknown dtype policy '{dtypes}'; expected a DtypePolicy or 'compact'"
+    )
+
+
+def concat_compact(chunks: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate compacted chunks, unioning categories so they stay `category`."""
+    if len(chunks) == 1:
+        return chunks[0]
+    cat_cols = [
+        col
+        for col in chunks[0].columns
+        if all(isinstance(c[col].dtype, pd.CategoricalDtype) for c in chunks)
+    ]
+    out = pd.concat(chunks, ignore_index=True)
+    for col in cat_cols:
+        out[col] = union_categoricals([c[col] for c in chunks])
+    return out
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Per-column dtype and deep memory usage of two versions of the same frame."""
+    report = pd.DataFrame(
+        {
+            "dtype_before": before.dtypes.astype(str),
+            "bytes_before": before.memory_usage(deep=True, index=False),
+            "dtype_after": after.dtypes.astype(str),
+            "bytes_after": after.memory_usage(deep=True, index=False),
+        }
+    )
+    report.loc["TOTAL", ["bytes_before", "bytes_after"]] = [
+        report["bytes_before"].sum(),
+        report["bytes_after"].sum(),
+    ]
+    report["ratio"] = report["bytes_before"] / report["bytes_after"]
+    return report
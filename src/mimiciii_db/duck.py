@@ -0,0 +1,105 @@
+"""Embedded DuckDB backend over a directory of Parquet exports.
+
+Every `<name>.parquet` file (or `<name>/` directory of Parquet files, read
+as one hive-partitioned dataset) in the directory becomes a view
+`<schema>.<name>`, so SQL written against the Postgres `mimiciii` schema
+runs unchanged. The views are created on each new DuckDB connection. They
+only reference the files, so nothing is loaded until a query reads it.
+
+Results are fetched through DuckDB's own columnar converters (`.df()` and
+`.arrow()`) rather than row by row through the DBAPI.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Mapping, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+
+from .bulk import from_arrow
+from .prepared import to_positional
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def parquet_relations(path: str) -> dict[str, str]:
+    """Map relation names to the `read_parquet(...)` source for each export in `path`."""
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Parquet directory not found: {path}")
+    sources = {}
+    for entry in sorted(os.listdir(path)):
+        if entry.startswith("."):  # e.g. an export still being staged
+            continue
+        full = os.path.abspath(os.path.join(path, entry))
+        if entry.endswith(".parquet") and os.path.isfile(full):
+            sources[entry[: -len(".parquet")]] = f"read_parquet({_literal(full)})"
+        elif os.path.isdir(full) and any(
+            f.endswith(".parquet") for _, _, files in os.walk(full) for f in files
+        ):
+            pattern = os.path.join(full, "**", "*.parquet")
+            sources[entry] = (
+                f"read_parquet({_literal(pattern)}, hive_partitioning = true)"
+            )
+    return sources
+
+
+def parquet_engine(
+    path: str,
+    schema: str = "mimiciii",
+    threads: Optional[int] = None,
+    memory_limit: Optional[str] = None,
+    **kwargs: Any,
+) -> Engine:
+    """
+    An in-memory DuckDB engine with a view per Parquet export in `path`.
+
+    Args:
+        path (str): Directory holding the exports.
+        schema (str): Schema the views are created in; it is put first on the search path.
+        threads (int, optional): DuckDB worker threads (default: one per core).
+        memory_limit (str, optional): DuckDB memory limit, e.g. "8GB".
+    """
+    sources = parquet_relations(path)
+    if not sources:
+        raise ValueError(f"No Parquet files found in {path}")
+    settings = {}
+    if threads is not None:
+        settings["threads"] = threads
+    if memory_limit is not None:
+        settings["memory_limit"] = memory_limit
+    eng = create_engine(
+        "duckdb:///:memory:", connect_args={"config": settings}, **kwargs
+    )
+
+    @event.listens_for(eng, "connect")
+    def _create_views(dbapi_connection: Any, _record: Any) -> None:
+        dbapi_connection.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        for name, source in sources.items():
+            dbapi_connection.execute(
+                f'CREATE OR REPLACE VIEW "{schema}"."{name}" AS SELECT * FROM {source}'
+            )
+        dbapi_connection.execute(f"SET search_path = {_literal(schema + ',main')}")
+
+    return eng
+
+
+def query_native(
+    conn: Connection,
+    sql: str,
+    params: Optional[Mapping[str, Any]] = None,
+    return_type: str = "pandas",
+) -> Any:
+    """Run `sql` on DuckDB and convert the result with its columnar fetchers."""
+    duck_sql, names = to_positional(sql)
+    args = [params[n] for n in names] if names else None
+    result = conn.connection.driver_connection.execute(duck_sql, args)
+    if return_type == "pandas":
+        return result.df()
+    table = result.arrow()
+    if hasattr(table, "read_all"):  # newer DuckDB hands back a RecordBatchReader
+        table = table.read_all()
+    return from_arrow(table, return_type)
@@ -0,0 +1,253 @@
+"""Parsing and reporting of `EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS)` output.
+
+The JSON plan is turned into a tree of `PlanNode`s with *self* time and I/O
+(Postgres reports both inclusive of child nodes), and checked for the usual
+suspects behind slow materialized views: sequential scans over the big event
+tables, row estimates that are far off, and sorts/hashes that spilled to disk.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional, Union
+
+import pandas as pd
+
+# MIMIC-III tables large enough that a full scan is worth a second look
+BIG_TABLES = {
+    "chartevents",
+    "labevents",
+    "noteevents",
+    "inputevents_cv",
+    "inputevents_mv",
+    "outputevents",
+    "datetimeevents",
+    "procedureevents_mv",
+    "microbiologyevents",
+}
+
+_BUFFER_KEYS = {
+    "shared_hit": "Shared Hit Blocks",
+    "shared_read": "Shared Read Blocks",
+    "temp_read": "Temp Read Blocks",
+    "temp_written": "Temp Written Blocks",
+}
+
+
+@dataclass
+class PlanNode:
+    node_type: str
+    relation: Optional[str]
+    est_rows: float
+    total_cost: float
+    actual_rows: Optional[float]
+    loops: int
+    total_ms: Optional[float]  # inclusive, summed over loops
+    self_ms: Optional[float]
+    io: dict[str, int]  # self blocks per _BUFFER_KEYS entry
+    detail: dict[str, Any]  # the raw node, without "Plans"
+    children: list[PlanNode] = field(default_factory=list)
+    depth: int = 0
+    under_limit: bool = False  # a Limit above may stop this node early
+    flags: list[str] = field(default_factory=list)
+
+    def walk(self) -> Iterator[PlanNode]:
+        """This node and all its descendants, depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    @property
+    def label(self) -> str:
+        return (
+            f"{self.node_type} on {self.relation}" if self.relation else self.node_type
+        )
+
+
+def _build(
+    raw: dict[str, Any], depth: int, processes: int = 1, under_limit: bool = False
+) -> PlanNode:
+    node_type = raw["Node Type"]
+    if node_type in ("Gather", "Gather Merge"):
+        # below a Gather every process runs the subtree; times are per-process averages
+        child_processes = int(raw.get("Workers Launched", 0)) + 1
+    else:
+        child_processes = processes
+    children = [
+        _build(p, depth + 1, child_processes, under_limit or node_type == "Limit")
+        for p in raw.get("Plans", [])
+    ]
+    loops = int(raw.get("Actual Loops", 1) or 1)
+    total_ms = None
+    if "Actual Total Time" in raw:
+        # wall-clock estimate: loops are spread over the parallel processes
+        total_ms = raw["Actual Total Time"] * max(1.0, loops / processes)
+    relation = raw.get("Relation Name")
+    if relation and raw.get("Schema"):
+        relation = f"{raw['Schema']}.{relation}"
+    io = {
+        name: int(raw.get(key, 0)) - sum(int(c.detail.get(key, 0)) for c in children)
+        for name, key in _BUFFER_KEYS.items()
+    }
+    self_ms = None
+    if total_ms is not None:
+        self_ms = max(0.0, total_ms - sum(c.total_ms or 0.0 for c in children))
+    return PlanNode(
+        node_type=node_type,
+        relation=relation,
+        est_rows=raw.get("Plan Rows", 0),
+        total_cost=raw.get("Total Cost", 0.0),
+        actual_rows=raw.get("Actual Rows"),
+        loops=loops,
+        total_ms=total_ms,
+        self_ms=self_ms,
+        io={k: max(0, v) for k, v in io.items()},
+        detail={k: v for k, v in raw.items() if k != "Plans"},
+        children=children,
+        depth=depth,
+        under_limit=under_limit,
+    )
+
+
+def _flag(
+    node: PlanNode, big_rows: int, misestimate_factor: float, min_rows: int
+) -> list[str]:
+    d = node.detail
+    flags = []
+    if node.node_type == "Seq Scan":
+        base = (node.relation or "").rsplit(".", 1)[-1]
+        scanned = None
+        if node.actual_rows is not None:
+            scanned = (
+                node.actual_rows + d.get("Rows Removed by Filter", 0)
+            ) * node.loops
+        if base in BIG_TABLES or (scanned or node.est_rows) >= big_rows:
+            flags.append("seq scan on big table")
+    if node.actual_rows is not None:
+        actual, est = node.actual_rows, node.est_rows
+        ratio = max(actual, 1) / max(est, 1)
+        early_stop = node.under_limit and actual < est
+        if (
+            not early_stop
+            and max(actual, est) * node.loops >= min_rows
+            and (ratio >= misestimate_factor or ratio <= 1 / misestimate_factor)
+        ):
+            flags.append(f"rows misestimated (est {est:g}, actual {actual:g})")
+    if d.get("Sort Space Type") == "Disk":
+        flags.append(f"sort spilled to disk ({d.get('Sort Space Used', '?')} kB)")
+    if d.get("Hash Batches", 1) > 1:
+        flags.append(f"hash spilled ({d['Hash Batches']} batches)")
+    if d.get("HashAgg Batches", 1) > 1 or d.get("Disk Usage", 0) > 0:
+        flags.append("hash aggregate spilled to disk")
+    return flags
+
+
+@dataclass
+class QueryProfile:
+    """
+    A parsed plan with per-node self time/I/O and findings.
+
+    `str(profile)` gives the text summary; `to_frame()` one row per node.
+    """
+
+    sql: str
+    root: PlanNode
+    planning_ms: Optional[float]
+    execution_ms: Optional[float]
+    analyzed: bool
+
+    def nodes(self) -> list[PlanNode]:
+        return list(self.root.walk())
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per plan node, in plan order."""
+        rows = []
+        for i, n in enumerate(self.root.walk()):
+            rows.append(
+                {
+                    "node_id": i,
+                    "depth": n.depth,
+                    "node": n.node_type,
+                    "relation": n.relation,
+                    "self_ms": n.self_ms,
+                    "total_ms": n.total_ms,
+                    "est_rows": n.est_rows,
+                    "actual_rows": n.actual_rows,
+                    "loops": n.loops,
+                    "total_cost": n.total_cost,
+                    **n.io,
+                    "flags": "; ".join(n.flags),
+                }
+            )
+        return pd.DataFrame(rows)
+
+    def top(self, n: int = 10, by: str = "self_ms") -> pd.DataFrame:
+        """The `n` most expensive nodes by `by` (e.g. "self_ms", "shared_read", "temp_written")."""
+        df = self.to_frame()
+        if by == "self_ms" and not self.analyzed:
+            by = "total_cost"
+        return df.sort_values(by, ascending=False).head(n)
+
+    def findings(self) -> list[str]:
+        return [f"{n.label}: {flag}" for n in self.root.walk() for flag in n.flags]
+
+    def summary(self, top: int = 10) -> str:
+        lines = []
+        if self.analyzed:
+            lines.append(
+                f"Execution {self.execution_ms:.1f} ms, planning {self.planning_ms:.1f} ms"
+            )
+        by = "self_ms" if self.analyzed else "total_cost"
+        lines.append(f"Top nodes by {by}:")
+        for row in self.top(top, by).itertuples():
+            cost = (
+                f"{row.self_ms:10.1f} ms"
+                if self.analyzed
+                else f"{row.total_cost:12.0f}"
+            )
+            where = f" on {row.relation}" if row.relation else ""
+            io = (
+                f"  read {row.shared_read} hit {row.shared_hit} temp {row.temp_written}"
+            )
+            lines.append(f"  #{row.node_id:<3} {cost}  {row.node}{where}{io}")
+        findings = self.findings()
+        lines.append("Findings:" if findings else "Findings: none")
+        lines += [f"  - {f}" for f in findings]
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.summary()
+
+
+def parse_explain(
+    raw: Union[str, list, dict],
+    sql: str = "",
+    big_rows: int = 500_000,
+    misestimate_factor: float = 10.0,
+    min_rows: int = 1_000,
+) -> QueryProfile:
+    """
+    Build a `QueryProfile` from `EXPLAIN (FORMAT JSON ...)` output.
+
+    Args:
+        raw: The JSON document (string or already decoded).
+        sql (str): The statement that was explained, kept for reference.
+        big_rows (int): A Seq Scan reading at least this many rows is flagged
+            even outside `BIG_TABLES`.
+        misestimate_factor (float): Flag nodes whose actual rows differ from the
+            estimate by this factor or more...
+        min_rows (int): ...when at least this many rows were involved.
+    """
+    doc = json.loads(raw) if isinstance(raw, str) else raw
+    top = doc[0] if isinstance(doc, list) else doc
+    root = _build(top["Plan"], 0)
+    for node in root.walk():
+        node.flags = _flag(node, big_rows, misestimate_factor, min_rows)
+    return QueryProfile(
+        sql=sql,
+        root=root,
+        planning_ms=top.get("Planning Time"),
+        execution_ms=top.get("Execution Time"),
+        analyzed="Execution Time" in top,
+    )
@@ -0,0 +1,275 @@
+"""Parquet snapshot exports of MIMIC tables and derived views.
+
+All relations are exported from one exported snapshot (see
+:mod:`mimiciii_db.parallel`), so a snapshot is consistent across tables.
+Every relation, or every key-range partition of a large one, is its own
+`COPY ... TO STDOUT` stream on a worker connection. Partitioned and
+inherited tables are sized and versioned over all their child tables. Each
+stream is spooled to disk and converted batch by batch (see
+:func:`mimiciii_db.bulk.copy_to_parquet`), then written as zstd-compressed Parquet: `<name>.parquet`, or `<name>/part-NNNNN.parquet`
+when partitioned. This is the layout `DB.from_parquet_dir` reads.
+
+`manifest.json` records, per relation, the version stamp it was exported
+at (see :func:`mimiciii_db.cache.relation_versions`) and the row count,
+size and SHA-256 of every file. A later export skips relations whose
+stamp has not moved.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from . import bulk
+from .cache import relation_versions
+from .parallel import _SNAPSHOT_ID_RE, partition_cuts, slice_queries
+
+MANIFEST = "manifest.json"
+
+# The relation plus every partition / inheritance child below it: the parent of
+# a partitioned table holds no rows itself, and writes land in the children.
+_TREE_SQL = """
+WITH RECURSIVE tree(oid) AS (
+    SELECT to_regclass(:r)::oid
+  UNION
+    SELECT i.inhrelid FROM pg_inherits i JOIN tree ON i.inhparent = tree.oid
+)
+SELECT format('%I.%I', n.nspname, c.relname) AS relation,
+       c.relkind::text AS relkind,
+       c.reltuples::float8 AS reltuples
+FROM tree
+JOIN pg_class c ON c.oid = tree.oid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+"""
+
+BASE_TABLES = (
+    "patients",
+    "admissions",
+    "icustays",
+    "diagnoses_icd",
+    "chartevents",
+    "labevents",
+)
+DERIVED_VIEWS = ("elixhauser_quan", "filtered_patients", "sofa", "oasis", "sapsii")
+DEFAULT_RELATIONS = BASE_TABLES + DERIVED_VIEWS
+
+
+@dataclass
+class _Part:
+    relation: str
+    path: Path  # final location, relative to the export directory
+    sql: str
+    params: dict[str, Any]
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(directory: str) -> dict[str, Any]:
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return {"relations": {}}
+    return json.loads(path.read_text())
+
+
+def verify_export(directory: str) -> list[str]:
+    """Files listed in the manifest that are missing or whose checksum no longer matches."""
+    root = Path(directory)
+    bad = []
+    for entry in read_manifest(directory)["relations"].values():
+        for f in entry["files"]:
+            path = root / f["path"]
+            if not path.exists() or file_sha256(path) != f["sha256"]:
+                bad.append(f["path"])
+    return bad
+
+
+def _version_stamp(rows: list[list[Any]]) -> str:
+    return hashlib.sha1(json.dumps(rows, default=str).encode()).hexdigest()
+
+
+def _row_estimate(conn: Any, ident: str, tree: list[Any]) -> float:
+    """Planner row estimate summed over a relation tree; `count(*)` if a table was never analyzed."""
+    stored = [reltuples for _, relkind, reltuples in tree if relkind in ("r", "m")]
+    if any(t < 0 for t in stored):
+        return conn.execute(text(f"SELECT count(*) FROM {ident}")).scalar()
+    return sum(stored)
+
+
+def _is_current(root: Path, entry: Optional[dict[str, Any]], stamp: str) -> bool:
+    if entry is None or entry["version"] != stamp:
+        return False
+    return all(
+        (root / f["path"]).exists() and (root / f["path"]).stat().st_size == f["bytes"]
+        for f in entry["files"]
+    )
+
+
+def export_parquet(
+    engine: Engine,
+    directory: str,
+    relations: Optional[Sequence[str]] = None,
+    schema: str = "mimiciii",
+    workers: int = 4,
+    rows_per_file: int = 5_000_000,
+    partition_key: str = "subject_id",
+    compression: str = "zstd",
+    incremental: bool = True,
+) -> pd.DataFrame:
+    """
+    Export relations to Parquet under `directory` and update its manifest.
+
+    Args:
+        engine (Engine): Postgres engine to export from.
+        directory (str): Export directory (created if missing).
+        relations (list of str, optional): Relation names in `schema`; defaults to
+            `DEFAULT_RELATIONS`. Names that do not exist are reported as "missing".
+        schema (str): Schema the relations live in.
+        workers (int): Concurrent COPY streams (each holds one pooled connection).
+        rows_per_file (int): Relations estimated larger than this are split into
+            key ranges of `partition_key`, one file per range.
+        partition_key (str): Column to split large relations on.
+        compression (str): Parquet compression codec.
+        incremental (bool): Skip relations whose version stamp matches the manifest.
+
+    Returns:
+        pd.DataFrame: One row per relation with its status ("exported",
+        "unchanged" or "missing"), rows, files and bytes.
+    """
+    import pyarrow.parquet  # noqa: F401  (fail before taking the snapshot)
+
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(directory)
+    names = list(relations or DEFAULT_RELATIONS)
+    report: dict[str, dict[str, Any]] = {}
+    parts: list[_Part] = []
+    stamps: dict[str, str] = {}
+    preparer = engine.dialect.identifier_preparer
+
+    with engine.connect() as coord:
+        coord = coord.execution_options(isolation_level="REPEATABLE READ")
+        with coord.begin():
+            snapshot = coord.execute(text("SELECT pg_export_snapshot()")).scalar()
+            if not _SNAPSHOT_ID_RE.match(snapshot):
+                raise RuntimeError(f"Unexpected snapshot id: {snapshot!r}")
+
+            for name in names:
+                qualified = f"{schema}.{name}"
+                tree = coord.execute(text(_TREE_SQL), {"r": qualified}).all()
+                if not tree:
+                    report[name] = {"status": "missing"}
+                    continue
+                stamps[name] = _version_stamp(
+                    relation_versions(coord, {qualified, *(row[0] for row in tree)})
+                )
+                if incremental and _is_current(
+                    root, manifest["relations"].get(name), stamps[name]
+                ):
+                    entry = manifest["relations"][name]
+                    report[name] = {
+                        "status": "unchanged",
+                        "rows": entry["rows"],
+                        "files": len(entry["files"]),
+                        "bytes": sum(f["bytes"] for f in entry["files"]),
+                    }
+                    continue
+                ident = f"{preparer.quote(schema)}.{preparer.quote(name)}"
+                sql = f"SELECT * FROM {ident}"
+                columns = {c for c, _ in bulk.result_columns(coord, sql)}
+                estimate = _row_estimate(coord, ident, tree)
+                n = max(1, math.ceil(estimate / rows_per_file))
+                cuts = []
+                if n > 1 and partition_key in columns:
+                    cuts = partition_cuts(coord, sql, partition_key, n)
+                if cuts:
+                    slices = slice_queries(sql, preparer.quote(partition_key), cuts)
+                    parts += [
+                        _Part(name, Path(name) / f"part-{i:05d}.parquet", s, p)
+                        for i, (s, p) in enumerate(slices)
+                    ]
+                else:
+                    parts.append(_Part(name, Path(f"{name}.parquet"), sql, {}))
+                report[name] = {"status": "exported"}
+
+            # written under a hidden staging directory, swapped in once complete
+            staging = root / f".staging-{os.getpid()}"
+
+            def export(part: _Part) -> dict[str, Any]:
+                target = staging / part.path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with engine.connect() as conn:
+                    conn = conn.execution_options(isolation_level="REPEATABLE READ")
+                    with conn.begin():
+                        # must be the first statement of the transaction
+                        conn.exec_driver_sql(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+                        rows = bulk.copy_to_parquet(
+                            conn, part.sql, part.params, target, compression
+                        )
+                return {
+                    "path": part.path.as_posix(),
+                    "rows": rows,
+                    "bytes": target.stat().st_size,
+                    "sha256": file_sha256(target),
+                }
+
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    written = list(pool.map(export, parts))
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+    exported_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    for name in {part.relation for part in parts}:
+        files = [f for part, f in zip(parts, written) if part.relation == name]
+        for old in (root / name, root / f"{name}.parquet"):
+            if old.is_dir():
+                shutil.rmtree(old)
+            elif old.exists():
+                old.unlink()
+        partitioned = "/" in files[0]["path"]
+        moved = name if partitioned else f"{name}.parquet"
+        os.replace(staging / moved, root / moved)
+        manifest["relations"][name] = {
+            "source": f"{schema}.{name}",
+            "version": stamps[name],
+            "exported_at": exported_at,
+            "partition_key": partition_key if partitioned else None,
+            "compression": compression,
+            "rows": sum(f["rows"] for f in files),
+            "files": files,
+        }
+        report[name].update(
+            rows=manifest["relations"][name]["rows"],
+            files=len(files),
+            bytes=sum(f["bytes"] for f in files),
+        )
+    shutil.rmtree(staging, ignore_errors=True)
+
+    manifest["updated_at"] = exported_at
+    tmp = root / f".{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp, root / MANIFEST)
+
+    rows = [{"relation": name, **report[name]} for name in names]
+    return pd.DataFrame(rows, columns=["relation", "status", "rows", "files", "bytes"])
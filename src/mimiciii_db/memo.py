@@ -0,0 +1,129 @@
+"""In-process memoization of query results, bounded by bytes.
+
+Complements the on-disk :mod:`mimiciii_db.cache`: lookups cost no database
+round trip, so entries are instead invalidated explicitly whenever this
+process writes to a relation the cached query read (`DB.execute`,
+`DB.run_sql_file`, `DB.bulk_load`). Writes made by other sessions are not seen.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable, Mapping, Optional
+
+import pandas as pd
+
+from .sqlutil import normalize_sql, relation_basename
+
+
+@dataclass
+class MemoStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+
+def result_nbytes(result: Any) -> int:
+    """Approximate in-memory size of a pandas, pyarrow or polars result."""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True, index=True).sum())
+    if hasattr(result, "estimated_size"):  # polars.DataFrame
+        return int(result.estimated_size())
+    return int(getattr(result, "nbytes", 0))  # pyarrow.Table
+
+
+def share(result: Any) -> Any:
+    """
+    Hand out a cached result without letting callers mutate the cached copy.
+
+    pandas frames are shallow-copied when copy-on-write is enabled (cheap and
+    safe) and deep-copied otherwise; Arrow tables are immutable; polars clones
+    share buffers.
+    """
+    if isinstance(result, pd.DataFrame):
+        return result.copy(deep=not pd.options.mode.copy_on_write)
+    if hasattr(result, "clone"):
+        return result.clone()
+    return result
+
+
+class QueryMemo:
+    """
+    LRU of query results bounded by their total size in bytes.
+
+    Args:
+        max_bytes (int): Budget for all entries; least recently used ones are evicted beyond it.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024**2):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[Any, int, frozenset[str]]] = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._stats = MemoStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(sql: str, params: Optional[Mapping[str, Any]], variant: str = "") -> str:
+        return json.dumps(
+            [normalize_sql(sql), dict(params or {}), variant],
+            sort_keys=True,
+            default=str,
+        )
+
+    def get(self, key: str) -> Any:
+        """Return a shareable copy of the cached result, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+        return share(entry[0])
+
+    def put(self, key: str, result: Any, relations: Iterable[str]) -> None:
+        """Cache `result`, remembering which relations it was read from."""
+        nbytes = result_nbytes(result)
+        if nbytes > self.max_bytes:
+            return
+        names = frozenset(relation_basename(r) for r in relations)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (share(result), nbytes, names)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, size, _) = self._entries.popitem(last=False)
+                self._bytes -= size
+                self._stats.evictions += 1
+
+    def invalidate(self, relations: Iterable[str]) -> int:
+        """Drop every entry that read one of `relations`; returns how many were dropped."""
+        names = {relation_basename(r) for r in relations}
+        with self._lock:
+            stale = [k for k, (_, _, rels) in self._entries.items() if rels & names]
+            for k in stale:
+                self._bytes -= self._entries.pop(k)[1]
+            self._stats.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss/eviction/invalidation counters plus current size."""
+        with self._lock:
+            self._stats.entries = len(self._entries)
+            self._stats.bytes = self._bytes
+            return asdict(self._stats)
@@ -0,0 +1,312 @@
+"""Per-call query instrumentation: a ring buffer of timings with exporters.
+
+Every public `DB` data call is tracked as one record (nested calls such as
+`run` -> `query_df` are folded into the outermost one). SQLAlchemy event hooks
+fill in what only the engine sees:
+
+- pool wait: time from the start of the call until the pool handed out a connection
+- time to first row: time until the last statement returned its first rows
+  (the first chunk for streamed results)
+
+Records are kept in a bounded ring buffer and can be summarized per query
+fingerprint (p50/p95/p99) or exported as JSON lines / Prometheus text.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import IO, Any, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .memo import result_nbytes
+from .sqlutil import fingerprint, normalize_sql
+
+_QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class QueryRecord:
+    started: float  # unix time
+    fingerprint: str
+    name: Optional[str]
+    sql: str
+    wall_s: float
+    first_row_s: float
+    pool_wait_s: float
+    rows: int
+    nbytes: int
+    statements: int
+    error: Optional[str] = None
+
+
+class _Call:
+    """Mutable state of one in-flight call."""
+
+    def __init__(self, sql: str, name: Optional[str]):
+        self.sql = sql
+        self.name = name
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.first_row: Optional[float] = None
+        self.pool_wait: Optional[float] = None
+        self.rows = 0
+        self.nbytes = 0
+        self.statements = 0
+        self.error: Optional[str] = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def finish(self) -> QueryRecord:
+        wall = self.elapsed()
+        sql = normalize_sql(self.sql)
+        return QueryRecord(
+            started=self.started,
+            fingerprint=fingerprint(sql),
+            name=self.name,
+            sql=sql,
+            wall_s=wall,
+            first_row_s=wall if self.first_row is None else self.first_row,
+            pool_wait_s=self.pool_wait or 0.0,
+            rows=self.rows,
+            nbytes=self.nbytes,
+            statements=self.statements,
+            error=self.error,
+        )
+
+
+_CURRENT: ContextVar[Optional[_Call]] = ContextVar("mimiciii_db_call", default=None)
+
+
+def observe(result: Any, accumulate: bool = False) -> None:
+    """Attribute a result's rows/bytes to the current call (a no-op outside one)."""
+    call = _CURRENT.get()
+    if call is None:
+        return
+    rows, nbytes = len(result), result_nbytes(result)
+    if accumulate:
+        call.rows += rows
+        call.nbytes += nbytes
+    else:
+        call.rows, call.nbytes = rows, nbytes
+
+
+def mark_first_row() -> None:
+    """Record that the current call now has its first rows in hand."""
+    call = _CURRENT.get()
+    if call is not None:
+        call.first_row = call.elapsed()
+
+
+@contextmanager
+def paused() -> Iterator[None]:
+    """Detach the current call, e.g. while a generator has yielded control to its consumer."""
+    token = _CURRENT.set(None)
+    try:
+        yield
+    finally:
+        _CURRENT.reset(token)
+
+
+def _on_checkout(dbapi_conn, conn_record, conn_proxy) -> None:
+    call = _CURRENT.get()
+    if call is not None and call.pool_wait is None:
+        call.pool_wait = call.elapsed()
+
+
+def _on_before_execute(conn, cursor, statement, parameters, context, executemany):
+    call = _CURRENT.get()
+    if call is not None:
+        call.statements += 1
+
+
+def _on_after_execute(conn, cursor, statement, parameters, context, executemany):
+    call = _CURRENT.get()
+    # a streamed (server-side) cursor has no rows yet; iter_df marks its first chunk
+    if call is not None and not (
+        context is not None and context.execution_options.get("stream_results")
+    ):
+        call.first_row = call.elapsed()
+
+
+def _quantile(values: np.ndarray, q: float) -> float:
+    return float(np.quantile(values, q)) if len(values) else float("nan")
+
+
+def _label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class QueryMetrics:
+    """
+    Ring buffer of the last `capacity` query records.
+
+    Args:
+        capacity (int): Number of records kept; the oldest are dropped beyond it.
+    """
+
+    def __init__(self, capacity: int = 10_000):
+        self.capacity = capacity
+        self._records: deque[QueryRecord] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def attach(engine: Engine) -> None:
+        """Install the pool/cursor event hooks on `engine` (idempotent)."""
+        hooks = (
+            ("checkout", _on_checkout),
+            ("before_cursor_execute", _on_before_execute),
+            ("after_cursor_execute", _on_after_execute),
+        )
+        for name, fn in hooks:
+            if not event.contains(engine, name, fn):
+                event.listen(engine, name, fn)
+
+    @contextmanager
+    def track(self, sql: str, name: Optional[str] = None) -> Iterator[_Call]:
+        """Time one call; calls made inside it are accounted to it rather than recorded separately."""
+        outer = _CURRENT.get()
+        if outer is not None:
+            outer.name = outer.name or name
+            yield outer
+            return
+        call = _Call(sql, name)
+        token = _CURRENT.set(call)
+        try:
+            yield call
+        except Exception as e:
+            call.error = type(e).__name__
+            raise
+        finally:
+            _CURRENT.reset(token)
+            self.record(call.finish())
+
+    def record(self, rec: QueryRecord) -> None:
+        with self._lock:
+            self._records.append(rec)
+
+    def records(self) -> list[QueryRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+    def to_frame(self) -> pd.DataFrame:
+        """All buffered records, one row per call."""
+        return pd.DataFrame(
+            [asdict(r) for r in self.records()],
+            columns=list(QueryRecord.__dataclass_fields__),
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Per-fingerprint summary, slowest total time first.
+
+        Columns: calls, errors, total/p50/p95/p99 wall seconds, p50/p95 time to
+        first row, mean pool wait, total rows and bytes, and one sample statement.
+        """
+        df = self.to_frame()
+        df["name"] = df["name"].fillna("")
+        rows = []
+        for (fp, name), g in df.groupby(["fingerprint", "name"], sort=False):
+            wall = g["wall_s"].to_numpy()
+            first = g["first_row_s"].to_numpy()
+            rows.append(
+                {
+                    "fingerprint": fp,
+                    "name": name or None,
+                    "calls": len(g),
+                    "errors": int(g["error"].notna().sum()),
+                    "total_s": float(wall.sum()),
+                    "p50_s": _quantile(wall, 0.5),
+                    "p95_s": _quantile(wall, 0.95),
+                    "p99_s": _quantile(wall, 0.99),
+                    "first_row_p50_s": _quantile(first, 0.5),
+                    "first_row_p95_s": _quantile(first, 0.95),
+                    "pool_wait_mean_s": float(g["pool_wait_s"].mean()),
+                    "rows": int(g["rows"].sum()),
+                    "nbytes": int(g["nbytes"].sum()),
+                    "sql": g["sql"].iloc[-1],
+                }
+            )
+        out = pd.DataFrame(rows)
+        if out.empty:
+            return out
+        return out.sort_values("total_s", ascending=False, ignore_index=True)
+
+    def to_jsonl(self, dest: Union[str, IO[str]]) -> int:
+        """Write every buffered record as one JSON object per line; returns the count."""
+        records = self.records()
+        lines = "".join(json.dumps(asdict(r)) + "\n" for r in records)
+        if isinstance(dest, str):
+            with open(dest, "w", encoding="utf-8") as f:
+                f.write(lines)
+        else:
+            dest.write(lines)
+        return len(records)
+
+    def to_prometheus(self, namespace: str = "mimiciii_db") -> str:
+        """
+        Render the buffer in the Prometheus text exposition format.
+
+        Durations are summaries (quantiles over the buffered calls) labelled by
+        fingerprint and query name; rows, bytes and errors are totals. Serve the
+        text from an HTTP handler or write it for the node_exporter textfile collector.
+        """
+        summary = self.summary()
+        lines: list[str] = []
+
+        def labels(row: Any, **extra: Any) -> str:
+            pairs = {"fingerprint": row.fingerprint, "name": row.name or "", **extra}
+            return ",".join(f'{k}="{_label(v)}"' for k, v in pairs.items())
+
+        df = self.to_frame()
+        df["name"] = df["name"].fillna("")
+        groups = {key: g for key, g in df.groupby(["fingerprint", "name"])}
+        durations = (
+            ("query_duration_seconds", "wall_s", "Wall time of a query call."),
+            (
+                "query_first_row_seconds",
+                "first_row_s",
+                "Time until a query call had its first rows.",
+            ),
+            (
+                "query_pool_wait_seconds",
+                "pool_wait_s",
+                "Time a query call waited for a pooled connection.",
+            ),
+        )
+        for metric, col, help_text in durations:
+            metric = f"{namespace}_{metric}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+            for row in summary.itertuples():
+                values = groups[(row.fingerprint, row.name or "")][col].to_numpy()
+                for q in _QUANTILES:
+                    lines.append(
+                        f"{metric}{{{labels(row, quantile=q)}}} {_quantile(values, q)}"
+                    )
+                lines.append(f"{metric}_sum{{{labels(row)}}} {values.sum()}")
+                lines.append(f"{metric}_count{{{labels(row)}}} {len(values)}")
+        totals = (
+            ("query_rows_total", "rows", "Rows returned by query calls."),
+            ("query_bytes_total", "nbytes", "Approximate in-memory bytes returned."),
+            ("query_errors_total", "errors", "Query calls that raised."),
+        )
+        for metric, col, help_text in totals:
+            metric = f"{namespace}_{metric}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for row in summary.itertuples():
+                lines.append(f"{metric}{{{labels(row)}}} {getattr(row, col)}")
+        return "\n".join(lines) + "\n"
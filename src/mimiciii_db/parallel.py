@@ -0,0 +1,164 @@
+"""Key-range partitioned parallel reads inside one exported snapshot.
+
+A coordinator transaction exports its snapshot with `pg_export_snapshot()`;
+each worker connection adopts it with `SET TRANSACTION SNAPSHOT`, so all
+slices see exactly the same data even while other sessions write.
+"""
+
+from __future__ import annotations
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Mapping, Optional
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from . import bulk
+from .sqlutil import referenced_relations
+
+_SNAPSHOT_ID_RE = re.compile(r"^[0-9A-F]+-[0-9A-F]+(-[0-9]+)?$")
+
+# bounds as text plus the column's type, so they can be cast back to that type
+# (cuts bound as numeric against an integer key would defeat its index)
+_HISTOGRAM_SQL = """
+SELECT s.histogram_bounds::text, format_type(a.atttypid, a.atttypmod)
+FROM pg_stats s
+JOIN pg_class c ON c.relname = s.tablename
+JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = s.schemaname
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attname = s.attname
+WHERE c.oid = to_regclass(:relation) AND s.attname = :key
+"""
+
+
+def _cut_points(values: list[Any], partitions: int) -> list[Any]:
+    """Pick `partitions - 1` cut points spread evenly over sorted `values`."""
+    step = (len(values) - 1) / partitions
+    cuts = [values[round(step * i)] for i in range(1, partitions)]
+    return sorted(set(cuts))
+
+
+def partition_cuts(
+    conn: Connection,
+    sql: str,
+    key: str,
+    partitions: int,
+    params: Optional[Mapping[str, Any]] = None,
+    bounds: str = "auto",
+) -> list[Any]:
+    """
+    Choose the boundaries that split `sql` into roughly equal slices of `key`.
+
+    "histogram" uses the planner statistics in `pg_stats` (free, but only
+    possible when the query reads a single relation that has them), "minmax"
+    splits [min, max] of the key evenly, "auto" tries the histogram first.
+    """
+    if bounds not in ("auto", "histogram", "minmax"):
+        raise ValueError(
+            f"Unknown bounds '{bounds}'; expected 'auto', 'histogram' or 'minmax'"
+        )
+    if bounds in ("auto", "histogram"):
+        relations = referenced_relations(sql)
+        histogram = None
+        if len(relations) == 1:
+            row = conn.execute(
+                text(_HISTOGRAM_SQL), {"relation": relations.pop(), "key": key}
+            ).first()
+            if row is not None and row[0] is not None:
+                # the type name comes from format_type(), so it is safe to inline
+                histogram = conn.execute(
+                    text(f"SELECT CAST(:bounds AS {row[1]}[])"), {"bounds": row[0]}
+                ).scalar()
+        if histogram and len(histogram) >= partitions:
+            return _cut_points(list(histogram), partitions)
+        if bounds == "histogram":
+            raise ValueError(f"No pg_stats histogram available for '{key}'")
+    qkey = conn.dialect.identifier_preparer.quote(key)
+    lo, hi = conn.execute(
+        text(f"SELECT min({qkey}), max({qkey}) FROM ({sql}) AS _q"),
+        dict(params or {}),
+    ).one()
+    if lo is None:
+        return []
+    return sorted({_interpolate(lo, hi, i / partitions) for i in range(1, partitions)})
+
+
+def _interpolate(lo: Any, hi: Any, fraction: float) -> Any:
+    """The point `fraction` of the way from `lo` to `hi`, in their own type."""
+    if isinstance(lo, int):
+        return lo + int((hi - lo) * fraction)
+    if isinstance(lo, Decimal):
+        return lo + (hi - lo) * Decimal(str(fraction))
+    if isinstance(lo, (float, datetime, date)):  # dates step by a timedelta
+        return lo + (hi - lo) * fraction
+    raise ValueError(
+        f"Cannot split a key of type {type(lo).__name__}; use a numeric or date key"
+    )
+
+
+def slice_queries(
+    sql: str, key: str, cuts: list[Any]
+) -> list[tuple[str, dict[str, Any]]]:
+    """
+    One (sql, params) per slice of the (already quoted) `key`.
+
+    The outer slices are open-ended and the first also takes NULL keys, so the
+    slices always cover the whole result exactly once.
+    """
+    base = f"SELECT * FROM ({sql}) AS _q"
+    if not cuts:
+        return [(base, {})]
+    slices = [(f"{base} WHERE {key} < :_hi OR {key} IS NULL", {"_hi": cuts[0]})]
+    for lo, hi in zip(cuts, cuts[1:]):
+        slices.append(
+            (f"{base} WHERE {key} >= :_lo AND {key} < :_hi", {"_lo": lo, "_hi": hi})
+        )
+    slices.append((f"{base} WHERE {key} >= :_lo", {"_lo": cuts[-1]}))
+    return slices
+
+
+def parallel_query_df(
+    engine: Engine,
+    sql: str,
+    key: str,
+    partitions: int,
+    params: Optional[Mapping[str, Any]] = None,
+    bounds: str = "auto",
+    copy: bool = False,
+) -> pd.DataFrame:
+    """
+    Run `sql` as key-range slices on `partitions` connections sharing one snapshot.
+
+    With `copy=True` each slice is fetched through `COPY ... TO STDOUT`
+    (see :mod:`mimiciii_db.bulk`), whose parsing releases the GIL, so the
+    worker threads also overlap on the client side.
+    """
+    sql = sql.strip().rstrip(";")
+    qkey = engine.dialect.identifier_preparer.quote(key)
+    with engine.connect() as coord:
+        coord = coord.execution_options(isolation_level="REPEATABLE READ")
+        with coord.begin():
+            snapshot = coord.execute(text("SELECT pg_export_snapshot()")).scalar()
+            if not _SNAPSHOT_ID_RE.match(snapshot):
+                raise RuntimeError(f"Unexpected snapshot id: {snapshot!r}")
+            cuts = partition_cuts(coord, sql, key, partitions, params, bounds)
+
+            def fetch(slice_sql: str, slice_params: dict[str, Any]) -> pd.DataFrame:
+                with engine.connect() as conn:
+                    conn = conn.execution_options(isolation_level="REPEATABLE READ")
+                    with conn.begin():
+                        # must be the first statement of the transaction
+                        conn.exec_driver_sql(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+                        merged = {**dict(params or {}), **slice_params}
+                        if copy:
+                            return bulk.copy_query_df(conn, slice_sql, merged)
+                        return pd.read_sql_query(text(slice_sql), conn, params=merged)
+
+            slices = slice_queries(sql, qkey, cuts)
+            with ThreadPoolExecutor(max_workers=len(slices)) as pool:
+                frames = list(pool.map(lambda s: fetch(*s), slices))
+    non_empty = [f for f in frames if len(f)] or frames[:1]
+    return pd.concat(non_empty, ignore_index=True)
@@ -0,0 +1,220 @@
+"""Connection pool telemetry and adaptive overflow sizing.
+
+`MonitoredQueuePool` is a drop-in `QueuePool` that times every checkout
+(how long callers waited for a connection, including connects), counts
+connects and timeouts, and, given an `AdaptivePoolSizing`, grows or shrinks
+its overflow capacity from the observed waits without ever holding more
+server connections than the configured budget. Pre-ping cost is measured by
+wrapping the dialect's `do_ping`.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# upper bounds (ms) of the wait-time histogram buckets
+WAIT_BUCKETS_MS = (0.1, 1, 10, 100, 1000)
+
+
+@dataclass
+class AdaptivePoolSizing:
+    """
+    When and how far `MonitoredQueuePool` may resize.
+
+    Every `window` checkouts the p95 wait of that window is compared with the
+    thresholds: above `grow_wait_ms` the overflow grows by `step` (never past
+    `budget` connections in total); below `shrink_wait_ms`, with at least `step`
+    connections left unused at peak, it shrinks by `step` (never below 0).
+    Overflow connections are closed when returned, so shrinking frees them on
+    the server as they come back.
+
+    Args:
+        budget (int): Most server connections this process may hold at once.
+        grow_wait_ms (float): p95 checkout wait that triggers growth.
+        shrink_wait_ms (float): p95 checkout wait under which the pool may shrink.
+        window (int): Checkouts between two sizing decisions.
+        step (int): Connections added or removed per decision.
+    """
+
+    budget: int
+    grow_wait_ms: float = 20.0
+    shrink_wait_ms: float = 1.0
+    window: int = 200
+    step: int = 2
+
+
+class PoolStats:
+    """Counters shared by a pool and the pools it is recreated as."""
+
+    def __init__(self, sizing: Optional[AdaptivePoolSizing] = None):
+        self.sizing = sizing
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits: deque[float] = deque(maxlen=10_000)  # recent waits, seconds
+        self.histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.connects = 0
+        self.connect_total = 0.0
+        self.pre_pings = 0
+        self.pre_ping_total = 0.0
+        self.pre_ping_failures = 0
+        self.grows = 0
+        self.shrinks = 0
+        self.window_waits: list[float] = []
+        self.window_peak = 0
+
+    def record_wait(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        self.waits.append(seconds)
+        self.histogram[int(np.searchsorted(WAIT_BUCKETS_MS, ms))] += 1
+        self.window_waits.append(ms)
+
+
+class MonitoredQueuePool(QueuePool):
+    """`QueuePool` that records checkout waits and optionally adapts its overflow."""
+
+    stats: PoolStats
+
+    def __init__(self, *args: Any, **kw: Any):
+        super().__init__(*args, **kw)
+        self.stats = PoolStats()
+        self._in_get = threading.local()
+
+    def recreate(self) -> MonitoredQueuePool:
+        # engine.dispose() swaps in a fresh pool; keep the counters and sizing
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        if getattr(self._in_get, "active", False):  # QueuePool retries by recursing
+            return super()._do_get()
+        start = time.perf_counter()
+        self._in_get.active = True
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            with self.stats.lock:
+                self.stats.timeouts += 1
+            raise
+        finally:
+            self._in_get.active = False
+        with self.stats.lock:
+            self.stats.record_wait(time.perf_counter() - start)
+            self.stats.window_peak = max(self.stats.window_peak, self.checkedout())
+            sizing = self.stats.sizing
+            if sizing is not None and len(self.stats.window_waits) >= sizing.window:
+                self._resize(sizing)
+        return record
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        record = super()._create_connection()
+        with self.stats.lock:
+            self.stats.connects += 1
+            self.stats.connect_total += time.perf_counter() - start
+        return record
+
+    def _resize(self, sizing: AdaptivePoolSizing) -> None:
+        """One sizing decision at the end of a window (called with the stats lock held)."""
+        stats = self.stats
+        p95 = float(np.quantile(stats.window_waits, 0.95))
+        limit = self.size() + self._max_overflow
+        if p95 > sizing.grow_wait_ms and limit < sizing.budget:
+            self._max_overflow += min(sizing.step, sizing.budget - limit)
+            stats.grows += 1
+        elif (
+            p95 < sizing.shrink_wait_ms
+            and self._max_overflow > 0
+            and stats.window_peak + sizing.step <= limit
+        ):
+            self._max_overflow -= min(sizing.step, self._max_overflow)
+            stats.shrinks += 1
+        stats.window_waits = []
+        stats.window_peak = self.checkedout()
+
+
+def monitor_pool(engine: Engine, sizing: Optional[AdaptivePoolSizing] = None) -> None:
+    """Turn on adaptive sizing (if given) and pre-ping timing for an engine using `MonitoredQueuePool`."""
+    pool = engine.pool
+    if not isinstance(pool, MonitoredQueuePool):
+        return
+    if sizing is not None:
+        if pool.size() > sizing.budget:
+            raise ValueError(
+                f"pool_size {pool.size()} exceeds the connection budget {sizing.budget}"
+            )
+        pool._max_overflow = min(pool._max_overflow, sizing.budget - pool.size())
+    pool.stats.sizing = sizing
+
+    dialect = engine.dialect
+    do_ping = dialect.do_ping
+
+    def _timed_ping(dbapi_connection: Any) -> bool:
+        start = time.perf_counter()
+        ok = False
+        try:
+            ok = do_ping(dbapi_connection)
+            return ok
+        finally:
+            stats = engine.pool.stats
+            with stats.lock:
+                stats.pre_pings += 1
+                stats.pre_ping_total += time.perf_counter() - start
+                stats.pre_ping_failures += not ok
+
+    dialect.do_ping = _timed_ping
+
+
+def pool_stats(engine: Engine) -> dict[str, Any]:
+    """Snapshot of the pool's occupancy and the counters collected so far."""
+    pool = engine.pool
+    out: dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        out.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+        )
+    stats: Optional[PoolStats] = getattr(pool, "stats", None)
+    if stats is None:
+        return out
+    with stats.lock:
+        waits_ms = np.array(stats.waits) * 1000
+        labels = [f"<={b}ms" for b in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+        out.update(
+            checkouts=stats.checkouts,
+            timeouts=stats.timeouts,
+            wait_ms_mean=stats.wait_total * 1000 / max(stats.checkouts, 1),
+            wait_ms_p50=float(np.quantile(waits_ms, 0.5)) if len(waits_ms) else 0.0,
+            wait_ms_p95=float(np.quantile(waits_ms, 0.95)) if len(waits_ms) else 0.0,
+            wait_ms_max=stats.wait_max * 1000,
+            wait_histogram=dict(zip(labels, stats.histogram)),
+            connects=stats.connects,
+            connect_ms_mean=stats.connect_total * 1000 / max(stats.connects, 1),
+            pre_pings=stats.pre_pings,
+            pre_ping_ms_total=stats.pre_ping_total * 1000,
+            pre_ping_ms_mean=stats.pre_ping_total * 1000 / max(stats.pre_pings, 1),
+            pre_ping_failures=stats.pre_ping_failures,
+        )
+        if stats.sizing is not None:
+            out.update(
+                budget=stats.sizing.budget, grows=stats.grows, shrinks=stats.shrinks
+            )
+    return out
@@ -0,0 +1,87 @@
+"""Server-side prepared statements, prepared once per pooled connection.
+
+`PREPARE` is issued the first time a statement runs on a DBAPI connection and
+remembered in that connection's `info` dict. SQLAlchemy gives a reconnected
+connection a fresh `info`, so statements are re-prepared automatically after
+a reconnect; a statement the server has lost anyway (e.g. after `DISCARD ALL`)
+is re-prepared on the retry that `DB` performs.
+
+Plain SQL `PREPARE`/`EXECUTE` is used rather than a driver feature so that
+psycopg2 and psycopg 3 behave the same. The arguments of `EXECUTE` are
+rendered as literals; their types come from the prepared statement.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Any, Mapping, Optional
+
+import pandas as pd
+from sqlalchemy.engine import Connection
+
+from .bulk import render_sql
+
+_INFO_KEY = "mimiciii_db_prepared"
+
+# quoted text, comments and `::` casts are matched first so only real binds are replaced
+_BIND_RE = re.compile(
+    r"'(?:[^']|'')*'|\"[^\"]*\"|--[^\n]*|/\*.*?\*/|::|(?<![\w\\]):(?P<name>[A-Za-z_]\w*)",
+    re.S,
+)
+
+# SQLSTATE 26000: prepared statement does not exist
+INVALID_STATEMENT_NAME = "26000"
+
+
+def to_positional(sql: str) -> tuple[str, list[str]]:
+    """Rewrite `:name` binds as `$1, $2, ...`; returns the SQL and the parameter names in order."""
+    names: list[str] = []
+
+    def _sub(m: re.Match) -> str:
+        name = m.group("name")
+        if name is None:
+            return m.group(0)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    return _BIND_RE.sub(_sub, sql).strip().rstrip(";"), names
+
+
+def statement_name(sql: str) -> str:
+    return "mimiciii_db_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+
+def _driver_sql(conn: Connection, sql: str) -> Any:
+    # exec_driver_sql always hands the driver a (empty) parameter mapping, so
+    # pyformat drivers would read a literal '%' as a placeholder
+    if conn.dialect.paramstyle in ("format", "pyformat"):
+        sql = sql.replace("%", "%%")
+    return conn.exec_driver_sql(sql)
+
+
+def forget(conn: Connection) -> None:
+    """Drop this connection's bookkeeping, e.g. after the server lost its statements."""
+    conn.connection.info.pop(_INFO_KEY, None)
+
+
+def execute_prepared(
+    conn: Connection, sql: str, params: Optional[Mapping[str, Any]] = None
+) -> pd.DataFrame:
+    """Run `sql` as a prepared statement on `conn`, preparing it first if this connection has not."""
+    pg_sql, names = to_positional(sql)
+    name = statement_name(pg_sql)
+    prepared = conn.connection.info.setdefault(_INFO_KEY, set())
+    if name not in prepared:
+        _driver_sql(conn, f"PREPARE {name} AS {pg_sql}")
+        prepared.add(name)
+    if names:
+        args = ", ".join(f":{n}" for n in names)
+        stmt = render_sql(f"EXECUTE {name}({args})", {n: params[n] for n in names})
+    else:
+        stmt = f"EXECUTE {name}"
+    result = _driver_sql(conn, stmt)
+    return pd.DataFrame.from_records(
+        result.fetchall(), columns=list(result.keys()), coerce_float=True
+    )
@@ -12,7 +12,7 @@ db = DB.from_url(db_url())
 
 fp = "/Users/varunpabreja/Desktop/dsc180_capstone/mimic-code/mimic-iii/concepts_postgres/comorbidity/elixhauser_quan.sql"
 
-db.run_sql_file(fp)
+db.run_sql_file(fp, session="bulk_build")
 
 df = db.query_df("SELECT * FROM mimiciii.elixhauser_quan LIMIT 1;")
 
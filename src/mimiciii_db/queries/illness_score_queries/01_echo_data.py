@@ -54,7 +54,7 @@ FROM mimiciii.noteevents ne
 WHERE ne.category = 'Echo';
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = f"""
 SELECT * from mimiciii.echo_data LIMIT 1;
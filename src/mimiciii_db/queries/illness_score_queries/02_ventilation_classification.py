@@ -151,7 +151,7 @@ where itemid in
 );
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = f"""
 SELECT * from mimiciii.ventilation_classification LIMIT 1;
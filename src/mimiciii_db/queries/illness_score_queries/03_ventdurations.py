@@ -121,7 +121,7 @@ HAVING
 ORDER BY icustay_id, ventnum;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 # sanity check
 selection_query = """
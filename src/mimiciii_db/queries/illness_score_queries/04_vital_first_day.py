@@ -171,7 +171,7 @@ GROUP BY pvt.subject_id, pvt.hadm_id, pvt.icustay_id
 ORDER BY pvt.subject_id, pvt.hadm_id, pvt.icustay_id;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = """
 SELECT * FROM mimiciii.vitals_first_day LIMIT 1;
@@ -72,7 +72,7 @@ GROUP BY ie.subject_id, ie.hadm_id, ie.icustay_id
 ORDER BY ie.subject_id, ie.hadm_id, ie.icustay_id;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = """
 SELECT * FROM mimiciii.urine_output_first_day LIMIT 1;
@@ -40,7 +40,7 @@ GROUP BY ie.subject_id, ie.hadm_id, ie.icustay_id
 ORDER BY ie.subject_id, ie.hadm_id, ie.icustay_id;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = """
 SELECT * FROM mimiciii.ventilation_first_day LIMIT 5;
@@ -102,7 +102,7 @@ LEFT JOIN gcs_final gf
 ORDER BY ie.icustay_id;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 df = db.query_df("SELECT * FROM mimiciii.gcs_first_day LIMIT 5;")
 print(df)
@@ -170,7 +170,7 @@ ORDER BY
     pvt.icustay_id;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = f"""
 SELECT * from mimiciii.labs_first_day LIMIT 1;
@@ -124,7 +124,7 @@ ORDER BY
     pvt.charttime;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = f"""
 SELECT * from mimiciii.blood_gas_first_day LIMIT 1;
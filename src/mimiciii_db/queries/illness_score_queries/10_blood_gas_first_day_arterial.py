@@ -212,7 +212,7 @@ WHERE lastRowFiO2 = 1
 ORDER BY icustay_id, charttime;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = f"""
 SELECT * from mimiciii.blood_gas_first_day_arterial LIMIT 1;
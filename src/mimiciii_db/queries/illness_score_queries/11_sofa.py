@@ -281,7 +281,7 @@ LEFT JOIN scorecalc s
 ORDER BY ie.icustay_id;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = f"""
 SELECT * from mimiciii.sofa LIMIT 1;
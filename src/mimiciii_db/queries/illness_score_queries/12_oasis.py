@@ -291,7 +291,7 @@ FROM score
 ORDER BY icustay_id;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = f"""
 SELECT * from mimiciii.oasis LIMIT 1;
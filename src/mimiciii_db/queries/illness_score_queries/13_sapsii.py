@@ -377,7 +377,7 @@ LEFT JOIN score s
 ORDER BY ie.icustay_id;
 """
 
-db.execute(query)
+db.execute(query, session="bulk_build")
 
 selection_query = f"""
 SELECT * from mimiciii.sapsii LIMIT 1;
@@ -0,0 +1,75 @@
+"""Routing of reads to read replicas, with an optional read-your-writes window.
+
+Writes always go to the primary. Reads go to one of the replicas, picked
+round-robin or by fewest checked-out connections; for `read_your_writes`
+seconds after a write they go to the primary instead, so a rebuilt view is
+read back from where it was rebuilt rather than from a replica still
+replaying it.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from typing import Sequence
+
+from sqlalchemy.engine import Engine
+
+READ_POLICIES = ("round_robin", "least_busy")
+
+
+class ReplicaRouter:
+    """
+    Picks the engine each read runs on.
+
+    Args:
+        primary (Engine): Engine for the primary; receives all writes.
+        replicas (list of Engine): Engines for the read replicas.
+        policy (str): "round_robin" or "least_busy" (fewest checked-out connections,
+            ties broken round-robin).
+        read_your_writes (float): Seconds after a write during which reads go to
+            the primary. 0 disables the window.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: Sequence[Engine],
+        policy: str = "round_robin",
+        read_your_writes: float = 0.0,
+    ):
+        if policy not in READ_POLICIES:
+            raise ValueError(
+                f"Unknown read policy '{policy}'; expected one of {READ_POLICIES}"
+            )
+        if not replicas:
+            raise ValueError("ReplicaRouter needs at least one replica")
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.policy = policy
+        self.read_your_writes = read_your_writes
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._pinned_until = 0.0
+
+    def reader(self) -> Engine:
+        """Engine for the next read."""
+        if time.monotonic() < self._pinned_until:
+            return self.primary
+        with self._lock:
+            turn = next(self._turn)
+        n = len(self.replicas)
+        if self.policy == "least_busy":
+            # rotate first so equally idle replicas still take turns
+            order = [self.replicas[(turn + i) % n] for i in range(n)]
+            return min(order, key=lambda eng: getattr(eng.pool, "checkedout", int)())
+        return self.replicas[turn % n]
+
+    def wrote(self) -> None:
+        """Note a write on the primary, opening the read-your-writes window."""
+        if self.read_your_writes > 0:
+            self._pinned_until = time.monotonic() + self.read_your_writes
+
+    def engines(self) -> list[Engine]:
+        return [self.primary, *self.replicas]
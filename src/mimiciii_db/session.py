@@ -0,0 +1,87 @@
+"""Named session profiles: server settings applied to one call's transaction.
+
+A profile maps Postgres parameters to values. It is applied with
+`set_config(name, value, true)`, the function form of `SET LOCAL`, as the
+first statement of the call's transaction, so the settings end with the
+transaction and never leak into later users of the pooled connection. All
+settings go in one round trip.
+
+Add or adjust profiles by editing `SESSION_PROFILES`, or pass a mapping of
+settings instead of a profile name.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Mapping, Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+SESSION_PROFILES: dict[str, dict[str, str]] = {
+    # materialized-view and table builds (11_sofa.py, 13_sapsii.py, ...): sorts,
+    # hashes and index builds in memory, parallel scans and parallel index builds
+    "bulk_build": {
+        "work_mem": "256MB",
+        "maintenance_work_mem": "1GB",
+        "max_parallel_workers_per_gather": "4",
+        "max_parallel_maintenance_workers": "4",
+    },
+    # large analytic reads: bigger hashes and parallel scans, no JIT compile cost
+    "analytics": {
+        "work_mem": "64MB",
+        "max_parallel_workers_per_gather": "4",
+        "jit": "off",
+    },
+    # short lookups: JIT compilation and parallel worker startup cost more than the query
+    "lookup": {
+        "jit": "off",
+        "max_parallel_workers_per_gather": "0",
+    },
+}
+
+# Session = a profile name, or a mapping of settings
+Session = Union[str, Mapping[str, object], None]
+
+_SETTING_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+
+def resolve_session(session: Session) -> Optional[dict[str, str]]:
+    """The settings of a profile name or mapping (None for no settings)."""
+    if session is None:
+        return None
+    if isinstance(session, str):
+        if session not in SESSION_PROFILES:
+            raise ValueError(
+                f"Unknown session profile '{session}'; "
+                f"expected one of {tuple(SESSION_PROFILES)}"
+            )
+        session = SESSION_PROFILES[session]
+    for name in session:
+        if not _SETTING_RE.match(name):
+            raise ValueError(f"Invalid setting name '{name}'")
+    return {name: str(value) for name, value in session.items()}
+
+
+def apply_session(
+    conn: Connection, settings: Optional[Mapping[str, str]], local: bool = True
+) -> None:
+    """
+    Apply `settings` on `conn`, for the current transaction (`local`) or the session.
+
+    Session-level settings (for autocommit connections) must be undone with
+    `reset_session`.
+    """
+    if not settings:
+        return
+    calls, params = [], {}
+    for i, (name, value) in enumerate(settings.items()):
+        calls.append(f"set_config(:n{i}, :v{i}, {'true' if local else 'false'})")
+        params[f"n{i}"], params[f"v{i}"] = name, value
+    conn.execute(text("SELECT " + ", ".join(calls)), params)
+
+
+def reset_session(conn: Connection, settings: Optional[Mapping[str, str]]) -> None:
+    """Return session-level `settings` to their defaults (`RESET`)."""
+    for name in settings or ():
+        conn.exec_driver_sql(f"RESET {name}")
@@ -0,0 +1,78 @@
+"""Single-flight coalescing of identical concurrent queries.
+
+While a query is being fetched, other callers asking for the same
+normalized SQL, parameters and fetch options wait for that execution
+instead of starting their own, and each gets its own copy of the result
+(see :func:`mimiciii_db.memo.share`). Nothing is kept once the execution
+finishes: serving repeated, rather than concurrent, queries is the memo's job.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Optional
+
+from .memo import share
+
+
+@dataclass
+class FlightStats:
+    executions: int = 0  # fetches actually run
+    coalesced: int = 0  # calls served by another call's fetch, i.e. executions saved
+    errors: int = 0  # executions that failed (their waiters got the same error)
+    in_flight: int = 0
+
+
+@dataclass
+class _Flight:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Optional[BaseException] = None
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Runs at most one execution per key at a time and shares its outcome with concurrent callers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+        self._stats = FlightStats()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return `fn()`, or the result of the `fn` already running under `key`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats.executions += 1
+            else:
+                flight.waiters += 1
+                self._stats.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return share(flight.result)
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is not None:
+                    self._stats.errors += 1
+                waiters = flight.waiters
+            flight.done.set()
+        # with waiters, the leader gets a copy too, so no caller can mutate the shared result
+        return share(flight.result) if waiters else flight.result
+
+    def stats(self) -> dict[str, int]:
+        """Executions run and saved, failed executions, and calls in flight now."""
+        with self._lock:
+            self._stats.in_flight = len(self._flights)
+            return asdict(self._stats)
@@ -0,0 +1,312 @@
+"""Lightweight SQL text helpers (normalization, relation extraction, SELECT building).
+
+These work on the raw SQL strings we pass around; they are deliberately simple
+token scanners rather than a full parser, and err on the side of reporting
+too many relations rather than too few.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import re
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
+
+# Escape strings (E'it\'s') take backslash escapes, so `\'` does not close them.
+_E_STRING = r"(?<![\w$])[Ee]'(?:[^'\\]|\\.|'')*'"
+_STRING = rf"{_E_STRING}|'(?:[^']|'')*'"
+# Quoted strings/identifiers are matched first so comments and whitespace inside them are kept.
+_LEXICAL_RE = re.compile(
+    rf"(?P<quoted>{_STRING}|\"[^\"]*\")|(?P<gap>(?:\s+|--[^\n]*|/\*.*?\*/)+)",
+    re.S,
+)
+_STRING_RE = re.compile(_STRING, re.S)
+_LITERAL_RE = re.compile(rf"{_STRING}|\b\d+(?:\.\d+)?\b", re.S)
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+# Tokens that can hide a `;`: quotes (E'...' with backslash escapes), comments and
+# dollar-quoted bodies ($$...$$, $fn$...$fn$). An opener without its closer means
+# the statement continues on a later line; `$` inside identifiers (foo$bar) does
+# not open a quote.
+_SCRIPT_TOKEN_RE = re.compile(
+    r"""
+    (?<![\w$])[Ee]'(?:[^'\\]|\\.|'')*'
+    | '(?:[^']|'')*'
+    | "[^"]*"
+    | --[^\n]*\n
+    | /\*.*?\*/
+    | (?<![\w$])\$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$
+    | (?P<end>;)
+    | (?P<open>(?<![\w$])[Ee]'|'|"|--|/\*|(?<![\w$])\$(?:[A-Za-z_]\w*)?\$)
+    """,
+    re.S | re.X,
+)
+
+_TOKEN_RE = re.compile(r'"[^"]*"|[A-Za-z_][\w$]*|\d+(?:\.\d+)?|\S')
+_IDENT_RE = re.compile(r'"[^"]*"|[A-Za-z_][\w$]*')
+_CTE_RE = re.compile(
+    r'(?:\bWITH(?:\s+RECURSIVE)?|,)\s*("[^"]+"|[A-Za-z_][\w$]*)\s+AS\s*\(', re.I
+)
+
+# Keywords after which a relation name is expected.
+_RELATION_KEYWORDS = {"from", "join", "into", "update", "table", "view", "truncate"}
+# Keywords that may sit between those and the relation name.
+_RELATION_PREFIXES = {"if", "not", "exists", "only", "lateral"}
+# Keywords that close a FROM list (after which commas no longer separate relations).
+_FROM_LIST_END = {
+    "where",
+    "group",
+    "order",
+    "limit",
+    "having",
+    "union",
+    "intersect",
+    "except",
+    "window",
+    "offset",
+    "fetch",
+    "for",
+    "returning",
+    "set",
+    "values",
+    "on",
+    "using",
+}
+# Functions whose argument lists use FROM without naming a relation.
+_FROM_FUNCTIONS = {"extract", "substring", "trim", "overlay", "position"}
+
+
+def strip_comments(sql: str) -> str:
+    """Remove `--` and `/* */` comments and collapse whitespace outside quotes."""
+    return _LEXICAL_RE.sub(lambda m: m.group("quoted") or " ", sql)
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical form of a statement: no comments, collapsed whitespace, no trailing ';'."""
+    return strip_comments(sql).strip().rstrip(";").strip()
+
+
+def _closer(opener: str) -> str:
+    if opener.endswith("'"):  # '...' and E'...'
+        return "'"
+    return {"--": "\n", "/*": "*/"}.get(opener, opener)
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """
+    Split a script on top-level `;` as it is read, yielding `(line, statement)`.
+
+    `lines` is any iterable of text that breaks only between lines, e.g. an open
+    file, so a script is never held in memory whole. `;` inside quotes, comments
+    and dollar-quoted bodies does not end a statement. `line` is the 1-based line
+    the statement starts on; statements that are empty or only comments are dropped.
+    """
+    buf, pos, line = "", 0, 1
+    pending = None  # closer of a quote/comment left open at the end of `buf`
+    for chunk in itertools.chain(lines, [None]):
+        final = chunk is None
+        if final:
+            buf += "\n"  # closes a trailing `--` comment
+        else:
+            buf += chunk
+            if pending is not None and pending not in chunk:
+                continue
+        pending = None
+        start = 0
+        while True:
+            m = _SCRIPT_TOKEN_RE.search(buf, pos)
+            if m is None:
+                pos = len(buf)
+                break
+            if m.group("open") is not None:
+                if final:  # never closed: the rest is one (invalid) statement
+                    pos = len(buf)
+                    break
+                pending, pos = _closer(m.group("open")), m.start()
+                break
+            pos = m.end()
+            if m.group("end") is not None:
+                statement = buf[start : m.start()]
+                if strip_comments(statement).strip():
+                    lead = len(statement) - len(statement.lstrip())
+                    yield line + statement.count("\n", 0, lead), statement.strip()
+                line += buf.count("\n", start, m.end())
+                start = m.end()
+        if final and strip_comments(buf[start:]).strip():
+            statement = buf[start:]
+            lead = len(statement) - len(statement.lstrip())
+            yield line + statement.count("\n", 0, lead), statement.strip()
+        buf, pos = buf[start:], pos - start
+
+
+def split_statements(sql: str) -> list[str]:
+    """Split a script on top-level `;` (ignoring those in quotes, comments and dollar quotes); empty statements are dropped."""
+    return [statement for _, statement in iter_statements([sql])]
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Short stable id of a statement's shape: literals become `?` and literal lists
+    collapse, so calls differing only in constants share a fingerprint.
+    """
+    shape = _IN_LIST_RE.sub("(?)", _LITERAL_RE.sub("?", normalize_sql(sql)))
+    return hashlib.sha1(shape.lower().encode()).hexdigest()[:16]
+
+
+def _unquote(ident: str) -> str:
+    return ident[1:-1] if ident.startswith('"') else ident.lower()
+
+
+def referenced_relations(sql: str) -> set[str]:
+    """
+    Best-effort set of relation names a statement reads or writes.
+
+    Names are returned as written (schema-qualified when the SQL qualifies them),
+    lowercased unless quoted. CTE names and set-returning functions in FROM are
+    excluded; comma-separated FROM lists and parenthesized joins are followed.
+    """
+    text = _STRING_RE.sub("''", strip_comments(sql))
+    ctes = {_unquote(name) for name in _CTE_RE.findall(text)}
+    tokens = _TOKEN_RE.findall(text)
+    relations: set[str] = set()
+    depth = 0
+    from_depths: set[int] = set()  # depths with an open FROM list
+    fn_depths: set[int] = set()  # depths inside EXTRACT(... FROM ...) and friends
+    expect = None  # keyword that makes the next identifier a relation
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        low = tok.lower()
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if tok == "(":
+            depth += 1
+        elif tok == ")":
+            from_depths.discard(depth)
+            fn_depths.discard(depth)
+            depth -= 1
+            expect = None
+        elif tok == ";":
+            depth, expect = 0, None
+            from_depths.clear()
+            fn_depths.clear()
+        elif tok == ",":
+            expect = "from" if depth in from_depths else None
+        elif low in _FROM_FUNCTIONS and nxt == "(":
+            fn_depths.add(depth + 1)
+        elif low in _RELATION_KEYWORDS:
+            if low == "from" and (
+                depth in fn_depths or tokens[i - 1].lower() == "distinct"
+            ):
+                expect = None
+            else:
+                expect = low
+                if low == "from":
+                    from_depths.add(depth)
+        elif low in _FROM_LIST_END:
+            from_depths.discard(depth)
+            expect = None
+        elif expect and low in _RELATION_PREFIXES:
+            pass
+        elif expect and _IDENT_RE.fullmatch(tok) and low != "select":
+            parts = [_unquote(tok)]
+            while tokens[i + 1 : i + 2] == ["."] and i + 2 < len(tokens):
+                parts.append(_unquote(tokens[i + 2]))
+                i += 2
+            is_function = expect in ("from", "join") and tokens[i + 1 : i + 2] == ["("]
+            name = ".".join(parts)
+            if not is_function and not (len(parts) == 1 and name in ctes):
+                relations.add(name)
+            expect = None
+        else:
+            expect = None
+        i += 1
+    return relations
+
+
+def relation_basename(name: str) -> str:
+    """Unqualified part of a relation name ("mimiciii.sofa" -> "sofa")."""
+    return name.rsplit(".", 1)[-1]
+
+
+# Operators accepted in `build_select` filters given as (operator, value).
+_FILTER_OPERATORS = {"=", "!=", "<>", "<", "<=", ">", ">=", "like", "ilike", "not like"}
+
+
+def _python_value(value: Any) -> Any:
+    """Unwrap numpy scalars so the driver can adapt them."""
+    return value.item() if hasattr(value, "item") and callable(value.item) else value
+
+
+def build_select(
+    quote: Callable[[str], str],
+    relation: str,
+    columns: Optional[Sequence[str]] = None,
+    where: Optional[Mapping[str, Any]] = None,
+    order_by: Union[str, Sequence[str], None] = None,
+    limit: Optional[int] = None,
+) -> tuple[str, dict[str, Any]]:
+    """
+    Build a parameterized `SELECT cols FROM relation WHERE ... ORDER BY ... LIMIT n`.
+
+    Identifiers go through `quote` (the dialect's identifier preparer); values are
+    always bound, never inlined. Filters in `where` map a column to:
+
+    - a scalar: `col = :value`
+    - None: `col IS NULL`
+    - a list / set / array: `col = ANY(:values)`
+    - an (operator, value) tuple, e.g. (">=", 65) or ("ilike", "%sepsis%");
+      ("between", (lo, hi)) is also accepted
+
+    `order_by` entries prefixed with "-" sort descending.
+    """
+    cols = ", ".join(quote(c) for c in columns) if columns else "*"
+    sql = f"SELECT {cols} FROM {relation}"
+    params: dict[str, Any] = {}
+    clauses = []
+    for i, (col, value) in enumerate((where or {}).items()):
+        name = f"w{i}"
+        ident = quote(col)
+        if (
+            isinstance(value, tuple)
+            and len(value) == 2
+            and isinstance(value[0], str)
+            and value[0].lower() in _FILTER_OPERATORS | {"between"}
+        ):
+            op, operand = value[0].lower(), value[1]
+            if op == "between":
+                lo, hi = operand
+                clauses.append(f"{ident} BETWEEN :{name}_lo AND :{name}_hi")
+                params[f"{name}_lo"] = _python_value(lo)
+                params[f"{name}_hi"] = _python_value(hi)
+                continue
+            clauses.append(f"{ident} {op.upper()} :{name}")
+            params[name] = _python_value(operand)
+        elif value is None:
+            clauses.append(f"{ident} IS NULL")
+        elif isinstance(value, (list, tuple, set, frozenset)) or hasattr(
+            value, "tolist"
+        ):
+            values = value.tolist() if hasattr(value, "tolist") else list(value)
+            clauses.append(f"{ident} = ANY(:{name})")
+            params[name] = [_python_value(v) for v in values]
+        else:
+            clauses.append(f"{ident} = :{name}")
+            params[name] = _python_value(value)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if order_by:
+        keys = [order_by] if isinstance(order_by, str) else list(order_by)
+        sql += " ORDER BY " + ", ".join(
+            f"{quote(k[1:])} DESC" if k.startswith("-") else quote(k) for k in keys
+        )
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return sql, params
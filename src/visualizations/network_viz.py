@@ -16,7 +16,7 @@ from visualizations.config import *
 
 GENERATED_NETWORK_PATH = "assets/fig_1/fig_1c.png"
 
-DB_CONN = DB.from_url(DATABASE_URL)
+DB_CONN = DB.from_url(DATABASE_URL, cache_dir=QUERY_CACHE_DIR)
 
 
 def get_detailComorbidityData_PerPatient():
@@ -25,13 +25,17 @@ def get_detailComorbidityData_PerPatient():
     Returns:
         pandas.DataFrame: DataFrame with detail comorbidity data per patient.
     """
-    admission_comorbidity_details = DB_CONN.query_df(
-        f"SELECT * FROM {ADMISSION_COMORBIDITY_TABLE}"
+    # both fetches run at once
+    comorbidity, targets = DB_CONN.prefetch(
+        [
+            f"SELECT * FROM {ADMISSION_COMORBIDITY_TABLE}",
+            f"SELECT * FROM {TARGET_PATIENT}",
+        ]
     )
-    target_patients = DB_CONN.query_df(f"SELECT * FROM {TARGET_PATIENT}")
+    target_patients = targets.result()
 
     return target_patients[["hadm_id"]].merge(
-        admission_comorbidity_details, on="hadm_id", how="left"
+        comorbidity.result(), on="hadm_id", how="left"
     )
 
 
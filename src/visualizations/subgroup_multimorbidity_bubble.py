@@ -12,7 +12,7 @@ import pandas as pd
 from mimiciii_db import DB
 from visualizations.config import *
 
-DB_CONN = DB.from_url(DATABASE_URL)
+DB_CONN = DB.from_url(DATABASE_URL, cache_dir=QUERY_CACHE_DIR)
 
 
 def plot_subgroup_multimorbidity_bubble(
@@ -91,12 +91,9 @@ def load_subgroup_and_morbidity_data(csv_path: str, subgroup_col: str = "subgrou
     # Load subgroup assignments
     subgroup_df = pd.read_csv(csv_path)[["hadm_id", subgroup_col]]
 
-    # Query morbidity counts from database
-    morbidity_df = DB_CONN.query_df(f"SELECT * FROM {MORBIDITY_COUNTS_TABLE}")
-
-    # Merge the data
-    merged_df = subgroup_df[["hadm_id", subgroup_col]].merge(
-        morbidity_df[["hadm_id", "morbidity_count"]], on="hadm_id", how="inner"
+    # Join with the morbidity counts server-side
+    merged_df = DB_CONN.join_local(
+        subgroup_df, MORBIDITY_COUNTS_TABLE, columns=["morbidity_count"]
     )
 
     return merged_df
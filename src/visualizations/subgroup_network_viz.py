@@ -16,7 +16,7 @@ import pandas as pd
 from mimiciii_db import DB
 from visualizations.config import *
 
-DB_CONN = DB.from_url(DATABASE_URL)
+DB_CONN = DB.from_url(DATABASE_URL, cache_dir=QUERY_CACHE_DIR)
 NODE_COLOR = {
     1: "white",
     3: "#90EE90",  # light green
@@ -39,11 +39,8 @@ def load_subgroup_comorbidity_data(
     # Load subgroup assignments
     subgroup_df = pd.read_csv(subgroup_csv_path)[["hadm_id", "subgroup_K6"]]
 
-    # Load comorbidity data from database
-    comorbidity_df = DB_CONN.query_df(f"SELECT * FROM {ADMISSION_COMORBIDITY_TABLE}")
-
-    # Merge subgroup assignments with comorbidity data
-    merged_df = subgroup_df.merge(comorbidity_df, on="hadm_id", how="inner")
+    # Join the assignments with the comorbidity data server-side
+    merged_df = DB_CONN.join_local(subgroup_df, ADMISSION_COMORBIDITY_TABLE)
 
     return merged_df
 
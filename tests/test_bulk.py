@@ -0,0 +1,104 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from mimiciii_db import bulk
+
+# what `COPY (...) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '\N')` sends:
+# NULL unquoted, empty strings and text equal to the marker quoted
+COPY_CSV = (
+    b"hadm_id,flag,note,los,charttime\n"
+    b'1,t,"",1.5,2101-01-01 08:00:00\n'
+    b"2,\\N,\\N,\\N,\\N\n"
+    b"3,f,NA,2,2101-01-02 00:00:00\n"
+    b'4,t,"\\N",0.5,2101-01-03 00:00:00\n'
+)
+COLUMNS = [
+    ("hadm_id", 23),
+    ("flag", 16),
+    ("note", 25),
+    ("los", 701),
+    ("charttime", 1114),
+]
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "c"])
+def test_read_copy_csv_keeps_nulls_empty_strings_and_text_apart(engine, monkeypatch):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(bulk, "_CSV_ENGINE", engine)
+    df = bulk.read_copy_csv(io.BytesIO(COPY_CSV), COLUMNS)
+    assert df.dtypes.astype(str).tolist() == [
+        "Int32",
+        "boolean",
+        "object",
+        "float64",
+        "datetime64[ns]",
+    ]
+    assert df["note"][0] == "" and pd.isna(df["note"][1]) and df["note"][2] == "NA"
+    if engine == "pyarrow":  # the C parser cannot tell a quoted "\N" from NULL
+        assert df["note"][3] == "\\N"
+    assert df["hadm_id"].tolist() == [1, 2, 3, 4]
+    assert df["flag"].isna().tolist() == [False, True, False, False]
+    assert pd.isna(df["los"][1]) and pd.isna(df["charttime"][1])
+    assert df["charttime"][2] == datetime(2101, 1, 2)
+
+
+def test_read_copy_arrow_keeps_nulls_empty_strings_and_text_apart():
+    pa = pytest.importorskip("pyarrow")
+    table = bulk.read_copy_arrow(io.BytesIO(COPY_CSV), COLUMNS)
+    assert table.schema.types == [
+        pa.int32(),
+        pa.bool_(),
+        pa.string(),
+        pa.float64(),
+        pa.timestamp("us"),
+    ]
+    assert table.column("note").to_pylist() == ["", None, "NA", "\\N"]
+    assert table.column("flag").to_pylist() == [True, None, False, True]
+    assert table.column("los").null_count == 1
+
+
+@pytest.mark.parametrize("return_type", ["arrow", "polars", "pandas_arrow"])
+def test_from_arrow_hands_copy_output_to_each_container(return_type):
+    pa = pytest.importorskip("pyarrow")
+    if return_type == "polars":
+        pytest.importorskip("polars")
+    table = bulk.read_copy_arrow(io.BytesIO(COPY_CSV), COLUMNS)
+    result = bulk.from_arrow(table, return_type)
+    if return_type == "arrow":
+        assert result is table
+    elif return_type == "polars":
+        import polars as pl
+
+        assert isinstance(result, pl.DataFrame)
+        assert result.dtypes == [
+            pl.Int32,
+            pl.Boolean,
+            pl.String,
+            pl.Float64,
+            pl.Datetime("us"),
+        ]
+        assert result["note"].to_list() == ["", None, "NA", "\\N"]
+        assert result["flag"].null_count() == 1
+    else:
+        assert isinstance(result, pd.DataFrame)
+        assert all(isinstance(t, pd.ArrowDtype) for t in result.dtypes)
+        assert result.dtypes["hadm_id"].pyarrow_dtype == pa.int32()
+        assert result["note"].isna().tolist() == [False, True, False, False]
+        assert result["note"][0] == "" and result["note"][3] == "\\N"
+    with pytest.raises(ValueError):
+        bulk.from_arrow(table, "numpy")
+
+
+def test_concat_results_keeps_the_container():
+    pytest.importorskip("pyarrow")
+    pl = pytest.importorskip("polars")
+    table = bulk.read_copy_arrow(io.BytesIO(COPY_CSV), COLUMNS)
+    tables = bulk.concat_results([table, table.slice(0, 2)])
+    assert tables.num_rows == 6 and tables.schema == table.schema
+    frames = bulk.concat_results([pl.from_arrow(table), pl.from_arrow(table)])
+    assert isinstance(frames, pl.DataFrame) and frames.height == 8
+    assert frames["note"].null_count() == 2
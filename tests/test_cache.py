@@ -0,0 +1,87 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from mimiciii_db.cache import ParquetCache  # noqa: E402
+
+# relation, relkind, relfilenode, n_tup_ins, n_tup_upd, n_tup_del
+VERSION = [["mimiciii.admissions", "r", 16400, 58976, 0, 0]]
+
+
+def _frame(n=100):
+    return pd.DataFrame({"hadm_id": range(n), "note": ["x" * 50] * n})
+
+
+def test_key_normalizes_sql_and_tracks_params_variant_and_version():
+    key = ParquetCache.key("SELECT 1 FROM t WHERE a = :a", {"a": 1}, VERSION)
+    assert key == ParquetCache.key(
+        "-- lookup\nSELECT 1\n  FROM t WHERE a = :a;", {"a": 1}, VERSION
+    )
+    assert key != ParquetCache.key("SELECT 1 FROM t WHERE a = :a", {"a": 2}, VERSION)
+    assert key != ParquetCache.key(
+        "SELECT 1 FROM t WHERE a = :a", {"a": 1}, VERSION, "arrow"
+    )
+    bumped = [VERSION[0][:3] + [58977, 0, 0]]
+    assert key != ParquetCache.key("SELECT 1 FROM t WHERE a = :a", {"a": 1}, bumped)
+
+
+def test_round_trip_and_version_change_is_a_miss(tmp_path):
+    cache = ParquetCache(str(tmp_path))
+    sql = "SELECT hadm_id FROM mimiciii.admissions"
+    key = cache.key(sql, None, VERSION)
+    assert cache.get(key) is None
+    cache.put(key, _frame())
+    pd.testing.assert_frame_equal(cache.get(key), _frame())
+    # one more insert into admissions moves the version stamp, so the entry is not reused
+    bumped = [VERSION[0][:3] + [58977, 0, 0]]
+    assert cache.get(cache.key(sql, None, bumped)) is None
+
+
+def test_expired_entries_are_misses_and_removed(tmp_path, monkeypatch):
+    cache = ParquetCache(str(tmp_path), ttl=60)
+    key = cache.key("SELECT 1", None, VERSION)
+    cache.put(key, _frame())
+    assert cache.get(key) is not None
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert cache.get(key) is None
+    assert list(tmp_path.glob("*.parquet")) == []
+
+
+def test_no_ttl_keeps_entries(tmp_path, monkeypatch):
+    cache = ParquetCache(str(tmp_path), ttl=None)
+    key = cache.key("SELECT 1", None, VERSION)
+    cache.put(key, _frame())
+    later = time.time() + 10 * 365 * 24 * 3600
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert cache.get(key) is not None
+
+
+def test_size_budget_evicts_least_recently_used(tmp_path):
+    cache = ParquetCache(str(tmp_path), max_bytes=10**9, ttl=None)
+    keys = [cache.key(f"SELECT {i}", None, VERSION) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, _frame(1000 + i))
+    # access order: keys[1] oldest, then keys[0], then keys[2]
+    now = time.time()
+    for key, age in zip(keys, (200, 300, 100)):
+        (path,) = tmp_path.glob(f"{key}-*.parquet")
+        os.utime(path, (now - age, now - age))
+    entry = max(p.stat().st_size for p in tmp_path.glob("*.parquet"))
+    cache.max_bytes = 2 * entry
+    cache.evict()
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.size_bytes() <= cache.max_bytes
+
+
+def test_clear_removes_every_entry(tmp_path):
+    cache = ParquetCache(str(tmp_path))
+    for i in range(2):
+        cache.put(cache.key(f"SELECT {i}", None, VERSION), _frame())
+    cache.clear()
+    assert cache.size_bytes() == 0
@@ -0,0 +1,36 @@
+from mimiciii_db.catalog import SMALL_ROWS, QueryCatalog
+
+
+def q(sid: int):
+    """One patient."""
+    return "SELECT * FROM patients WHERE subject_id = :sid", {"sid": sid}
+
+
+def test_catalog_falls_back_to_parent_and_wraps_plain_functions():
+    parent = QueryCatalog()
+    parent.register("q", relations=["mimiciii.patients"])(q)
+    child = QueryCatalog(parent=parent)
+    child["plain"] = lambda: ("SELECT 1", {})
+    assert list(child) == ["plain", "q"]
+    entry = child["q"]
+    assert entry.params == ("sid",) and entry.description == "One patient."
+    assert entry(sid=1) == q(1)
+    assert child["plain"]() == ("SELECT 1", {})
+    frame = child.to_frame().set_index("name")
+    assert (
+        frame.loc["q", "scope"] == "global" and frame.loc["plain", "scope"] == "local"
+    )
+
+
+def test_auto_plan_follows_result_size():
+    catalog = QueryCatalog()
+    catalog.register("lookup", expected_rows=1)(q)
+    catalog.register("unknown")(q)
+    assert catalog["lookup"].plan() == ("regular", "memo")
+    assert catalog["unknown"].plan() == ("regular", "all")
+    catalog["unknown"].observed_rows = SMALL_ROWS - 1
+    assert catalog["unknown"].plan() == ("regular", "memo")
+    catalog.register("big", expected_rows=10**7)(q)
+    assert catalog["big"].plan() == ("regular", "all")  # COPY only when asked for
+    catalog.register("copied", fetch="copy")(q)
+    assert catalog["copied"].plan() == ("copy", "all")
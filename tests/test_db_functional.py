@@ -1,8 +1,16 @@
+import asyncio
+import os
+import threading
+from datetime import datetime
+
 import pandas as pd
 import pytest
 
-from mimiciii_db import DB
+from mimiciii_db import DB, AsyncDB
+from mimiciii_db.cancel import CancelHandle
 from mimiciii_db.config import db_url
+from mimiciii_db.parallel import partition_cuts
+from mimiciii_db.session import SESSION_PROFILES
 
 
 @pytest.fixture(scope="module")
@@ -85,6 +93,587 @@ def test_db_d_icd_diagnoses_table(db):
     } == set(result_table.columns)
 
 
+def test_iter_df_yields_bounded_chunks(db):
+    """Streaming a table returns the same rows as a single fetch, in bounded chunks."""
+    sql = "SELECT subject_id FROM mimiciii.patients ORDER BY subject_id LIMIT 250"
+    chunks = list(db.iter_df(sql, chunksize=100))
+    assert [len(c) for c in chunks] == [100, 100, 50]
+    streamed = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(streamed, db.query_df(sql))
+
+
+def test_query_df_compact_dtypes(db):
+    """The compact policy shrinks ids/flags/text without changing values."""
+    sql = """
+        SELECT subject_id, gender, expire_flag
+        FROM mimiciii.patients ORDER BY subject_id LIMIT 100
+    """
+    regular = db.query_df(sql)
+    compact = db.query_df(sql, dtypes="compact")
+    assert str(compact["subject_id"].dtype) == "int32"
+    assert str(compact["gender"].dtype) == "category"
+    assert str(compact["expire_flag"].dtype) == "int8"
+    pd.testing.assert_frame_equal(compact.astype(regular.dtypes), regular)
+
+
+def test_table_df_projection_and_filters(db):
+    result_table = db.table_df(
+        "admissions",
+        schema="mimiciii",
+        columns=["hadm_id", "admission_type"],
+        where={"admission_type": ["ELECTIVE", "URGENT"], "deathtime": None},
+        order_by="-hadm_id",
+        limit=20,
+    )
+    assert list(result_table.columns) == ["hadm_id", "admission_type"]
+    assert len(result_table) == 20
+    assert set(result_table["admission_type"]) <= {"ELECTIVE", "URGENT"}
+    assert result_table["hadm_id"].is_monotonic_decreasing
+
+
+def test_query_df_parallel_matches_query_df(db):
+    """Key-range slices add up to exactly the rows of a single fetch."""
+    sql = "SELECT hadm_id, subject_id, admission_type FROM mimiciii.admissions"
+    parallel = db.query_df_parallel(sql, partition_key="hadm_id", partitions=3)
+    regular = db.query_df(sql, use_cache=False)
+    pd.testing.assert_frame_equal(
+        parallel.sort_values("hadm_id", ignore_index=True),
+        regular.sort_values("hadm_id", ignore_index=True),
+    )
+
+
+@pytest.mark.parametrize("return_type", ["arrow", "polars", "pandas_arrow"])
+def test_return_types_on_query_table_and_run(db, return_type):
+    pa = pytest.importorskip("pyarrow")
+    if return_type == "polars":
+        pl = pytest.importorskip("polars")
+    sql = (
+        "SELECT g AS id, g::float8 / 2 AS half, g % 2 = 0 AS even, "
+        "CASE WHEN g = 2 THEN NULL WHEN g = 3 THEN '' ELSE 'x' END AS note, "
+        "timestamp '2101-01-01' + g * interval '1 day' AS charttime "
+        "FROM generate_series(1, 3) AS g ORDER BY g"
+    )
+
+    @db.register(f"return_type_{return_type}", cache="none")
+    def typed():
+        return sql, {}
+
+    results = [
+        db.query_df(sql, return_type=return_type),
+        db.query_df(sql, return_type=return_type, copy=True),
+        db.run(f"return_type_{return_type}", return_type=return_type),
+    ]
+    for result in results:
+        if return_type == "arrow":
+            assert isinstance(result, pa.Table)
+            assert result.schema.types == [
+                pa.int32(),
+                pa.float64(),
+                pa.bool_(),
+                pa.string(),
+                pa.timestamp("us"),
+            ]
+            assert result.column("note").to_pylist() == ["x", None, ""]
+        elif return_type == "polars":
+            assert isinstance(result, pl.DataFrame)
+            assert result.dtypes == [
+                pl.Int32,
+                pl.Float64,
+                pl.Boolean,
+                pl.String,
+                pl.Datetime("us"),
+            ]
+            assert result["note"].to_list() == ["x", None, ""]
+        else:
+            assert isinstance(result, pd.DataFrame)
+            assert result.dtypes["id"] == pd.ArrowDtype(pa.int32())
+            assert result.dtypes["note"] == pd.ArrowDtype(pa.string())
+            assert result["note"].isna().tolist() == [False, True, False]
+    table = db.table_df(
+        "patients",
+        schema="mimiciii",
+        columns=["subject_id", "dod"],
+        limit=20,
+        order_by="subject_id",
+        return_type=return_type,
+    )
+    assert len(table) == 20
+    if return_type == "arrow":
+        assert table.schema.types == [pa.int32(), pa.timestamp("us")]
+    elif return_type == "polars":
+        assert table.dtypes == [pl.Int32, pl.Datetime("us")]
+    else:
+        assert table.dtypes.tolist() == [
+            pd.ArrowDtype(pa.int32()),
+            pd.ArrowDtype(pa.timestamp("us")),
+        ]
+
+
+def test_partition_cuts_keep_the_key_type(db):
+    """Cuts bound as numeric against an integer key would defeat its index."""
+    sql = "SELECT * FROM mimiciii.admissions"
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE mimiciii.admissions")
+        for bounds in ("histogram", "minmax"):
+            cuts = partition_cuts(conn, sql, "hadm_id", 4, bounds=bounds)
+            assert len(cuts) == 3
+            assert all(type(c) is int for c in cuts)
+            times = partition_cuts(conn, sql, "admittime", 4, bounds=bounds)
+            assert all(isinstance(c, datetime) for c in times)
+
+
+def test_query_stats_groups_calls_by_fingerprint(db):
+    db.metrics.clear()
+    for subject_id in (1, 2, 3):
+        db.query_df(f"SELECT * FROM mimiciii.patients WHERE subject_id > {subject_id}")
+    stats = db.query_stats()
+    assert len(stats) == 1
+    row = stats.iloc[0]
+    assert row["calls"] == 3 and row["errors"] == 0
+    assert 0 < row["p50_s"] <= row["p95_s"] <= row["p99_s"]
+    assert row["rows"] > 0 and row["nbytes"] > 0
+    assert "mimiciii_db_query_duration_seconds_count" in db.metrics.to_prometheus()
+
+
+def test_prepared_registered_query_matches_plain(db):
+    sql = "SELECT * FROM mimiciii.patients WHERE subject_id = :sid AND gender LIKE :g"
+    db.register("patient_plain")(lambda sid: (sql, {"sid": sid, "g": "%"}))
+    db.register("patient_prepared", prepare=True)(
+        lambda sid: (sql, {"sid": sid, "g": "%"})
+    )
+    for sid in db.query_df("SELECT subject_id FROM mimiciii.patients LIMIT 3")[
+        "subject_id"
+    ]:
+        pd.testing.assert_frame_equal(
+            db.run("patient_prepared", sid=int(sid)),
+            db.run("patient_plain", sid=int(sid)),
+        )
+    # statements dropped on the server are re-prepared transparently
+    db.execute("DEALLOCATE ALL")
+    assert len(db.run("patient_prepared", sid=int(sid))) == 1
+
+
+def test_pool_stats_reports_checkouts(db):
+    before = db.pool_stats()["checkouts"]
+    db.query_df("SELECT 1")
+    stats = db.pool_stats()
+    assert stats["checkouts"] == before + 1
+    assert stats["checked_out"] == 0 and stats["size"] == 5
+    assert sum(stats["wait_histogram"].values()) == stats["checkouts"]
+
+
+def test_reads_routed_to_replica_writes_to_primary():
+    """Needs REPLICA_DATABASE_URL pointing at a streaming replica of DATABASE_URL."""
+    if not os.getenv("REPLICA_DATABASE_URL"):
+        pytest.skip("REPLICA_DATABASE_URL not set")
+    routed = DB.from_url(
+        db_url(), replica_urls=[db_url("REPLICA_DATABASE_URL")], read_your_writes=30
+    )
+    try:
+        assert routed.query_df("SELECT pg_is_in_recovery() AS r")["r"].iloc[0]
+        routed.execute("CREATE TEMP TABLE routing_probe AS SELECT 1 AS x")
+        assert not routed.query_df("SELECT pg_is_in_recovery() AS r")["r"].iloc[0]
+    finally:
+        routed.dispose()
+
+
+def test_replica_reads_are_not_stored_under_the_primarys_version(db, tmp_path):
+    # a second engine on the same server stands in for the replica
+    url = db.engine.url.render_as_string(hide_password=False)
+    routed = DB.from_url(
+        url,
+        replica_urls=[url],
+        read_your_writes=30,
+        cache_dir=str(tmp_path),
+        memo_max_bytes=16 * 1024**2,
+    )
+    try:
+        sql = "SELECT subject_id FROM mimiciii.patients ORDER BY 1 LIMIT 10"
+        assert len(routed.query_df(sql)) == 10
+        assert routed.memo_stats()["entries"] == 0 and routed.cache.size_bytes() == 0
+        routed.router.wrote()  # reads go to the primary for the next 30 s
+        assert len(routed.query_df(sql)) == 10
+        assert routed.memo_stats()["entries"] == 1 and routed.cache.size_bytes() > 0
+    finally:
+        routed.dispose()
+
+
+def test_timeout_applies_to_one_statement_only(db):
+    with pytest.raises(RuntimeError, match="statement timeout"):
+        db.query_df("SELECT pg_sleep(5)", timeout=0.2)
+    with pytest.raises(RuntimeError, match="statement timeout"):
+        db.execute("SELECT pg_sleep(5)", timeout=0.2)
+    # the pooled connection comes back without the timeout
+    assert db.query_df("SHOW statement_timeout")["statement_timeout"].iloc[0] == "0"
+
+
+def test_cancel_handle_cancels_running_query(db):
+    handle = CancelHandle()
+    assert handle.cancel() is False  # nothing running yet
+    timer = threading.Timer(0.5, handle.cancel)
+    timer.start()
+    with pytest.raises(RuntimeError, match="user request"):
+        db.query_df("SELECT pg_sleep(10)", cancel=handle)
+    timer.join()
+    assert handle.cancelled
+    assert db.query_df("SELECT 1 AS x")["x"].iloc[0] == 1
+
+
+def test_export_parquet_manifest_and_incremental(db, tmp_path):
+    from mimiciii_db.export import read_manifest, verify_export
+
+    first = db.export_parquet(str(tmp_path), ["patients", "no_such_view"])
+    assert first["status"].tolist() == ["exported", "missing"]
+    entry = read_manifest(str(tmp_path))["relations"]["patients"]
+    assert entry["rows"] == len(db.query_df("SELECT * FROM mimiciii.patients"))
+    assert verify_export(str(tmp_path)) == []
+    again = db.export_parquet(str(tmp_path), ["patients"])
+    assert again["status"].tolist() == ["unchanged"]
+    forced = db.export_parquet(str(tmp_path), ["patients"], incremental=False)
+    assert forced["status"].tolist() == ["exported"]
+
+
+def test_export_parquet_splits_and_versions_partitioned_tables(db, tmp_path):
+    from mimiciii_db.export import read_manifest
+
+    db.execute(
+        "CREATE TABLE public.export_parts (id int, note text) PARTITION BY RANGE (id)"
+    )
+    try:
+        for i, (lo, hi) in enumerate([(0, 500), (500, 1000)]):
+            db.execute(
+                f"CREATE TABLE public.export_parts_{i} PARTITION OF "
+                f"public.export_parts FOR VALUES FROM ({lo}) TO ({hi})"
+            )
+        db.execute(
+            "INSERT INTO public.export_parts "
+            "SELECT g, CASE WHEN g % 2 = 0 THEN NULL ELSE 'x' END "
+            "FROM generate_series(0, 999) AS g"
+        )
+        db.execute("ANALYZE public.export_parts")
+        kwargs = dict(schema="public", rows_per_file=400, partition_key="id")
+        first = db.export_parquet(str(tmp_path), ["export_parts"], **kwargs)
+        assert first["status"].tolist() == ["exported"] and first["files"][0] > 1
+        entry = read_manifest(str(tmp_path))["relations"]["export_parts"]
+        assert entry["rows"] == 1000 and entry["partition_key"] == "id"
+        parts = pd.read_parquet(tmp_path / "export_parts")
+        assert parts["note"].isna().sum() == 500
+        # a write to a child partition moves the parent's version stamp
+        db.execute("INSERT INTO public.export_parts_1 VALUES (999, 'y')")
+        inserted = (
+            "SELECT n_tup_ins AS n FROM pg_stat_user_tables "
+            "WHERE relid = 'public.export_parts_1'::regclass"
+        )
+        for _ in range(50):  # table counters are flushed up to a second after commit
+            if db.query_df(inserted, use_cache=False)["n"][0] == 501:
+                break
+            threading.Event().wait(0.1)
+        again = db.export_parquet(str(tmp_path), ["export_parts"], **kwargs)
+        assert again["status"].tolist() == ["exported"] and again["rows"][0] == 1001
+    finally:
+        db.execute("DROP TABLE IF EXISTS public.export_parts")
+
+
+def test_run_sees_globally_registered_queries(db):
+    from mimiciii_db import registry
+    from mimiciii_db.catalog import CATALOG
+
+    registry("global_patient_count", expected_rows=1)(
+        lambda: ("SELECT count(*) AS n FROM mimiciii.patients", {})
+    )
+    try:
+        assert db.run("global_patient_count")["n"].iloc[0] > 0
+        assert db.catalog["global_patient_count"].observed_rows == 1
+    finally:
+        del CATALOG["global_patient_count"]
+
+
+def test_query_df_many_binds_chunks_of_keys(db, monkeypatch):
+    ids = db.query_df("SELECT hadm_id FROM mimiciii.admissions LIMIT 25")["hadm_id"]
+    bound = []
+    query_df = db.query_df
+
+    def spy(sql, params=None, **kwargs):
+        bound.extend(params["keys"])
+        return query_df(sql, params, **kwargs)
+
+    monkeypatch.setattr(db, "query_df", spy)
+    many = db.query_df_many(
+        "SELECT * FROM mimiciii.admissions",
+        "hadm_id",
+        list(ids.to_numpy()) + [None, float("nan"), ids[0]],
+        chunk_size=10,
+    )
+    monkeypatch.undo()
+    assert sorted(many["hadm_id"]) == sorted(ids)
+    # NULLs dropped without turning the integer keys into floats
+    assert bound == ids.tolist() and {type(k) for k in bound} == {int}
+    copied = db.query_df_many(
+        "SELECT * FROM mimiciii.admissions", values=ids, chunk_size=10, copy=True
+    )
+    assert sorted(copied["hadm_id"]) == sorted(ids)
+    empty = db.query_df_many("SELECT * FROM mimiciii.admissions", values=[])
+    assert empty.empty and "hadm_id" in empty.columns
+
+
+def test_join_local_runs_join_on_temp_table(db):
+    ids = db.query_df("SELECT hadm_id FROM mimiciii.admissions LIMIT 30")["hadm_id"]
+    local = pd.DataFrame(
+        {"hadm_id": list(ids) + [-1], "grp": [i % 3 for i in range(31)]}
+    )
+    joined = db.join_local(local, "mimiciii.admissions", columns=["subject_id"])
+    assert list(joined.columns) == ["hadm_id", "grp", "subject_id"]
+    assert sorted(joined["hadm_id"]) == sorted(ids)
+    left = db.join_local(local, "mimiciii.admissions", how="left", columns=[])
+    assert len(left) == 31
+    counts = db.join_local(
+        local,
+        "SELECT l.grp, count(a.hadm_id) AS n FROM local_df l "
+        "JOIN mimiciii.admissions a USING (hadm_id) GROUP BY l.grp ORDER BY l.grp",
+    )
+    assert counts["n"].tolist() == [10, 10, 10]
+    with db.engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT to_regclass('local_df')").scalar() is None
+
+
+def test_run_sql_file_resumes_from_checkpoint(db, tmp_path):
+    script = tmp_path / "script.sql"
+    body = """
+    DROP TABLE IF EXISTS public.run_sql_file_test;
+    CREATE TABLE public.run_sql_file_test (id int);
+    CREATE OR REPLACE FUNCTION public.run_sql_file_test_fn() RETURNS int AS $$
+    BEGIN
+        RETURN 1; -- a ';' inside the body
+    END;
+    $$ LANGUAGE plpgsql;
+    INSERT INTO public.run_sql_file_test SELECT generate_series(1, 5);
+    INSERT INTO public.run_sql_file_test VALUES (1 / {divisor});
+    """
+    script.write_text(body.format(divisor=0))
+    with pytest.raises(RuntimeError, match=r"statement 5 \(line 10\)") as failed:
+        db.run_sql_file(str(script))
+    assert str(failed.value).count("Error executing SQL file") == 1
+    assert failed.value.__cause__ is not None
+    assert (tmp_path / "script.sql.checkpoint").exists()
+    other = tmp_path / "other.sql"
+    other.write_text(body.format(divisor=1))
+    with pytest.raises(RuntimeError, match="was written for"):
+        db.run_sql_file(
+            str(other), resume=True, checkpoint=str(tmp_path / "script.sql.checkpoint")
+        )
+    script.write_text(body.format(divisor=1))
+    report = db.run_sql_file(str(script), resume=True)
+    assert report["status"].tolist() == ["skipped"] * 4 + ["ok"]
+    assert not (tmp_path / "script.sql.checkpoint").exists()
+    assert (
+        db.query_df("SELECT count(*) AS n FROM public.run_sql_file_test")["n"][0] == 6
+    )
+
+    script.write_text("DELETE FROM public.run_sql_file_test; SELECT 1 / 0;")
+    with pytest.raises(RuntimeError):
+        db.run_sql_file(str(script), single_transaction=True)
+    assert (
+        db.query_df("SELECT count(*) AS n FROM public.run_sql_file_test")["n"][0] == 6
+    )
+    db.execute("DROP TABLE public.run_sql_file_test")
+    db.execute("DROP FUNCTION public.run_sql_file_test_fn()")
+
+
+def test_prefetch_returns_futures_in_the_shape_given(db):
+    pending = db.prefetch(
+        {
+            "patients": "SELECT subject_id FROM mimiciii.patients LIMIT 5",
+            "one": ("SELECT :x AS x", {"x": 1}),
+            "bad": "SELECT * FROM mimiciii.no_such_table",
+        }
+    )
+    assert len(pending["patients"].result()) == 5
+    assert pending["one"].result()["x"].tolist() == [1]
+    with pytest.raises(RuntimeError):
+        pending["bad"].result()
+    (sleeper,) = db.prefetch(["SELECT 1 AS n FROM pg_sleep(0.2)"])
+    assert not sleeper.done()
+    assert sleeper.result()["n"].tolist() == [1]
+
+
+def test_session_profiles_apply_to_one_call_only(db):
+    sql = "SELECT current_setting('work_mem') AS work_mem"
+    default = db.query_df(sql, use_cache=False)["work_mem"][0]
+    built = db.query_df(sql, use_cache=False, session="bulk_build")
+    assert built["work_mem"][0] == SESSION_PROFILES["bulk_build"]["work_mem"]
+    assert db.copy_df(sql, session={"work_mem": "5MB"})["work_mem"][0] == "5MB"
+    assert db.query_df(sql, use_cache=False)["work_mem"][0] == default
+
+    @db.register("work_mem_setting", session={"work_mem": "7MB"}, cache="none")
+    def work_mem_setting():
+        return sql, {}
+
+    assert db.run("work_mem_setting")["work_mem"][0] == "7MB"
+    assert db.run("work_mem_setting", session="lookup")["work_mem"][0] == default
+    with pytest.raises(ValueError):
+        db.query_df(sql, session="no_such_profile")
+
+
+def test_writes_evict_memoized_reads(db):
+    memo_db = DB.from_url(
+        db.engine.url.render_as_string(hide_password=False),
+        memo_max_bytes=64 * 1024**2,
+    )
+    try:
+        sql = "SELECT hadm_id FROM mimiciii.filtered_patients ORDER BY hadm_id"
+        first = memo_db.query_df(sql)
+        pd.testing.assert_frame_equal(memo_db.query_df(sql), first)
+        assert memo_db.memo_stats()["hits"] == 1
+        memo_db.execute("ANALYZE mimiciii.icustays")  # touches nothing the read used
+        memo_db.query_df(sql)
+        assert memo_db.memo_stats()["hits"] == 2
+        memo_db.execute("REFRESH MATERIALIZED VIEW mimiciii.filtered_patients")
+        assert memo_db.memo_stats()["invalidations"] == 1
+        pd.testing.assert_frame_equal(memo_db.query_df(sql), first)
+        assert memo_db.memo_stats()["misses"] == 2
+
+        memo_db.bulk_load(pd.DataFrame({"id": [1, 2]}), "public.memo_test", "replace")
+        count = "SELECT count(*) AS n FROM public.memo_test"
+        assert memo_db.query_df(count)["n"][0] == 2
+        memo_db.bulk_load(pd.DataFrame({"id": [3]}), "public.memo_test", "append")
+        assert memo_db.query_df(count)["n"][0] == 3
+        assert memo_db.memo_stats()["invalidations"] == 2
+    finally:
+        memo_db.execute("DROP TABLE IF EXISTS public.memo_test")
+        memo_db.dispose()
+
+
+def test_async_db_reads_and_gathers(db):
+    @db.register("async_work_mem", session={"work_mem": "6MB"}, dtypes="compact")
+    def async_work_mem(n=3):
+        return (
+            "SELECT g AS id, current_setting('work_mem') AS work_mem "
+            "FROM generate_series(1, :n) AS g",
+            {"n": n},
+        )
+
+    async def scenario():
+        adb = AsyncDB.from_db(db)
+        try:
+            one = await adb.query_df("SELECT :x AS x", {"x": 7})
+            table = await adb.table_df(
+                "admissions", schema="mimiciii", columns=["hadm_id"], limit=5
+            )
+            ran = await adb.run("async_work_mem", n=4)
+            frames = await adb.gather(
+                {
+                    "slow": ("SELECT 'slow' AS name FROM pg_sleep(0.3)", None),
+                    "patients": "SELECT subject_id FROM mimiciii.patients ORDER BY 1",
+                    "one": ("SELECT :x AS x", {"x": 1}),
+                }
+            )
+            with pytest.raises(RuntimeError) as failed:
+                await adb.query_df("SELECT * FROM mimiciii.no_such_table")
+            return one, table, ran, frames, failed.value
+        finally:
+            await adb.dispose()
+
+    one, table, ran, frames, error = asyncio.run(scenario())
+    assert one["x"].tolist() == [7]
+    assert table.columns.tolist() == ["hadm_id"] and len(table) == 5
+    assert ran["work_mem"].unique().tolist() == ["6MB"]
+    pd.testing.assert_frame_equal(ran, db.run("async_work_mem", n=4))
+    assert list(frames) == ["slow", "patients", "one"]
+    assert frames["slow"]["name"].tolist() == ["slow"]
+    pd.testing.assert_frame_equal(
+        frames["patients"],
+        db.query_df("SELECT subject_id FROM mimiciii.patients ORDER BY 1"),
+    )
+    assert frames["one"]["x"].tolist() == [1]
+    assert error.__cause__ is not None
+
+
+def test_bulk_load_round_trips_types_nulls_and_indexes(db):
+    table = "public.bulk_load_test"
+    df = pd.DataFrame(
+        {
+            "small": pd.Series([1, 2, 3], dtype="int16"),
+            "id": pd.Series([1, None, 3], dtype="Int64"),
+            "los": pd.Series([1.5, None, 2.25], dtype="float64"),
+            "score": pd.Series([0.5, 1.0, 2.0], dtype="float32"),
+            "flag": pd.Series([True, None, False], dtype="boolean"),
+            "charttime": pd.to_datetime(["2101-01-01 08:00", None, "2101-01-02 00:00"]),
+            "stay": pd.to_timedelta(["1 day", None, "36h"]),
+            "signed": pd.to_datetime(["2101-01-01", None, "2101-01-03"]).tz_localize(
+                "UTC"
+            ),
+            "note": ["", None, 'a,b "quoted"\nline'],
+        }
+    )
+    try:
+        assert db.bulk_load(df, table, indexes=["id", ("small", "charttime")]) == 3
+        types = db.query_df(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = 'bulk_load_test'"
+        )
+        assert dict(zip(types["column_name"], types["data_type"])) == {
+            "small": "smallint",
+            "id": "bigint",
+            "los": "double precision",
+            "score": "real",
+            "flag": "boolean",
+            "charttime": "timestamp without time zone",
+            "stay": "interval",
+            "signed": "timestamp with time zone",
+            "note": "text",
+        }
+        indexes = db.query_df(
+            "SELECT indexdef FROM pg_indexes "
+            "WHERE schemaname = 'public' AND tablename = 'bulk_load_test' ORDER BY 1"
+        )["indexdef"].tolist()
+        assert [d.split("USING btree ")[1] for d in indexes] == [
+            "(id)",
+            "(small, charttime)",
+        ]
+
+        back = db.query_df(f"SELECT * FROM {table} ORDER BY small", use_cache=False)
+        assert back["note"][0] == "" and back["note"][1] is None
+        assert back["note"][2] == df["note"][2]
+        assert back["flag"].isna().tolist() == [False, True, False]
+        assert back["id"].isna().tolist() == [False, True, False]
+        assert pd.isna(back["charttime"][1]) and pd.isna(back["los"][1])
+        assert back["charttime"][2] == datetime(2101, 1, 2)
+
+        with pytest.raises(RuntimeError):  # "create" needs a new table
+            db.bulk_load(df, table)
+        assert db.bulk_load(df.head(2), table, mode="append") == 2
+        count = f"SELECT count(*) AS n FROM {table}"
+        assert db.query_df(count, use_cache=False)["n"][0] == 5
+        assert db.bulk_load(df[["small"]], table, mode="replace") == 3
+        assert db.query_df(count, use_cache=False)["n"][0] == 3
+        assert db.query_df(f"SELECT * FROM {table} LIMIT 0").columns.tolist() == [
+            "small"
+        ]
+        with pytest.raises(RuntimeError):  # "append" needs an existing table
+            db.bulk_load(df, "public.bulk_load_missing", mode="append")
+        with pytest.raises(ValueError):
+            db.bulk_load(df, table, mode="upsert")
+    finally:
+        db.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def test_run_keeps_dtypes_once_a_result_is_large(db):
+    sql = (
+        "SELECT g AS id, g::numeric / 4 AS score, g % 2 = 0 AS even, "
+        "CASE WHEN g % 3 = 0 THEN NULL ELSE 'x' END AS note "
+        "FROM generate_series(1, 60000) AS g"
+    )
+
+    @db.register("large_result", cache="none")
+    def large_result():
+        return sql, {}
+
+    first = db.run("large_result")
+    second = db.run("large_result")  # observed_rows is now large
+    pd.testing.assert_series_equal(first.dtypes, second.dtypes)
+    pd.testing.assert_frame_equal(second, db.query_df(sql, use_cache=False))
+
+
 # def test_query_df_returns_dataframe(db):
 #     """Test basic query returns a pandas DataFrame."""
 #     result = db.query_df("SELECT 1 as test_col")
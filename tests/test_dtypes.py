@@ -0,0 +1,28 @@
+import pandas as pd
+
+from mimiciii_db.dtypes import DtypePolicy, concat_compact
+
+
+def test_flag_plan_does_not_wrap_values_in_later_chunks():
+    """A column planned as a flag on the first chunk keeps out-of-range values later."""
+    policy = DtypePolicy()
+    first = pd.DataFrame({"x": [0, 1, 0, 1], "hadm_id": [1, 2, 3, 4]})
+    later = pd.DataFrame({"x": [1, 300], "hadm_id": [5, 2**40]})
+    fractional = pd.DataFrame({"x": [0.5, 1.0], "hadm_id": [6, 7]})
+    plan = policy.plan(first)
+    assert plan == {"x": "flag", "hadm_id": "id"}
+    chunks = [policy.apply(c, plan) for c in (first, later, fractional)]
+    assert chunks[0]["x"].dtype == "int8"
+    assert chunks[1]["x"].tolist() == [1, 300]
+    assert chunks[1]["hadm_id"].tolist() == [5, 2**40]
+    assert chunks[2]["x"].tolist() == [0.5, 1.0]
+    out = concat_compact(chunks)
+    assert out["x"].tolist() == [0, 1, 0, 1, 1, 300, 0.5, 1.0]
+
+
+def test_boolean_flags_fall_back_to_a_wide_enough_dtype():
+    policy = DtypePolicy(flag_dtype="boolean")
+    plan = policy.plan(pd.DataFrame({"x": [0, 1]}))
+    assert policy.apply(pd.DataFrame({"x": [0, 1]}), plan)["x"].dtype == "boolean"
+    assert policy.apply(pd.DataFrame({"x": [2, 1]}), plan)["x"].dtype == "Int8"
+    assert policy.apply(pd.DataFrame({"x": [300, 1]}), plan)["x"].tolist() == [300, 1]
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from mimiciii_db import DB
+
+pytest.importorskip("duckdb_engine")
+
+
+@pytest.fixture
+def duck(tmp_path):
+    pd.DataFrame({"hadm_id": [1, 2, 3], "gender": ["F", "M", "F"]}).to_parquet(
+        tmp_path / "admissions.parquet"
+    )
+    (tmp_path / "diagnoses_icd" / "seq=1").mkdir(parents=True)
+    pd.DataFrame({"hadm_id": [1, 1, 3], "icd9_code": ["401", "428", "401"]}).to_parquet(
+        tmp_path / "diagnoses_icd" / "seq=1" / "part-0.parquet"
+    )
+    db = DB.from_parquet_dir(str(tmp_path))
+    yield db
+    db.dispose()
+
+
+def test_parquet_dir_exposes_mimiciii_schema(duck):
+    df = duck.query_df(
+        "SELECT a.gender, count(*) AS n FROM mimiciii.admissions a "
+        "JOIN diagnoses_icd d USING (hadm_id) WHERE d.icd9_code = :code "
+        "GROUP BY a.gender ORDER BY a.gender",
+        {"code": "401"},
+    )
+    assert df.to_dict("list") == {"gender": ["F"], "n": [2]}
+    assert list(duck.table_df("diagnoses_icd", schema="mimiciii")["seq"]) == [1] * 3
+
+
+def test_parquet_dir_registry_and_return_types(duck):
+    duck.register("by_id")(
+        lambda hadm_id: ("SELECT * FROM admissions WHERE hadm_id = :h", {"h": hadm_id})
+    )
+    assert duck.run("by_id", hadm_id=2)["gender"].tolist() == ["M"]
+    assert duck.query_df("SELECT * FROM admissions", return_type="arrow").num_rows == 3
+    with pytest.raises(ValueError):
+        duck.query_df("SELECT 1", timeout=1)
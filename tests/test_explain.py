@@ -0,0 +1,64 @@
+from mimiciii_db.explain import parse_explain
+
+PLAN = [
+    {
+        "Plan": {
+            "Node Type": "Sort",
+            "Plan Rows": 100,
+            "Actual Rows": 50000,
+            "Actual Loops": 1,
+            "Actual Total Time": 900.0,
+            "Total Cost": 5000.0,
+            "Sort Space Type": "Disk",
+            "Sort Space Used": 2048,
+            "Shared Read Blocks": 1200,
+            "Temp Written Blocks": 256,
+            "Plans": [
+                {
+                    "Node Type": "Seq Scan",
+                    "Relation Name": "chartevents",
+                    "Plan Rows": 100,
+                    "Actual Rows": 50000,
+                    "Actual Loops": 1,
+                    "Actual Total Time": 600.0,
+                    "Total Cost": 4000.0,
+                    "Rows Removed by Filter": 10,
+                    "Shared Read Blocks": 1200,
+                }
+            ],
+        },
+        "Planning Time": 0.5,
+        "Execution Time": 910.0,
+    }
+]
+
+
+def test_parse_explain_self_time_io_and_findings():
+    profile = parse_explain(PLAN, "SELECT ...")
+    sort, scan = profile.nodes()
+    assert sort.self_ms == 300.0 and scan.self_ms == 600.0
+    assert sort.io["shared_read"] == 0 and scan.io["shared_read"] == 1200
+    assert sort.io["temp_written"] == 256
+    assert "seq scan on big table" in scan.flags
+    assert any(f.startswith("sort spilled") for f in sort.flags)
+    assert any(f.startswith("rows misestimated") for f in scan.flags)
+    assert profile.top(1)["node"].tolist() == ["Seq Scan"]
+    assert "Findings:" in str(profile)
+
+
+def test_parse_explain_ignores_early_stop_under_limit():
+    limited = {
+        "Plan": {
+            "Node Type": "Limit",
+            "Plan Rows": 10,
+            "Actual Rows": 10,
+            "Actual Loops": 1,
+            "Actual Total Time": 1.0,
+            "Plans": [dict(PLAN[0]["Plan"]["Plans"][0], **{"Actual Rows": 10})],
+        },
+        "Execution Time": 1.0,
+        "Planning Time": 0.1,
+    }
+    limited["Plan"]["Plans"][0]["Plan Rows"] = 1_000_000
+    scan = parse_explain(limited).nodes()[1]
+    assert not any(f.startswith("rows misestimated") for f in scan.flags)
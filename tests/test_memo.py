@@ -0,0 +1,80 @@
+import pandas as pd
+
+from mimiciii_db.memo import QueryMemo, result_nbytes
+
+
+def _frame(n=100):
+    return pd.DataFrame({"hadm_id": range(n), "los": [1.5] * n})
+
+
+def test_key_normalizes_sql_and_tracks_params_and_variant():
+    key = QueryMemo.key("SELECT * FROM admissions WHERE hadm_id = :h", {"h": 1})
+    assert key == QueryMemo.key(
+        "-- one stay\nSELECT * FROM admissions WHERE hadm_id = :h;", {"h": 1}
+    )
+    assert key != QueryMemo.key("SELECT * FROM admissions WHERE hadm_id = :h", {"h": 2})
+    assert key != QueryMemo.key(
+        "SELECT * FROM admissions WHERE hadm_id = :h", {"h": 1}, "arrow/regular"
+    )
+
+
+def test_get_returns_copies_the_caller_can_mutate():
+    memo = QueryMemo()
+    frame = _frame()
+    memo.put("q", frame, ["mimiciii.admissions"])
+    frame.loc[0, "hadm_id"] = -1  # the caller's own frame, after caching it
+    first = memo.get("q")
+    assert first.loc[0, "hadm_id"] == 0
+    first.loc[0, "hadm_id"] = -2
+    assert memo.get("q").loc[0, "hadm_id"] == 0
+    assert memo.get("missing") is None
+    assert memo.stats()["hits"] == 2 and memo.stats()["misses"] == 1
+
+
+def test_byte_budget_evicts_least_recently_used():
+    entry = result_nbytes(_frame())
+    memo = QueryMemo(max_bytes=2 * entry)
+    memo.put("a", _frame(), ["admissions"])
+    memo.put("b", _frame(), ["admissions"])
+    memo.get("a")  # "b" is now the least recently used
+    memo.put("c", _frame(), ["admissions"])
+    assert memo.get("b") is None
+    assert memo.get("a") is not None and memo.get("c") is not None
+    stats = memo.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2 and stats["bytes"] == 2 * entry
+
+
+def test_replacing_a_key_does_not_double_count_bytes():
+    memo = QueryMemo()
+    memo.put("a", _frame(), ["admissions"])
+    memo.put("a", _frame(), ["admissions"])
+    assert memo.stats()["bytes"] == result_nbytes(_frame())
+
+
+def test_results_larger_than_the_budget_are_not_kept():
+    memo = QueryMemo(max_bytes=result_nbytes(_frame()) - 1)
+    memo.put("a", _frame(), ["admissions"])
+    assert memo.get("a") is None
+    assert memo.stats()["evictions"] == 0
+
+
+def test_invalidate_drops_entries_reading_a_relation():
+    memo = QueryMemo()
+    memo.put("a", _frame(), ["mimiciii.admissions", "mimiciii.patients"])
+    memo.put("b", _frame(), ["mimiciii.icustays"])
+    # schema-qualified or not, the relation matches by name
+    assert memo.invalidate(["patients"]) == 1
+    assert memo.get("a") is None and memo.get("b") is not None
+    assert memo.invalidate(["mimiciii.diagnoses_icd"]) == 0
+    stats = memo.stats()
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 1 and stats["bytes"] == result_nbytes(_frame())
+
+
+def test_clear_empties_the_memo():
+    memo = QueryMemo()
+    memo.put("a", _frame(), ["admissions"])
+    memo.clear()
+    assert memo.get("a") is None
+    assert memo.stats()["entries"] == 0 and memo.stats()["bytes"] == 0
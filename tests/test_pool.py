@@ -0,0 +1,27 @@
+import sqlite3
+
+from mimiciii_db.pool import AdaptivePoolSizing, MonitoredQueuePool
+
+
+def test_adaptive_pool_grows_within_budget_and_shrinks_when_idle():
+    pool = MonitoredQueuePool(
+        lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0
+    )
+    # every window looks congested: overflow grows one step per window, up to the budget
+    pool.stats.sizing = AdaptivePoolSizing(
+        budget=3, grow_wait_ms=-1, shrink_wait_ms=-1, window=2, step=1
+    )
+    for _ in range(10):
+        pool.connect().close()
+    assert pool._max_overflow == 2
+    assert pool.stats.grows == 2
+
+    # now every window looks idle: overflow is given back, never below zero
+    pool.stats.sizing = AdaptivePoolSizing(
+        budget=3, grow_wait_ms=1e9, shrink_wait_ms=1e9, window=2, step=1
+    )
+    for _ in range(10):
+        pool.connect().close()
+    assert pool._max_overflow == 0
+    assert pool.stats.shrinks == 2
+    assert pool.stats.checkouts == 20 and pool.stats.connects == 1
@@ -0,0 +1,25 @@
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from mimiciii_db.routing import ReplicaRouter
+
+
+def test_router_round_robin_and_read_your_writes_window():
+    primary, r1, r2 = (create_engine("sqlite://") for _ in range(3))
+    router = ReplicaRouter(primary, [r1, r2], read_your_writes=0.05)
+    assert [router.reader() for _ in range(4)] == [r1, r2, r1, r2]
+    router.wrote()
+    assert router.reader() is primary
+    time.sleep(0.06)
+    assert router.reader() in (r1, r2)
+
+
+def test_router_least_busy_prefers_idle_replica():
+    primary, r1, r2 = (
+        create_engine("sqlite://", poolclass=QueuePool) for _ in range(3)
+    )
+    router = ReplicaRouter(primary, [r1, r2], policy="least_busy")
+    with r1.connect():
+        assert {router.reader() for _ in range(4)} == {r2}
@@ -0,0 +1,70 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from mimiciii_db.singleflight import SingleFlight
+
+
+def _run_concurrently(flights, key, fn, n):
+    results, errors = [None] * n, [None] * n
+
+    def call(i):
+        try:
+            results[i] = flights.do(key, fn)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return pd.DataFrame({"hadm_id": [1, 2, 3]})
+
+    threads, results, errors = _run_concurrently(flights, "q", fetch, 4)
+    while flights.stats()["coalesced"] < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and errors == [None] * 4
+    assert len({id(r) for r in results}) == 4  # every caller gets its own frame
+    results[0].loc[0, "hadm_id"] = -1
+    assert results[1].loc[0, "hadm_id"] == 1
+    assert flights.stats() == {
+        "executions": 1,
+        "coalesced": 3,
+        "errors": 0,
+        "in_flight": 0,
+    }
+
+
+def test_waiters_get_the_leaders_error_and_later_calls_rerun():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("Database query failed: boom")
+
+    threads, _, errors = _run_concurrently(flights, "q", fail, 3)
+    while flights.stats()["coalesced"] < 2:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    with pytest.raises(RuntimeError):
+        flights.do("q", fail)
+    assert flights.stats()["executions"] == 2
+    assert flights.stats()["errors"] == 2
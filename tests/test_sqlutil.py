@@ -0,0 +1,81 @@
+from mimiciii_db.sqlutil import (
+    fingerprint,
+    iter_statements,
+    normalize_sql,
+    referenced_relations,
+    split_statements,
+)
+
+
+def test_normalize_sql_keeps_quoted_text():
+    """Comments and whitespace are collapsed everywhere except inside literals."""
+    sql = "SELECT  'a  --b' -- trailing\n  FROM  t /* note */ ;"
+    assert normalize_sql(sql) == "SELECT 'a  --b' FROM t"
+
+
+def test_fingerprint_ignores_literals():
+    """Statements differing only in constants (or IN-list length) share a fingerprint."""
+    a = fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND kind = 'x'")
+    b = fingerprint("select *  from t where id in (7) and kind = 'y' -- again")
+    assert a == b
+    assert a != fingerprint("SELECT * FROM t WHERE id = :id")
+
+
+def test_referenced_relations_follows_joins_and_from_lists():
+    sql = """
+    WITH recent AS (SELECT * FROM mimiciii.admissions)
+    SELECT *
+    FROM (mimiciii.filtered_patients fp JOIN mimiciii.elixhauser_quan e USING (hadm_id)),
+         recent r, generate_series(1, 3) g
+    WHERE EXTRACT(epoch FROM fp.icu_outtime) > 0
+      AND fp.gender IS DISTINCT FROM 'x'
+    """
+    assert referenced_relations(sql) == {
+        "mimiciii.admissions",
+        "mimiciii.filtered_patients",
+        "mimiciii.elixhauser_quan",
+    }
+
+
+def test_referenced_relations_ddl_targets():
+    sql = """
+    DROP MATERIALIZED VIEW IF EXISTS mimiciii.sofa;
+    CREATE MATERIALIZED VIEW mimiciii.sofa AS SELECT * FROM mimiciii.icustays;
+    INSERT INTO lca_subgroups (hadm_id) VALUES (1);
+    """
+    assert referenced_relations(sql) == {
+        "mimiciii.sofa",
+        "mimiciii.icustays",
+        "lca_subgroups",
+    }
+
+
+def test_split_statements_respects_quotes_and_comments():
+    script = "SELECT ';' AS a; -- done; really\n/* ; */ SELECT 2;\n;"
+    assert split_statements(script) == [
+        "SELECT ';' AS a",
+        "-- done; really\n/* ; */ SELECT 2",
+    ]
+
+
+def test_iter_statements_streams_dollar_quoted_bodies():
+    script = [
+        "-- setup\n",
+        "CREATE FUNCTION f() RETURNS int AS $body$\n",
+        "BEGIN RETURN 1; END; -- $$ ;\n",
+        "$body$ LANGUAGE plpgsql;\n",
+        "SELECT $$a;b$$, foo$bar FROM t; SELECT 'x\n",
+        ";y';\n",
+        "SELECT E'it\\'s; here', e'\\\\'; SELECT E'a\\\n",
+        "; b', 'c\\'; SELECT 1\n",
+    ]
+    statements = list(iter_statements(script))
+    assert [line for line, _ in statements] == [1, 5, 5, 7, 7, 8]
+    assert statements[0][1].endswith("$body$ LANGUAGE plpgsql")
+    assert statements[1][1] == "SELECT $$a;b$$, foo$bar FROM t"
+    assert statements[2][1] == "SELECT 'x\n;y'"
+    # a backslash escapes the quote in E'...' only; '\' in a plain string is literal
+    assert statements[3][1] == "SELECT E'it\\'s; here', e'\\\\'"
+    assert statements[4][1] == "SELECT E'a\\\n; b', 'c\\'"
+    assert statements[5][1] == "SELECT 1"
+    assert split_statements("".join(script)) == [s for _, s in statements]